@@ -0,0 +1,121 @@
+"""
+Compares the compiled command parser with the split-based one it replaced.
+
+    make bench
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "codecov_slack_app.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from core.enums import EndpointName  # noqa: E402
+from core.helpers import endpoint_mapping, parse_command  # noqa: E402
+
+ITERATIONS = int(os.environ.get("BENCH_ITERATIONS", 20000))
+
+CORPUS = [
+    ("owner username=codecov service=gh", EndpointName.OWNER),
+    ("repos username=codecov service=github", EndpointName.REPOS),
+    (
+        "repos username=codecov service=gh active=true page=2 page_size=50",
+        EndpointName.REPOS,
+    ),
+    (
+        "commits username=codecov service=gh repository=codecov-api "
+        "branch=main page_size=20",
+        EndpointName.COMMITS,
+    ),
+    (
+        "pulls username=codecov service=gh repository=worker state=open "
+        "ordering=-pullid",
+        EndpointName.PULLS,
+    ),
+    (
+        "compare username=codecov service=gh repository=gazebo pullid=2391",
+        EndpointName.COMPARISON,
+    ),
+    (
+        "compare-file username=codecov service=gl repository=shared "
+        "base=6c3b4e1 head=91ad0cf path=shared/reports/readonly.py",
+        EndpointName.FILE_COMPARISON,
+    ),
+    (
+        "coverage-trends username=codecov service=gh repository=worker "
+        "flag=unit interval=7d start_date=2023-01-01",
+        EndpointName.COVERAGE_TRENDS,
+    ),
+    (
+        "file-coverage-report username=codecov service=bb "
+        "repository=app path=src/app/main.py sha=3f1d2a9",
+        EndpointName.FILE_COVERAGE_REPORT,
+    ),
+    (
+        "summary username=codecov service=gh repository=codecov-api",
+        EndpointName.SUMMARY,
+    ),
+    ('repos username="codecov org" service=gh', EndpointName.REPOS),
+    (
+        "file-coverage-report username=codecov service=gh "
+        "repository=app path='src/app/my module.py'",
+        EndpointName.FILE_COVERAGE_REPORT,
+    ),
+    ("owner username=“rula k” service=gh", EndpointName.OWNER),
+    ("owner username=‘rula k’ service=gh", EndpointName.OWNER),
+]
+
+
+def legacy_parse(text, command_name):
+    """The split-based parser, kept here for comparison.
+
+    It has no notion of quoting, so quoted values are split on spaces.
+    """
+    params_dict = {}
+    for param in text.split(" "):
+        if "=" not in param:
+            continue
+        params_dict[param.split("=")[0]] = param.split("=")[1]
+
+    command = endpoint_mapping.get(command_name)
+    if command.required_params:
+        if len(params_dict) == 0:
+            raise ValueError("Missing required parameters")
+
+        for param in command.required_params:
+            if param not in params_dict:
+                raise ValueError(f"Missing required parameter {param}")
+
+    optional_params = {}
+    for key in command.optional_params or []:
+        if key in params_dict:
+            optional_params[key] = params_dict.get(key)
+
+    return params_dict, optional_params
+
+
+def compiled_parse(text, command_name):
+    return parse_command({"text": text}, command_name)
+
+
+def run(parse):
+    for text, command_name in CORPUS:
+        parse(text, command_name)
+
+
+def main():
+    for name, parse in [
+        ("legacy", legacy_parse),
+        ("compiled", compiled_parse),
+    ]:
+        seconds = timeit.timeit(lambda: run(parse), number=ITERATIONS)
+        per_command = seconds / (ITERATIONS * len(CORPUS)) * 1e6
+        print(f"{name:>9}: {per_command:.2f} µs per command")
+
+
+if __name__ == "__main__":
+    main()
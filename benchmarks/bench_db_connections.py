@@ -0,0 +1,57 @@
+"""
+Compares a connection per request with persistent connections, by running
+requests of a few small queries between Django's request signals.
+
+    POSTGRES_DB=postgres make bench
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "codecov_slack_app.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.core.signals import request_finished, request_started  # noqa: E402
+from django.db import connection  # noqa: E402
+
+from core.db_metrics import connection_metrics  # noqa: E402
+
+REQUESTS = int(os.environ.get("BENCH_REQUESTS", 500))
+QUERIES_PER_REQUEST = 3
+
+
+def run_request():
+    request_started.send(sender=None)
+    try:
+        with connection.cursor() as cursor:
+            for _ in range(QUERIES_PER_REQUEST):
+                cursor.execute("SELECT 1")
+    finally:
+        request_finished.send(sender=None)
+
+
+def main():
+    for conn_max_age in (0, 60):
+        connection.close()
+        connection.settings_dict["CONN_MAX_AGE"] = conn_max_age
+        opened = connection_metrics.opened
+
+        started = time.perf_counter()
+        for _ in range(REQUESTS):
+            run_request()
+        per_request = (time.perf_counter() - started) / REQUESTS * 1000
+
+        print(
+            f"CONN_MAX_AGE={conn_max_age:<3}: {per_request:.3f} ms per request,"
+            f" {connection_metrics.opened - opened} connections opened"
+        )
+
+    print(f"connection stats: {connection_metrics.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -89,17 +89,84 @@ WSGI_APPLICATION = "codecov_slack_app.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/4.1/ref/settings/#databases
 
+DB_CONN_HEALTH_CHECKS = (
+    os.environ.get("DB_CONN_HEALTH_CHECKS", "true").lower() == "true"
+)
+
 DATABASES = {
     "default": {
-        "ENGINE": os.environ.get(
-            "SQL_ENGINE", "django.db.backends.postgresql"
-        ),
+        # always the stock postgresql backend wrapped with connection
+        # metrics, see core.db_metrics
+        "ENGINE": "core.db_backends.postgresql",
         "NAME": os.environ.get("POSTGRES_DB", "codecov_slack_app"),
         "USER": os.environ.get("POSTGRES_USER", "user"),
         "PASSWORD": os.environ.get("POSTGRES_PASSWORD", "password"),
         "HOST": os.environ.get("SQL_HOST", "localhost"),
         "PORT": os.environ.get("SQL_PORT", "5432"),
+        # keep connections across requests instead of one per request
+        "CONN_MAX_AGE": int(os.environ.get("DB_CONN_MAX_AGE", 60)),
+        "CONN_HEALTH_CHECKS": DB_CONN_HEALTH_CHECKS,
+    }
+}
+
+# read-only hot paths opt in to the replica, see core.db_router
+if os.environ.get("SQL_REPLICA_HOST"):
+    DATABASES["replica"] = {
+        **DATABASES["default"],
+        "HOST": os.environ.get("SQL_REPLICA_HOST"),
+        "PORT": os.environ.get(
+            "SQL_REPLICA_PORT", DATABASES["default"]["PORT"]
+        ),
+        "TEST": {"MIRROR": "default"},
     }
+
+DATABASE_ROUTERS = ["core.db_router.ReplicaRouter"]
+
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+
+# gunicorn runs several workers, so the caches live in the database where
+# every worker sees the same entries, the tables are created by
+# core/migrations/0011_cache_tables.py
+CACHES = {
+    "default": {
+        "BACKEND": os.environ.get(
+            "CACHE_BACKEND", "django.core.cache.backends.db.DatabaseCache"
+        ),
+        "LOCATION": os.environ.get("CACHE_LOCATION", "codecov_slack_cache"),
+        # past MAX_ENTRIES every set culls a third of the table, keep it
+        # well above the per-user and per-channel keys of the workspaces
+        "OPTIONS": {
+            "MAX_ENTRIES": int(os.environ.get("CACHE_MAX_ENTRIES", 100000)),
+        },
+    },
+    # Slack installations and bots, looked up to authorize every request,
+    # kept per process so a hit costs no query, see core.slack_datastores
+    "installations": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "slack-installations",
+        "OPTIONS": {
+            "MAX_ENTRIES": int(
+                os.environ.get("SLACK_INSTALLATION_CACHE_MAX_ENTRIES", 10000)
+            ),
+        },
+    },
+    # seen Slack event ids, bounded so a burst of retries can't grow it,
+    # a retry can be delivered to any worker so it's shared as well
+    "slack_events": {
+        "BACKEND": os.environ.get(
+            "SLACK_EVENTS_CACHE_BACKEND",
+            "django.core.cache.backends.db.DatabaseCache",
+        ),
+        "LOCATION": os.environ.get(
+            "SLACK_EVENTS_CACHE_LOCATION", "codecov_slack_events"
+        ),
+        "OPTIONS": {
+            "MAX_ENTRIES": int(
+                os.environ.get("SLACK_EVENTS_CACHE_MAX_ENTRIES", 10000)
+            ),
+        },
+    },
 }
 
 
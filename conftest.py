@@ -0,0 +1,25 @@
+import pytest
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers",
+        "database_cache: run on the configured caches, like production",
+    )
+
+
+@pytest.fixture(autouse=True)
+def local_cache(request, settings):
+    # the database backed default cache adds its own queries to every
+    # assertNumQueries, most tests run on a per-process cache instead and
+    # the ones marked database_cache count the cache's queries as well
+    if request.node.get_closest_marker("database_cache"):
+        return
+
+    settings.CACHES = {
+        alias: {
+            **config,
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+        for alias, config in settings.CACHES.items()
+    }
@@ -0,0 +1,77 @@
+import logging
+import os
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+COMMAND_EXECUTOR_MAX_WORKERS = int(
+    os.environ.get("COMMAND_EXECUTOR_MAX_WORKERS", 16)
+)
+COMMAND_MAX_IN_FLIGHT_PER_USER = int(
+    os.environ.get("COMMAND_MAX_IN_FLIGHT_PER_USER", 2)
+)
+
+TOO_MANY_COMMANDS_MESSAGE = (
+    "You already have commands running, please wait for them to finish "
+    "before sending another one."
+)
+
+
+class CommandExecutor:
+    """
+    Runs slash commands off the request thread on a bounded pool, so the
+    HTTP worker only has to ack. A user can't have more than
+    `max_in_flight_per_user` commands queued or running at once.
+    """
+
+    def __init__(self, max_workers: int, max_in_flight_per_user: int):
+        self.max_in_flight_per_user = max_in_flight_per_user
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="codecov-command"
+        )
+        self._in_flight = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def in_flight(self, user_id) -> int:
+        with self._lock:
+            return self._in_flight.get(user_id, 0)
+
+    def submit(self, user_id, fn, *args, **kwargs) -> bool:
+        """Returns False without running `fn` if the user is at the limit"""
+        with self._lock:
+            if self._in_flight[user_id] >= self.max_in_flight_per_user:
+                return False
+            self._in_flight[user_id] += 1
+
+        try:
+            self._executor.submit(self._run, user_id, fn, *args, **kwargs)
+        except RuntimeError:
+            self._release(user_id)
+            raise
+        return True
+
+    def _run(self, user_id, fn, *args, **kwargs):
+        try:
+            fn(*args, **kwargs)
+        except Exception as e:
+            logger.error(f"Error running command for {user_id}: {e}")
+        finally:
+            self._release(user_id)
+            # worker threads outlive the request, don't leak db connections
+            close_old_connections()
+
+    def _release(self, user_id):
+        with self._lock:
+            self._in_flight[user_id] -= 1
+            if self._in_flight[user_id] <= 0:
+                del self._in_flight[user_id]
+
+
+command_executor = CommandExecutor(
+    max_workers=COMMAND_EXECUTOR_MAX_WORKERS,
+    max_in_flight_per_user=COMMAND_MAX_IN_FLIGHT_PER_USER,
+)
@@ -0,0 +1,32 @@
+from functools import cached_property
+from typing import Optional
+
+from core.db_router import read_replica
+from core.models import SlackInstallation
+from service_auth.models import SlackUser
+
+
+class CommandContext:
+    """
+    Database state a single command needs, resolved at most once per command
+    and shared by the resolver and the Codecov API helpers
+    """
+
+    def __init__(self, client, command):
+        self.client = client
+        self.user_id = command["user_id"]
+
+    @cached_property
+    def slack_user(self) -> Optional[SlackUser]:
+        # the active service comes along in the same query
+        with read_replica():
+            return (
+                SlackUser.objects.with_active_service()
+                .filter(user_id=self.user_id)
+                .first()
+            )
+
+    @cached_property
+    def installation(self) -> SlackInstallation:
+        with read_replica():
+            return SlackInstallation.objects.get(bot_token=self.client.token)
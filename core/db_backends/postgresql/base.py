@@ -0,0 +1,15 @@
+import time
+
+from django.db.backends.postgresql import base
+
+from core.db_metrics import connection_metrics
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """The stock PostgreSQL backend, timing every new connection"""
+
+    def get_new_connection(self, conn_params):
+        started = time.perf_counter()
+        connection = super().get_new_connection(conn_params)
+        connection_metrics.record(time.perf_counter() - started)
+        return connection
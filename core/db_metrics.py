@@ -0,0 +1,41 @@
+import logging
+import threading
+
+import sentry_sdk
+
+from service_auth.circuit_breaker import LatencyTracker
+
+logger = logging.getLogger(__name__)
+
+
+class ConnectionMetrics:
+    """
+    Counts new database connections and how long getting one took. With
+    persistent connections most requests should open none. Served by the
+    internal db-metrics view.
+    """
+
+    def __init__(self):
+        self.opened = 0
+        self.latencies = LatencyTracker(window=1000, min_samples=1)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self.opened += 1
+        self.latencies.record(seconds)
+        # shows up on the sampled request's Sentry transaction
+        sentry_sdk.set_measurement(
+            "db.connection_acquire", seconds * 1000, "millisecond"
+        )
+        logger.debug(f"Database connection acquired in {seconds:.4f}s")
+
+    def stats(self):
+        return {
+            "opened": self.opened,
+            "acquire_p50": self.latencies.percentile(50),
+            "acquire_p99": self.latencies.percentile(99),
+        }
+
+
+connection_metrics = ConnectionMetrics()
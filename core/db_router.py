@@ -0,0 +1,67 @@
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+REPLICA_DB_ALIAS = "replica"
+
+REPLICA_STICKY_SECONDS = int(
+    os.environ.get("REPLICA_STICKY_SECONDS", 10)
+)  # how long rows just written are read from the primary, above replica lag
+
+
+class _ReplicaScope:
+    def __init__(self):
+        self.wrote = False
+
+
+_replica_scope: ContextVar[Optional[_ReplicaScope]] = ContextVar(
+    "replica_scope", default=None
+)
+
+
+def replica_configured() -> bool:
+    return REPLICA_DB_ALIAS in settings.DATABASES
+
+
+@contextmanager
+def read_replica():
+    """
+    Sends the reads made inside the block to the replica, until the first
+    write in it, after which they go back to the primary so the block
+    reads its own writes. Reads outside such a block always use the
+    primary, so opting in is explicit.
+    """
+    token = _replica_scope.set(_ReplicaScope())
+    try:
+        yield
+    finally:
+        _replica_scope.reset(token)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        scope = _replica_scope.get()
+        if scope is None or scope.wrote or not replica_configured():
+            return None  # the primary
+
+        return REPLICA_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        scope = _replica_scope.get()
+        if scope is not None:
+            scope.wrote = True
+
+        # never None, Django would fall back to the database the instance
+        # was read from, which may be the replica
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != REPLICA_DB_ALIAS
@@ -26,3 +26,4 @@ class EndpointName(Enum):
     COMMIT_COVERAGE_REPORT = "commit-coverage-report"
     COMMIT_COVERAGE_TOTALS = "commit-coverage-totals"
     NOTIFICATION = "notification"
+    SUMMARY = "summary"
@@ -0,0 +1,36 @@
+import os
+
+from django.core.cache import caches
+from slack_bolt import BoltResponse
+
+SLACK_EVENT_DEDUPE_TTL = int(
+    os.environ.get("SLACK_EVENT_DEDUPE_TTL", 5 * 60)
+)  # seconds, Slack gives up retrying well within this window
+
+
+def is_duplicate_event(event_id) -> bool:
+    """
+    Records `event_id` and tells whether it was already seen. cache.add is
+    atomic, so two concurrent deliveries can't both be treated as new.
+    """
+    return not caches["slack_events"].add(
+        f"slack_event:{event_id}", True, SLACK_EVENT_DEDUPE_TTL
+    )
+
+
+def forget_event(event_id):
+    """Lets a later retry of `event_id` run, for events whose handler failed"""
+    caches["slack_events"].delete(f"slack_event:{event_id}")
+
+
+def dedupe_slack_events(body, next, logger):
+    """
+    Global middleware that acks redeliveries of an event we already handled
+    without running any listener
+    """
+    event_id = body.get("event_id")
+    if event_id and is_duplicate_event(event_id):
+        logger.info(f"Skipping duplicate delivery of event {event_id}")
+        return BoltResponse(status=200, body="")
+
+    next()
@@ -1,17 +1,39 @@
 import logging
+import os
+import re
 from dataclasses import dataclass
-from typing import Dict, Optional
+from tempfile import SpooledTemporaryFile
+from typing import Dict, FrozenSet, Optional, Tuple
 
 import requests
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Value
+from django.utils import timezone
 from slack_sdk.errors import SlackApiError
 from slack_sdk.models.blocks import ButtonElement, DividerBlock, SectionBlock
 
-from core.models import Notification, SlackInstallation
+from core.models import ArrayAppend, Notification, SlackInstallation
 
 from .enums import EndpointName
 
 logger = logging.getLogger(__name__)
 
+BOT_MEMBERSHIP_CACHE_TTL = int(
+    os.environ.get("BOT_MEMBERSHIP_CACHE_TTL", 24 * 60 * 60)
+)  # seconds, member_joined_channel/member_left_channel keep it current
+
+# channel types and DM channels never change, but every cache entry needs a
+# timeout or the shared cache table only ever grows
+SLACK_CHANNEL_CACHE_TTL = int(
+    os.environ.get("SLACK_CHANNEL_CACHE_TTL", 7 * 24 * 60 * 60)
+)  # seconds
+
+SNIPPET_CHUNK_SIZE = 64 * 1024
+SNIPPET_SPOOL_MAX_SIZE = 1024 * 1024  # bytes kept in memory before spooling
+
+_bot_user_ids: Dict[str, str] = {}
+
 
 @dataclass
 class Command:
@@ -19,17 +41,6 @@ class Command:
     optional_params: Optional[list] = None
     is_private: bool = False
 
-    def validate(self, params_dict):
-        if bool(self.required_params):
-            if len(params_dict) == 0:
-                raise ValueError(
-                    "Missing required parameters"
-                )  # provide a help message
-
-            for param in self.required_params:
-                if param not in params_dict:
-                    raise ValueError(f"Missing required parameter {param}")
-
 
 endpoint_mapping: Dict[EndpointName, Command] = {
     EndpointName.SERVICE_OWNERS: Command(is_private=True),
@@ -44,6 +55,7 @@ endpoint_mapping: Dict[EndpointName, Command] = {
             "search",
             "page",
             "page_size",
+            "all",
         ],
         is_private=True,
     ),
@@ -53,14 +65,21 @@ endpoint_mapping: Dict[EndpointName, Command] = {
     ),
     EndpointName.REPOS: Command(
         required_params=["username", "service"],
-        optional_params=["active", "names", "search", "page", "page_size"],
+        optional_params=[
+            "active",
+            "names",
+            "search",
+            "page",
+            "page_size",
+            "all",
+        ],
     ),
     EndpointName.REPO: Command(
         required_params=["username", "service", "repository"],
     ),
     EndpointName.BRANCHES: Command(
         required_params=["username", "service", "repository"],
-        optional_params=["author", "ordering", "page", "page_size"],
+        optional_params=["author", "ordering", "page", "page_size", "all"],
         is_private=True,
     ),
     EndpointName.BRANCH: Command(
@@ -69,14 +88,14 @@ endpoint_mapping: Dict[EndpointName, Command] = {
     ),
     EndpointName.COMMITS: Command(
         required_params=["username", "service", "repository"],
-        optional_params=["branch", "page", "page_size"],
+        optional_params=["branch", "page", "page_size", "all"],
     ),
     EndpointName.COMMIT: Command(
         required_params=["username", "service", "repository", "commitid"],
     ),
     EndpointName.PULLS: Command(
         required_params=["username", "service", "repository"],
-        optional_params=["ordering", "page", "page_size", "state"],
+        optional_params=["ordering", "page", "page_size", "state", "all"],
     ),
     EndpointName.PULL: Command(
         required_params=["username", "service", "repository", "pullid"],
@@ -88,7 +107,7 @@ endpoint_mapping: Dict[EndpointName, Command] = {
     ),
     EndpointName.FLAGS: Command(
         required_params=["username", "service", "repository"],
-        optional_params=["page", "page_size"],
+        optional_params=["page", "page_size", "all"],
         is_private=True,
     ),
     EndpointName.COVERAGE_TRENDS: Command(
@@ -153,6 +172,89 @@ endpoint_mapping: Dict[EndpointName, Command] = {
     EndpointName.NOTIFICATION: Command(
         required_params=["username", "service", "repository"],
     ),
+    EndpointName.SUMMARY: Command(
+        required_params=["username", "service", "repository"],
+        is_private=True,
+    ),
+}
+
+# key=value, key="value with spaces" or key='value', anywhere in the text,
+# Slack clients may turn the quotes into smart ones
+COMMAND_PARAM_PATTERN = re.compile(
+    r"(?:^|(?<=\s))(?P<key>\w[\w-]*)="
+    r"(?:\"(?P<double>[^\"]*)\"|'(?P<single>[^']*)'"
+    r"|“(?P<smart_double>[^”]*)”|‘(?P<smart_single>[^’]*)’"
+    r"|(?P<raw>\S*))"
+)
+QUOTES = ('"', "'", "“", "‘")
+
+
+def _quoted_params(text):
+    for match in COMMAND_PARAM_PATTERN.finditer(text):
+        key = match["key"]
+        raw = match["raw"]
+        if raw is None:
+            yield key, (
+                match["double"]
+                or match["single"]
+                or match["smart_double"]
+                or match["smart_single"]
+            )
+        elif raw.startswith(QUOTES):
+            raise ValueError(f"Missing closing quote for parameter {key}")
+        else:
+            yield key, raw
+
+
+@dataclass(frozen=True)
+class CommandParser:
+    """A command's params compiled for a single pass over the text"""
+
+    required_params: Tuple[str, ...]
+    optional_params: FrozenSet[str]
+
+    @classmethod
+    def compile(cls, command: Command) -> "CommandParser":
+        return cls(
+            required_params=tuple(command.required_params or ()),
+            optional_params=frozenset(command.optional_params or ()),
+        )
+
+    def parse(self, text) -> Tuple[Dict[str, str], Dict[str, str]]:
+        """Returns every param in `text` and the optional ones among them"""
+        params_dict = {}
+        optional_params = {}
+
+        if '"' in text or "'" in text or "“" in text or "‘" in text:
+            pairs = _quoted_params(text)
+        else:
+            # plain split is enough, and much cheaper, when nothing is quoted
+            pairs = [
+                token.split("=", 1) for token in text.split() if "=" in token
+            ]
+
+        for key, value in pairs:
+            if not value:
+                raise ValueError(f"Missing value for parameter {key}")
+
+            params_dict[key] = value
+            if key in self.optional_params:
+                optional_params[key] = value
+
+        missing = [p for p in self.required_params if p not in params_dict]
+        if len(missing) == 1:
+            raise ValueError(f"Missing required parameter {missing[0]}")
+        if missing:
+            raise ValueError(
+                f"Missing required parameters {', '.join(missing)}"
+            )
+
+        return params_dict, optional_params
+
+
+command_parsers: Dict[EndpointName, CommandParser] = {
+    command_name: CommandParser.compile(command)
+    for command_name, command in endpoint_mapping.items()
 }
 
 service_mapping = {
@@ -175,38 +277,17 @@ def validate_service(service):
     return normalized_name
 
 
-def extract_command_params(command, command_name):
-    params_dict = {}
-    command_text = command["text"].split(" ")
-
-    for param in command_text:
-        if "=" not in param:
-            continue
-
-        params_dict[param.split("=")[0]] = param.split("=")[1]
-
-    command = endpoint_mapping.get(command_name)
-    command.validate(params_dict)
-
-    return params_dict
-
-
-def extract_optional_params(params_dict, command_name):
-    endpoint = endpoint_mapping.get(command_name)
-
-    if not bool(endpoint.optional_params):
-        return {}
-
-    optional_params = {}
-
-    for key in endpoint.optional_params:
-        if key in params_dict:
-            optional_params[key] = params_dict.get(key)
-
-    return optional_params
+def parse_command(command, command_name):
+    """Returns the (params_dict, optional_params) of a slash command"""
+    return command_parsers[command_name].parse(command["text"])
 
 
 def format_nested_keys(data, formatted_data):
+    if data.get("truncated"):
+        formatted_data += (
+            f"⚠️ Results truncated: showing the first {data['shown']} of "
+            f"{data['count']}.\n\n"
+        )
     for res in data["results"]:
         for key in res:
             formatted_data += f"*{key.capitalize()}*: {res[key]}\n"
@@ -253,10 +334,11 @@ def channel_exists(client, channel_id):
         print(f"Error: {e}")
 
 
-def configure_notification(data):
-    installation = SlackInstallation.objects.get(
-        bot_token=data["slack__bot_token"],
-    )
+def configure_notification(data, installation=None):
+    if installation is None:
+        installation = SlackInstallation.objects.get(
+            bot_token=data["slack__bot_token"],
+        )
 
     notification, created = Notification.objects.get_or_create(
         repo=data["repository"],
@@ -265,14 +347,31 @@ def configure_notification(data):
     )
     channel_id = data["slack__channel_id"]
 
-    if notification.channels:
-        notification.channels.append(channel_id)
+    # appended in the UPDATE, so concurrent subscriptions aren't lost
+    Notification.objects.filter(pk=notification.pk).exclude(
+        channels__contains=[channel_id]
+    ).update(
+        channels=ArrayAppend("channels", Value(channel_id)),
+        updated_at=timezone.now(),
+    )
+    return f"Notifications for {data['repository']} enabled in this channel 📳."
 
-    else:
-        notification.channels = [channel_id]
 
-    notification.save()
-    return f"Notifications for {data['repository']} enabled in this channel 📳."
+def delete_unsubscribed_notifications(notifications):
+    """
+    Deletes the notifications among `notifications` left without channels.
+    They're locked first, a channel appended meanwhile is then seen and
+    the notification kept.
+    """
+    with transaction.atomic():
+        unsubscribed = list(
+            notifications.filter(channels=[])
+            .select_for_update()
+            .values_list("pk", flat=True)
+        )
+        if unsubscribed:
+            # their statuses go with them
+            Notification.objects.filter(pk__in=unsubscribed).delete()
 
 
 def format_comparison(comparison):
@@ -334,25 +433,146 @@ def format_comparison(comparison):
     return blocks
 
 
-def bot_is_member_of_channel(client, channel_id):
+def get_bot_user_id(client):
+    """The bot user behind a token never changes, so it's cached forever"""
+    bot_user_id = _bot_user_ids.get(client.token)
+    if bot_user_id is None:
+        bot_user_id = client.auth_test()["user_id"]
+        _bot_user_ids[client.token] = bot_user_id
+    return bot_user_id
+
+
+def _bot_membership_cache_key(team_id, channel_id):
+    return f"bot_membership:{team_id}:{channel_id}"
+
+
+def set_bot_channel_membership(team_id, channel_id, is_member: bool):
+    cache.set(
+        _bot_membership_cache_key(team_id, channel_id),
+        is_member,
+        BOT_MEMBERSHIP_CACHE_TTL,
+    )
+
+
+def bot_is_member_of_channel(client, channel_id, team_id=None):
+    cache_key = _bot_membership_cache_key(team_id, channel_id)
+    is_member = cache.get(cache_key)
+    if is_member is not None:
+        return is_member
+
     try:
-        auth_response = client.auth_test()
-        bot_user_id = auth_response["user_id"]
+        bot_user_id = get_bot_user_id(client)
 
-        response = client.conversations_members(channel=channel_id)
-        members = response["members"]
+        is_member = False
+        cursor = None
+        while True:
+            response = client.conversations_members(
+                channel=channel_id, cursor=cursor, limit=1000
+            )
+            if bot_user_id in response["members"]:
+                is_member = True
+                break
 
-        return bot_user_id in members
+            cursor = (response.get("response_metadata") or {}).get(
+                "next_cursor"
+            )
+            if not cursor:
+                break
     except SlackApiError as e:
         logger.error(
             f"Error checking channel membership: {e.response['error']}"
         )
         return False
 
+    set_bot_channel_membership(team_id, channel_id, is_member)
+    return is_member
 
-def send_not_member_response(response_url):
+
+def channel_is_im(client, channel_id):
+    """A channel never changes type, so the answer is cached for a week"""
+    cache_key = f"channel_is_im:{channel_id}"
+    is_im = cache.get(cache_key)
+    if is_im is None:
+        response = client.conversations_info(channel=channel_id)
+        is_im = response["channel"]["is_im"]
+        cache.set(cache_key, is_im, SLACK_CHANNEL_CACHE_TTL)
+    return is_im
+
+
+def get_dm_channel_id(client, user_id, team_id=None):
+    """The bot's DM with a user, cached per workspace like user ids"""
+    cache_key = f"dm_channel:{team_id}:{user_id}"
+    channel_id = cache.get(cache_key)
+    if channel_id is None:
+        response = client.conversations_open(users=user_id)
+        channel_id = response["channel"]["id"]
+        cache.set(cache_key, channel_id, SLACK_CHANNEL_CACHE_TTL)
+    return channel_id
+
+
+def _iter_chunks(content, chunk_size=SNIPPET_CHUNK_SIZE):
+    if isinstance(content, str):
+        for start in range(0, len(content), chunk_size):
+            yield content[start : start + chunk_size]
+    else:
+        yield from content
+
+
+def upload_snippet(client, channel_id, content, filename, title):
+    """
+    Uploads `content`, a string or an iterable of string chunks, as a snippet
+    shared in `channel_id` and returns its id. Chunks are spooled to disk past
+    SNIPPET_SPOOL_MAX_SIZE instead of joined into one string; files_upload_v2
+    still reads the spooled file once into the bytes it posts.
+    """
+    with SpooledTemporaryFile(max_size=SNIPPET_SPOOL_MAX_SIZE) as spool:
+        for chunk in _iter_chunks(content):
+            spool.write(chunk.encode("utf-8"))
+        spool.seek(0)
+
+        response = client.files_upload_v2(
+            channel=channel_id,
+            file=spool,
+            filename=filename,
+            title=title,
+            snippet_type="javascript",
+            # the completion already has the file id, skip the files.info call
+            request_file_info=False,
+        )
+    return response["files"][0]["id"]
+
+
+def loading_modal(title):
+    """Placeholder opened while the trigger_id is valid, see views_update"""
+    return message_modal(title, ":hourglass_flowing_sand: Loading...")
+
+
+def message_modal(title, text):
+    return {
+        "type": "modal",
+        "title": {"type": "plain_text", "text": title},
+        "close": {"type": "plain_text", "text": "Close"},
+        "blocks": [
+            {
+                "type": "section",
+                "text": {"type": "mrkdwn", "text": text},
+            }
+        ],
+    }
+
+
+def send_ephemeral_response(response_url, text, blocks=None):
     message = {
         "response_type": "ephemeral",
-        "text": "I'm not a member of this channel and can't send messages here. Please invite me to the channel using `/invite @Codecov`, or you can interact with me via direct message.",
+        "text": text,
     }
+    if blocks:
+        message["blocks"] = blocks
     requests.post(response_url, json=message)
+
+
+def send_not_member_response(response_url):
+    send_ephemeral_response(
+        response_url,
+        "I'm not a member of this channel and can't send messages here. Please invite me to the channel using `/invite @Codecov`, or you can interact with me via direct message.",
+    )
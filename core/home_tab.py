@@ -0,0 +1,195 @@
+import hashlib
+import json
+import os
+
+from django.core.cache import cache
+
+HOME_TAB_BLOCKS = [
+    {
+        "type": "section",
+        "text": {
+            "type": "mrkdwn",
+            "text": ":rocket: *Welcome to Codecov App for Slack* :rocket:\n\nTake control of your notifications and streamline your workflow. With just a few simple commands, you can enhance collaboration across multiple channels and repositories. Here's what you can do:",
+        },
+    },
+    {
+        "type": "section",
+        "text": {
+            "type": "mrkdwn",
+            "text": "1. Interact with Codecov Public API:\n- Explore the full potential of our app by interacting with Codecov public API. Simply use the `/codecov help` command to discover available features and commands.",
+        },
+    },
+    {
+        "type": "section",
+        "text": {
+            "type": "mrkdwn",
+            "text": "2. Redirect Notifications to Multiple Channels:\n- Use the command `/codecov notify` to effortlessly redirect notifications from multiple repositories to designated channels.",
+        },
+    },
+    {
+        "type": "section",
+        "text": {
+            "type": "mrkdwn",
+            "text": "3. Public Repo PR Notifications without Authentication:\n- No need to authenticate with external providers! With our app, you can receive notifications for pull requests from public repositories directly in Slack. Stay informed and collaborate seamlessly with your team.",
+        },
+    },
+    {
+        "type": "section",
+        "text": {
+            "type": "mrkdwn",
+            "text": "4. Access Private Data with Provider Authentication:\n- For more advanced commands that require access to private data, we've got you covered. Currently supporting GitHub authentication, you can securely connect your account to unlock additional functionalities and ensure data privacy using `/codecov login`.",
+        },
+    },
+    {"type": "divider"},
+    {
+        "type": "section",
+        "text": {
+            "type": "mrkdwn",
+            "text": "👇 Here are the list of the commands you can use:",
+        },
+    },
+    {
+        "type": "section",
+        "text": {
+            "type": "mrkdwn",
+            "text": "*Auth commands:*\n`/codecov login` - Login to a service\n`/codecov logout` - Logout of current active service\n",
+        },
+    },
+    {
+        "type": "section",
+        "text": {
+            "type": "mrkdwn",
+            "text": "*Users commands:*\n`/codecov organizations` - Get a list of organizations that user has access to\n`/codecov owner username=<org_name> service=<service>` - Get owner's information\n`/codecov users username=<org_name> service=<service>` Optional params: `is_admin=<is_admin> activated=<activated> page=<page> page_size=<page_size>` - Get a list of users for the specified owner\n",
+        },
+    },
+    {
+        "type": "section",
+        "text": {
+            "type": "mrkdwn",
+            "text": "*Repositories commands:*\n`/codecov repos username=<org_name> service=<service>` Optional params: `names=<names> active=<active> page=<page> page_size=<page_size>` - Get a list of repos for the specified owner\n`/codecov repo repository=<repository> username=<org_name> service=<service>` - Get repo information\n`/codecov repo-config username=<org_name> service=<service> repository=<repository>` - Get the repository configuration for the specified owner and repository\n`/codecov summary username=<org_name> service=<service> repository=<repository>` - Get the default branch coverage, open pulls and flags of a repository in one message\n",
+        },
+    },
+    {
+        "type": "section",
+        "text": {
+            "type": "mrkdwn",
+            "text": "*Branches commands:*\n`/codecov branches username=<org_name> service=<service> repository=<repository>` Optional params: `ordering=<ordering> author=<author> page=<page> page_size=<page_size>` - Get a list of branches for the repository\n`/codecov branch repository=<repository> username=<org_name> service=<service> branch=<branch>` - Get branch information\n",
+        },
+    },
+    {"type": "divider"},
+    {
+        "type": "section",
+        "text": {
+            "type": "mrkdwn",
+            "text": "*Commits commands:*\n`/codecov commits username=<org_name> service=<service> repository=<repository>` Optional params: `branch=<branch> page=<page> page_size=<page_size>` - Get a list of commits for the repository\n`/codecov commit repository=<repository> username=<org_name> service=<service> commitid=<commitid>` - Get commit information\n",
+        },
+    },
+    {"type": "divider"},
+    {
+        "type": "section",
+        "text": {
+            "type": "mrkdwn",
+            "text": "*Pulls commands:*\n`/codecov pulls username=<org_name> service=<service> repository=<repository>` Optional params: `ordering=<ordering> page=<page> page_size=<page_size> state=<closed,open,merged>` - Get a list of pulls for the repository\n`/codecov pull repository=<repository> username=<org_name> service=<service> pullid=<pullid>` - Get pull information\n",
+        },
+    },
+    {"type": "divider"},
+    {
+        "type": "section",
+        "text": {
+            "type": "mrkdwn",
+            "text": "*Components commands:*\n`/codecov components username=<org_name> service=<service> repository=<repository>` Optional params: `branch=<branch> sha=<sha>` - Gets a list of components for the specified repository\n\n",
+        },
+    },
+    {"type": "divider"},
+    {
+        "type": "section",
+        "text": {
+            "type": "mrkdwn",
+            "text": "*Flags commands:*\n`/codecov flags username=<org_name> service=<service> repository=<repository>` Optional params: `page=<page> page_size=<page_size>` - Gets a paginated list of flags for the specified repository\n`/codecov coverage-trends username=<org_name> service=<service> repository=<repository> flag=<flag>` Optional params: `page=<page> page_size=<page_size> start_date=<start_date> end_date=<end_date> branch=<branch> interval=<1d,30d,7d>`- Gets a paginated list of timeseries measurements aggregated by the specified interval\n\n",
+        },
+    },
+    {
+        "type": "context",
+        "elements": [
+            {
+                "type": "mrkdwn",
+                "text": "Add `all=true` to `users`, `repos`, `branches`, `commits`, `pulls` and `flags` to fetch every page instead of a single one.",
+            }
+        ],
+    },
+    {"type": "divider"},
+    {
+        "type": "section",
+        "text": {
+            "type": "mrkdwn",
+            "text": "*Comparison commands:*\n `/codecov compare username=<org_name> service=<service> repository=<repository>` - Get a comparison between two commits or a pull and its base\n`/codecov compare-component username=<org_name> service=<service> repository=<repository>` - Gets a component comparison\n`/codecov compare-file username=<org_name> service=<service> repository=<repository> path=<path>` - Gets a comparison for a specific file path\n`/codecov compare-flag username=<org_name> service=<service> repository=<repository>` - Get a flag comparison\n\n _*NOTE*_\n _You must either pass `pullid=<pullid>` or both of `head=<head> base=<base>` in the comparison commands_\n",
+        },
+    },
+    {"type": "divider"},
+    {
+        "type": "section",
+        "text": {
+            "type": "mrkdwn",
+            "text": "*Coverage commands:*\n`/codecov coverage-trend username=<org_name> service=<service> repository=<repository>` Optional params: `branch=<branch> end_date=<end_date> start_date=<start_date> interval=<1d,30d,7d> page=<page> page_size=<page_size>` - Get a paginated list of timeseries measurements aggregated by the specified interval\n`/codecov file-coverage-report repository=<repository> username=<org_name> service=<service> path=<path>` Optional params: `branch=<branch> sha=<sha>` - Get coverage info for a single file specified by path\n`/codecov commit-coverage-report repository=<repository> username=<org_name> service=<service>` Optional params: `path=<path> branch=<branch> sha=<sha> component_id=<component_id> flag=<flag>` - Get line-by-line coverage info (hit=0/miss=1/partial=2)\n`/codecov commit-coverage-totals repository=<repository> username=<org_name> service=<service> path=<path>` Optional params: `path=<path> branch=<branch> sha=<sha> component_id=<component_id> flag=<flag>` - Get the coverage totals for a given commit and the coverage totals broken down by file\n",
+        },
+    },
+    {"type": "divider"},
+    {
+        "type": "section",
+        "text": {
+            "type": "mrkdwn",
+            "text": "*Notifications commands 📳*:\n`/codecov notify username=<org_name> service=<service> repository=<repository>` - Direct Notifications for a specific repo to a specific channel\n`/codecov notify-off username=<org_name> service=<service> repository=<repository>` - Turn off Notifications for a specific repo in a specific channel\n",
+        },
+    },
+    {"type": "divider"},
+    {
+        "type": "section",
+        "text": {
+            "type": "mrkdwn",
+            "text": "Learn more about the Codecov API here:\n"
+            "<https://docs.codecov.io/reference|https://docs.codecov.io/reference>",
+        },
+    },
+    {
+        "type": "context",
+        "elements": [
+            {
+                "type": "mrkdwn",
+                "text": "Have questions or need assistance? Reach out to our friendly support team on https://codecov.freshdesk.com/support/home.",
+            }
+        ],
+    },
+]
+
+# the home tab is the same for everyone, so it's serialized and hashed once
+HOME_TAB_VIEW = {"type": "home", "blocks": HOME_TAB_BLOCKS}
+HOME_TAB_VIEW_VERSION = hashlib.sha256(
+    json.dumps(HOME_TAB_VIEW, sort_keys=True).encode("utf-8")
+).hexdigest()
+
+
+# a user whose entry expired just gets the same view published again
+HOME_TAB_CACHE_TTL = int(
+    os.environ.get("HOME_TAB_CACHE_TTL", 7 * 24 * 60 * 60)
+)  # seconds
+
+
+def _home_tab_cache_key(team_id, user_id):
+    return f"home_tab:{team_id}:{user_id}"
+
+
+def publish_home_tab(client, event, team_id=None):
+    """
+    Publishes the home tab unless this user already has the current version,
+    which is the case for nearly every app_home_opened event
+    """
+    user_id = event["user"]
+    cache_key = _home_tab_cache_key(team_id, user_id)
+
+    # no view in the event means nothing was ever published for this user
+    if event.get("view") and cache.get(cache_key) == HOME_TAB_VIEW_VERSION:
+        return False
+
+    client.views_publish(user_id=user_id, view=HOME_TAB_VIEW)
+    cache.set(cache_key, HOME_TAB_VIEW_VERSION, HOME_TAB_CACHE_TTL)
+    return True
@@ -0,0 +1,41 @@
+import logging
+import os
+
+from django.core.management.base import BaseCommand
+
+from core.models import PendingWorkspaceCleanup
+from core.slack_datastores import DjangoInstallationStore
+from core.workspace_cleanup import (WORKSPACE_CLEANUP_BATCH_SIZE,
+                                    cleanup_workspace)
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        "Deletes the data of uninstalled workspaces whose cleanup didn't"
+        " finish, meant to run periodically"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=WORKSPACE_CLEANUP_BATCH_SIZE,
+        )
+
+    def handle(self, *args, batch_size, **options):
+        store = DjangoInstallationStore(
+            client_id=os.environ.get("SLACK_CLIENT_ID"), logger=logger
+        )
+        cleaned = 0
+        for pending in PendingWorkspaceCleanup.objects.order_by("created_at"):
+            deleted = cleanup_workspace(pending.team_id, batch_size=batch_size)
+            if deleted is not None:
+                store.invalidate(
+                    enterprise_id=pending.enterprise_id,
+                    team_id=pending.team_id,
+                )
+                cleaned += 1
+
+        self.stdout.write(f"Cleaned up {cleaned} uninstalled workspaces")
@@ -0,0 +1,24 @@
+import logging
+
+from django.core.management.base import BaseCommand
+
+from core.slack_datastores import (SLACK_OAUTH_STATE_PURGE_BATCH_SIZE,
+                                   DjangoOAuthStateStore)
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Deletes expired Slack OAuth states, meant to run periodically"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=SLACK_OAUTH_STATE_PURGE_BATCH_SIZE,
+        )
+
+    def handle(self, *args, batch_size, **options):
+        store = DjangoOAuthStateStore(expiration_seconds=120, logger=logger)
+        purged = store.purge_expired(batch_size=batch_size)
+        self.stdout.write(f"Purged {purged} expired OAuth states")
@@ -0,0 +1,26 @@
+# Generated by Django 5.0.14 on 2026-10-19 04:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0006_notificationconfig_and_more"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="slackinstallation",
+            index=models.Index(
+                condition=models.Q(("bot_token__isnull", False)),
+                fields=[
+                    "client_id",
+                    "enterprise_id",
+                    "team_id",
+                    "-installed_at",
+                ],
+                name="slackinstallation_latest_bot",
+            ),
+        ),
+    ]
@@ -0,0 +1,121 @@
+# Generated by Django 5.0.14 on 2026-10-19 04:09
+
+from django.db import migrations, models
+
+# both channel lists, without duplicates
+CHANNELS_UNION = "ARRAY(SELECT DISTINCT unnest(array_cat(%(expressions)s)))"
+
+
+def merge_notifications(apps, installation, keep):
+    """
+    Moves the notifications and notification configs of `installation` to
+    `keep`. Where `keep` already has one for the same repo, the channels
+    and statuses are merged into it instead.
+    """
+    Notification = apps.get_model("core", "Notification")
+    NotificationStatus = apps.get_model("core", "NotificationStatus")
+    NotificationConfig = apps.get_model("core", "NotificationConfig")
+    NotificationConfigStatus = apps.get_model(
+        "core", "NotificationConfigStatus"
+    )
+
+    for notification in Notification.objects.filter(installation=installation):
+        kept = Notification.objects.filter(
+            installation=keep,
+            repo=notification.repo,
+            owner=notification.owner,
+        ).first()
+        if kept is None:
+            notification.installation = keep
+            notification.save(update_fields=["installation"])
+            continue
+
+        Notification.objects.filter(pk=kept.pk).update(
+            channels=models.Func(
+                models.F("channels"),
+                models.Value(
+                    notification.channels or [],
+                    output_field=Notification._meta.get_field("channels"),
+                ),
+                template=CHANNELS_UNION,
+                output_field=Notification._meta.get_field("channels"),
+            )
+        )
+        NotificationStatus.objects.filter(notification=notification).update(
+            notification=kept
+        )
+        notification.delete()
+
+    for config in NotificationConfig.objects.filter(installation=installation):
+        kept = NotificationConfig.objects.filter(
+            installation=keep,
+            repo=config.repo,
+            owner=config.owner,
+            channel=config.channel,
+        ).first()
+        if kept is None:
+            config.installation = keep
+            config.save(update_fields=["installation"])
+            continue
+
+        NotificationConfigStatus.objects.filter(
+            notification_config=config
+        ).update(notification_config=kept)
+        config.delete()
+
+
+def remove_duplicate_teams(apps, schema_editor):
+    """
+    Keeps the latest installation and bot of each team, and merges the
+    notifications of the older installations into the kept one.
+    """
+    SlackBot = apps.get_model("core", "SlackBot")
+    SlackInstallation = apps.get_model("core", "SlackInstallation")
+
+    for model in (SlackBot, SlackInstallation):
+        duplicate_teams = (
+            model.objects.exclude(team_id=None)
+            .values("team_id")
+            .annotate(rows=models.Count("id"))
+            .filter(rows__gt=1)
+            .values_list("team_id", flat=True)
+        )
+        for team_id in duplicate_teams:
+            keep, *older = model.objects.filter(team_id=team_id).order_by(
+                "-installed_at", "-id"
+            )
+            if model is SlackInstallation:
+                for installation in older:
+                    merge_notifications(apps, installation, keep)
+
+            model.objects.filter(id__in=[row.id for row in older]).delete()
+
+    # run the deferred foreign key checks of the deletes now, Postgres
+    # won't alter a table with pending trigger events
+    schema_editor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+    schema_editor.execute("SET CONSTRAINTS ALL DEFERRED")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0007_slackinstallation_latest_bot_idx"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            remove_duplicate_teams, migrations.RunPython.noop
+        ),
+        migrations.AddConstraint(
+            model_name="slackbot",
+            constraint=models.UniqueConstraint(
+                fields=("team_id",), name="unique_slackbot_team"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="slackinstallation",
+            constraint=models.UniqueConstraint(
+                fields=("team_id",), name="unique_slackinstallation_team"
+            ),
+        ),
+    ]
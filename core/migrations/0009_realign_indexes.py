@@ -0,0 +1,38 @@
+# Generated by Django 5.0.14 on 2026-10-19 04:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0008_unique_installation_team"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="notification",
+            name="core_notifi_install_7fc51b_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="notificationconfig",
+            name="core_notifi_install_8ea80a_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="notificationstatus",
+            name="core_notifi_notific_7aa2e0_idx",
+        ),
+        migrations.AddIndex(
+            model_name="notification",
+            index=models.Index(
+                fields=["repo", "owner"], name="notification_repo_owner"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="notificationstatus",
+            index=models.Index(
+                fields=["notification", "pullid", "channel"],
+                name="notificationstatus_message",
+            ),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.0.14 on 2026-10-19 04:17
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0009_realign_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="notification",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["channels"], name="notification_channels"
+            ),
+        ),
+    ]
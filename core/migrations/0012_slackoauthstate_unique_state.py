@@ -0,0 +1,23 @@
+# Generated by Django 5.0.14 on 2026-10-19 04:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0011_cache_tables"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="slackoauthstate",
+            name="core_slacko_state_dbac4e_idx",
+        ),
+        migrations.AddConstraint(
+            model_name="slackoauthstate",
+            constraint=models.UniqueConstraint(
+                fields=("state",), name="unique_slackoauthstate_state"
+            ),
+        ),
+    ]
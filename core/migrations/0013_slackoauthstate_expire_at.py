@@ -0,0 +1,19 @@
+# Generated by Django 5.0.14 on 2026-10-19 04:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0012_slackoauthstate_unique_state"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="slackoauthstate",
+            index=models.Index(
+                fields=["expire_at"], name="slackoauthstate_expire_at"
+            ),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.0.14 on 2026-10-19 04:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0013_slackoauthstate_expire_at"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PendingWorkspaceCleanup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("team_id", models.CharField(max_length=32)),
+                ("enterprise_id", models.CharField(max_length=32, null=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="pendingworkspacecleanup",
+            constraint=models.UniqueConstraint(
+                fields=("team_id",), name="unique_pendingworkspacecleanup_team"
+            ),
+        ),
+    ]
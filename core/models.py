@@ -1,5 +1,7 @@
 from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
+from django.db.models import Func, Q
 from django.utils import timezone
 
 
@@ -42,6 +44,11 @@ class SlackBot(models.Model):
                 ]
             ),
         ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["team_id"], name="unique_slackbot_team"
+            ),
+        ]
 
 
 class SlackInstallation(models.Model):
@@ -82,16 +89,39 @@ class SlackInstallation(models.Model):
                     "installed_at",
                 ]
             ),
+            # latest bot token of a workspace, looked up on every
+            # authorization
+            models.Index(
+                fields=[
+                    "client_id",
+                    "enterprise_id",
+                    "team_id",
+                    "-installed_at",
+                ],
+                name="slackinstallation_latest_bot",
+                condition=Q(bot_token__isnull=False),
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["team_id"], name="unique_slackinstallation_team"
+            ),
         ]
 
 
 class SlackOAuthState(models.Model):
     class Meta:
+        # the unique constraint's index serves lookups as well, and makes
+        # recording a consumed signed state single use
+        constraints = [
+            models.UniqueConstraint(
+                fields=["state"], name="unique_slackoauthstate_state"
+            ),
+        ]
         indexes = [
+            # expired states, deleted in batches by purge_oauth_states
             models.Index(
-                fields=[
-                    "state",
-                ]
+                fields=["expire_at"], name="slackoauthstate_expire_at"
             ),
         ]
 
@@ -99,9 +129,42 @@ class SlackOAuthState(models.Model):
     expire_at = models.DateTimeField(null=False)
 
 
+class PendingWorkspaceCleanup(models.Model):
+    """
+    A workspace that uninstalled the app and whose data isn't deleted yet.
+    The row outlives a worker restart, so the cleanup_workspaces command
+    can finish what an interrupted cleanup started.
+    """
+
+    team_id = models.CharField(null=False, max_length=32)
+    enterprise_id = models.CharField(null=True, max_length=32)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["team_id"], name="unique_pendingworkspacecleanup_team"
+            ),
+        ]
+
+
 CHANNEL_ID_LENGTH = 21
 
 
+class ArrayAppend(Func):
+    """Adds a channel to a channels array in the UPDATE itself"""
+
+    function = "array_append"
+    output_field = ArrayField(models.CharField(max_length=CHANNEL_ID_LENGTH))
+
+
+class ArrayRemove(Func):
+    """Removes a channel from a channels array in the UPDATE itself"""
+
+    function = "array_remove"
+    output_field = ArrayField(models.CharField(max_length=CHANNEL_ID_LENGTH))
+
+
 class Notification(models.Model):
     installation = models.ForeignKey(
         SlackInstallation,
@@ -121,15 +184,15 @@ class Notification(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
+        # the unique constraint's index serves lookups by installation
         unique_together = (("installation", "repo", "owner"),)
         indexes = [
+            # notifications to send for a repo, on every Codecov upload
             models.Index(
-                fields=[
-                    "installation",
-                    "repo",
-                    "owner",
-                ]
-            )
+                fields=["repo", "owner"], name="notification_repo_owner"
+            ),
+            # what a channel is subscribed to (channels__contains)
+            GinIndex(fields=["channels"], name="notification_channels"),
         ]
 
 
@@ -158,8 +221,10 @@ class NotificationStatus(models.Model):
 
     class Meta:
         indexes = [
+            # get_or_create of a pull's message in a channel
             models.Index(
-                fields=["notification", "status", "pullid", "channel"]
+                fields=["notification", "pullid", "channel"],
+                name="notificationstatus_message",
             )
         ]
 
@@ -182,10 +247,8 @@ class NotificationConfig(models.Model):
     )
 
     class Meta:
+        # the unique constraint's index serves lookups as well
         unique_together = (("installation", "repo", "owner", "channel"),)
-        indexes = [
-            models.Index(fields=["installation", "repo", "owner", "channel"])
-        ]
 
 
 class NotificationConfigStatus(models.Model):
@@ -1,24 +1,31 @@
 import json
 import logging
 
-from slack_sdk.errors import SlackApiError
-
-from core.helpers import (configure_notification, endpoint_mapping,
-                          extract_command_params, extract_optional_params,
-                          format_nested_keys, validate_comparison_params,
-                          validate_service)
-from core.models import Notification, SlackInstallation
-from service_auth.actions import (authenticate_command,
-                                  get_or_create_slack_user,
+from django.db.models import Value
+from django.utils import timezone
+from slack_sdk.errors import SlackClientError
+
+from core.helpers import (channel_is_im, configure_notification,
+                          delete_unsubscribed_notifications, endpoint_mapping,
+                          format_nested_keys, get_dm_channel_id, loading_modal,
+                          message_modal, parse_command,
+                          send_ephemeral_response, upload_snippet,
+                          validate_comparison_params, validate_service)
+from core.models import ArrayRemove, Notification
+from service_auth.actions import (authenticate_command, get_cached_slack_user,
+                                  handle_codecov_public_api_paginated_request,
                                   handle_codecov_public_api_request,
+                                  handle_codecov_public_api_requests,
                                   view_login_modal)
-from service_auth.models import Service
 
+from .context import CommandContext
 from .enums import EndpointName
+from .result_pages import paginate_text, result_page_blocks, store_result_pages
 
 logger = logging.getLogger(__name__)
 
 SIZE_THRESHOLD = 4000
+NOTIFICATION_MODAL_TITLE = "Codecov Notifications"
 
 
 class BaseResolver:
@@ -28,22 +35,20 @@ class BaseResolver:
         self.client = client
         self.command = command
         self.say = say
+        self.context = CommandContext(client, command)
 
     def __call__(self):
         try:
             command = endpoint_mapping.get(self.command_name)
             if command.is_private:
-                authenticate_command(
+                self.context.slack_user = authenticate_command(
                     client=self.client,
                     command=self.command,
                 )
 
-            params_dict = extract_command_params(
+            params_dict, optional_params = parse_command(
                 command=self.command, command_name=self.command_name
             )
-            optional_params = extract_optional_params(
-                params_dict, command_name=self.command_name
-            )
             service = params_dict.get("service")
             if service:
                 normalized_service = validate_service(service)
@@ -53,87 +58,107 @@ class BaseResolver:
 
             if res:
                 if len(res) > SIZE_THRESHOLD:
-                    self.post_snippet(res)
+                    self.post_large_response(res)
                 else:
-                    self.client.chat_postEphemeral(
-                        channel=self.command["channel_id"],
-                        user=self.command["user_id"],
-                        text=res,
-                    )
+                    self.respond(res)
 
         except Exception as e:
             logger.error(e)
 
-            self.client.chat_postEphemeral(
-                channel=self.command["channel_id"],
-                user=self.command["user_id"],
-                text=f"{e if e else 'There was an error processing your request. Please try again later.'}",
+            self.respond(
+                f"{e if e else 'There was an error processing your request. Please try again later.'}"
             )
 
     def resolve(self, *args, **kwargs):
         raise NotImplementedError("must implement resolve in subclass")
 
+    def respond(self, text, blocks=None):
+        # commands run in the background, answer through the command's
+        # response_url instead of the Web API
+        send_ephemeral_response(
+            self.command["response_url"], text, blocks=blocks
+        )
+
+    def post_large_response(self, message):
+        self.post_snippet(message)
+
     def post_snippet(self, message):
+        channel_id = self.command["channel_id"]
+        user_id = self.command["user_id"]
         try:
-            response = self.client.conversations_info(
-                channel=self.command["channel_id"]
-            )
-            channel = response["channel"]
-
             # Check if it's not a DM with App
-            if not channel["is_im"]:
-                self.client.chat_postEphemeral(
-                    channel=self.command["channel_id"],
-                    user=self.command["user_id"],
-                    text=f"Response too large to display here. you can find it in the Codecov app's DMs",
+            if channel_is_im(self.client, channel_id):
+                dm_channel_id = channel_id
+            else:
+                self.respond(
+                    f"Response too large to display here. you can find it in the Codecov app's DMs"
+                )
+                dm_channel_id = get_dm_channel_id(
+                    self.client, user_id, team_id=self.command.get("team_id")
                 )
 
             # Upload the file to bot's direct message
-            response = self.client.files_upload(
-                channels=self.command["user_id"],
-                content=message,
-                filetype="javascript",
+            file_id = upload_snippet(
+                self.client,
+                dm_channel_id,
+                message,
                 filename="codecov.json",
                 title="Codecov JSON",
             )
+            logger.info(f"File {file_id} uploaded successfully")
+
+        except SlackClientError as e:
+            logger.error(f"Error uploading snippet for {user_id}: {e}")
 
-            if response["ok"]:
-                file_id = response["file"]["id"]
-                print(f"File {file_id} uploaded successfully!")
-            else:
-                print(
-                    f"Failed to upload the file. Error: {response['error']} {file_id}"
-                )
 
-        except SlackApiError as e:
-            print(f"Error posting message: {e}")
+class PaginatedResolver(BaseResolver):
+    """Base for list commands, `all=true` fetches every page instead of one"""
+
+    def post_large_response(self, message):
+        # browsable pages instead of a file, the pages are cached so moving
+        # between them doesn't call Codecov again
+        pages = paginate_text(message)
+        cursor = store_result_pages(pages)
+        self.respond(pages[0], blocks=result_page_blocks(cursor, 0))
+
+    def fetch(self, params_dict, optional_params):
+        fetch_all = str(optional_params.pop("all", "")).lower() == "true"
+        request = (
+            handle_codecov_public_api_paginated_request
+            if fetch_all
+            else handle_codecov_public_api_request
+        )
+
+        return request(
+            user_id=self.command["user_id"],
+            slack_user=self.context.slack_user,
+            endpoint_name=self.command_name,
+            service=params_dict.get("service"),
+            params_dict=params_dict,
+            optional_params=optional_params,
+        )
 
 
 def resolve_service_logout(client, command, say):
     """Logout of current active service"""
     slack_user_id = command["user_id"]
-    user_info = client.users_info(user=slack_user_id)
-
-    user = get_or_create_slack_user(user_info)
+    user = get_cached_slack_user(client, slack_user_id)
     if user.active_service is None:
-        client.chat_postEphemeral(
-            channel=command["channel_id"],
-            user=slack_user_id,
-            text="You are not logged in to any service",
+        send_ephemeral_response(
+            command["response_url"], "You are not logged in to any service"
         )
         return
 
-    service = Service.objects.get(user=user, name=user.active_service)
+    service = user.active_service
     service.active = False
     service.save()
 
     user.codecov_access_token = None
+    user.codecov_access_token_verified_at = None
     user.save()
 
-    client.chat_postEphemeral(
-        channel=command["channel_id"],
-        user=slack_user_id,
-        text=f"Successfully logged out of {service.name}",
+    send_ephemeral_response(
+        command["response_url"], f"Successfully logged out of {service.name}"
     )
 
 
@@ -141,6 +166,9 @@ def resolve_service_login(client, command, say):
     """Login to a service -- overrides current active service"""
 
     view_login_modal(client, command)
+    # the trigger_id expires within seconds, so the user is only created or
+    # refreshed once the modal is open
+    get_cached_slack_user(client, command["user_id"])
 
 
 class OrgsResolver(BaseResolver):
@@ -151,6 +179,7 @@ class OrgsResolver(BaseResolver):
     def resolve(self, params_dict, optional_params):
         data = handle_codecov_public_api_request(
             user_id=self.command["user_id"],
+            slack_user=self.context.slack_user,
             endpoint_name=self.command_name,
         )
 
@@ -171,6 +200,7 @@ class OwnerResolver(BaseResolver):
     def resolve(self, params_dict, optional_params):
         data = handle_codecov_public_api_request(
             user_id=self.command["user_id"],
+            slack_user=self.context.slack_user,
             endpoint_name=self.command_name,
             service=params_dict.get("service"),
             params_dict=params_dict,
@@ -203,7 +233,7 @@ def resolve_help(channel_id, user_id, client):
             "type": "section",
             "text": {
                 "type": "mrkdwn",
-                "text": "`/codecov organizations` - Get a list of organizations that user has access to\n\n`/codecov commits username=<org_name> service=<service> repository=<repository>` Optional params: `branch=<branch> page=<page> page_size=<page_size>` - Get a list of commits for the repository\n\n`/codecov pulls username=<org_name> service=<service> repository=<repository>` Optional params: `ordering=<ordering> page=<page> page_size=<page_size> state=<closed,open,merged>` - Get a list of pulls for the repository\n\n`/codecov repos username=<org_name> service=<service>` Optional params: `names=<names> active=<active> page=<page> page_size=<page_size>` - Get a list of repos for the specified owner\n\n`/codecov compare username=<org_name> service=<service> repository=<repository>` - Get a comparison between two commits or a pull and its base\n\n _*NOTE*_\n _You must either pass `pullid=<pullid>` or both of `head=<head> base=<base>` in the comparison commands_\n",
+                "text": "`/codecov organizations` - Get a list of organizations that user has access to\n\n`/codecov summary username=<org_name> service=<service> repository=<repository>` - Get the default branch coverage, open pulls and flags of a repository in one message\n\n`/codecov commits username=<org_name> service=<service> repository=<repository>` Optional params: `branch=<branch> page=<page> page_size=<page_size>` - Get a list of commits for the repository\n\n`/codecov pulls username=<org_name> service=<service> repository=<repository>` Optional params: `ordering=<ordering> page=<page> page_size=<page_size> state=<closed,open,merged>` - Get a list of pulls for the repository\n\n`/codecov repos username=<org_name> service=<service>` Optional params: `names=<names> active=<active> page=<page> page_size=<page_size>` - Get a list of repos for the specified owner\n\n`/codecov compare username=<org_name> service=<service> repository=<repository>` - Get a comparison between two commits or a pull and its base\n\n _*NOTE*_\n _You must either pass `pullid=<pullid>` or both of `head=<head> base=<base>` in the comparison commands_\n _Add `all=true` to the list commands to fetch every page instead of a single one_\n",
             },
         },
         {"type": "divider"},
@@ -240,19 +270,13 @@ def resolve_help(channel_id, user_id, client):
     )
 
 
-class UsersResolver(BaseResolver):
+class UsersResolver(PaginatedResolver):
     """Returns a paginated list of users for the specified owner"""
 
     command_name = EndpointName.USERS_LIST
 
     def resolve(self, params_dict, optional_params):
-        data = handle_codecov_public_api_request(
-            user_id=self.command["user_id"],
-            endpoint_name=self.command_name,
-            service=params_dict.get("service"),
-            optional_params=optional_params,
-            params_dict=params_dict,
-        )
+        data = self.fetch(params_dict, optional_params)
 
         owner_username = params_dict.get("username")
         if data["count"] == 0:
@@ -270,6 +294,7 @@ class RepoConfigResolver(BaseResolver):
     def resolve(self, params_dict, optional_params):
         data = handle_codecov_public_api_request(
             user_id=self.command["user_id"],
+            slack_user=self.context.slack_user,
             endpoint_name=self.command_name,
             service=params_dict.get("service"),
             params_dict=params_dict,
@@ -290,6 +315,7 @@ class RepoResolver(BaseResolver):
     def resolve(self, params_dict, optional_params):
         data = handle_codecov_public_api_request(
             user_id=self.command["user_id"],
+            slack_user=self.context.slack_user,
             endpoint_name=self.command_name,
             service=params_dict.get("service"),
             params_dict=params_dict,
@@ -303,19 +329,13 @@ class RepoResolver(BaseResolver):
         return formatted_data
 
 
-class ReposResolver(BaseResolver):
+class ReposResolver(PaginatedResolver):
     """Returns a paginated list of repositories for the specified owner"""
 
     command_name = EndpointName.REPOS
 
     def resolve(self, params_dict, optional_params):
-        data = handle_codecov_public_api_request(
-            user_id=self.command["user_id"],
-            endpoint_name=self.command_name,
-            service=params_dict.get("service"),
-            params_dict=params_dict,
-            optional_params=optional_params,
-        )
+        data = self.fetch(params_dict, optional_params)
 
         owner_username = params_dict.get("username")
 
@@ -328,18 +348,13 @@ class ReposResolver(BaseResolver):
         return format_nested_keys(data, formatted_data)
 
 
-class BranchesResolver(BaseResolver):
+class BranchesResolver(PaginatedResolver):
     """Returns a paginated list of branches for the specified owner and repository"""
 
     command_name = EndpointName.BRANCHES
 
     def resolve(self, params_dict, optional_params):
-        data = handle_codecov_public_api_request(
-            user_id=self.command["user_id"],
-            endpoint_name=self.command_name,
-            service=params_dict.get("service"),
-            params_dict=params_dict,
-        )
+        data = self.fetch(params_dict, optional_params)
 
         repo = params_dict.get("repository")
         if data["count"] == 0:
@@ -357,6 +372,7 @@ class BranchResolver(BaseResolver):
     def resolve(self, params_dict, optional_params):
         data = handle_codecov_public_api_request(
             user_id=self.command["user_id"],
+            slack_user=self.context.slack_user,
             endpoint_name=self.command_name,
             service=params_dict.get("service"),
             params_dict=params_dict,
@@ -375,19 +391,13 @@ class BranchResolver(BaseResolver):
         return f"Branch {branch} found for {repo} \n\n{formatted_data}"
 
 
-class CommitsResolver(BaseResolver):
+class CommitsResolver(PaginatedResolver):
     """Returns a paginated list of commits for the specified owner and repository"""
 
     command_name = EndpointName.COMMITS
 
     def resolve(self, params_dict, optional_params):
-        data = handle_codecov_public_api_request(
-            user_id=self.command["user_id"],
-            endpoint_name=self.command_name,
-            service=params_dict.get("service"),
-            params_dict=params_dict,
-            optional_params=optional_params,
-        )
+        data = self.fetch(params_dict, optional_params)
 
         repo = params_dict.get("repository")
         if data["count"] == 0:
@@ -405,6 +415,7 @@ class CommitResolver(BaseResolver):
     def resolve(self, params_dict, optional_params):
         data = handle_codecov_public_api_request(
             user_id=self.command["user_id"],
+            slack_user=self.context.slack_user,
             endpoint_name=self.command_name,
             service=params_dict.get("service"),
             params_dict=params_dict,
@@ -421,19 +432,13 @@ class CommitResolver(BaseResolver):
         return formatted_data
 
 
-class PullsResolver(BaseResolver):
+class PullsResolver(PaginatedResolver):
     """Returns a paginated list of pull requests for the specified owner and repository"""
 
     command_name = EndpointName.PULLS
 
     def resolve(self, params_dict, optional_params):
-        data = handle_codecov_public_api_request(
-            user_id=self.command["user_id"],
-            endpoint_name=self.command_name,
-            service=params_dict.get("service"),
-            params_dict=params_dict,
-            optional_params=optional_params,
-        )
+        data = self.fetch(params_dict, optional_params)
 
         repo = params_dict.get("repository")
         if data["count"] == 0:
@@ -451,6 +456,7 @@ class PullResolver(BaseResolver):
     def resolve(self, params_dict, optional_params):
         data = handle_codecov_public_api_request(
             user_id=self.command["user_id"],
+            slack_user=self.context.slack_user,
             endpoint_name=self.command_name,
             service=params_dict.get("service"),
             params_dict=params_dict,
@@ -475,6 +481,7 @@ class ComponentsResolver(BaseResolver):
     def resolve(self, params_dict, optional_params):
         data = handle_codecov_public_api_request(
             user_id=self.command["user_id"],
+            slack_user=self.context.slack_user,
             endpoint_name=self.command_name,
             service=params_dict.get("service"),
             params_dict=params_dict,
@@ -498,14 +505,15 @@ class ComponentsResolver(BaseResolver):
 class ComparisonResolver(BaseResolver):
     """Gets a comparison for all types of comparisons"""
 
-    def __init__(self, command, client, say, command_name):
-        super().__init__(command, client, say)
+    def __init__(self, client, command, say, command_name):
+        super().__init__(client, command, say)
         self.command_name = command_name
 
     def resolve(self, params_dict, optional_params):
         validate_comparison_params(optional_params)
         data = handle_codecov_public_api_request(
             user_id=self.command["user_id"],
+            slack_user=self.context.slack_user,
             endpoint_name=self.command_name,
             service=params_dict.get("service"),
             params_dict=params_dict,
@@ -527,19 +535,14 @@ class ComparisonResolver(BaseResolver):
 
         return f"{title}\n\n{json.dumps(data, indent=4, sort_keys=True)}"
 
-class FlagsResolver(BaseResolver):
+
+class FlagsResolver(PaginatedResolver):
     """Returns a paginated list of flags for the specified owner and repository"""
 
     command_name = EndpointName.FLAGS
 
     def resolve(self, params_dict, optional_params):
-        data = handle_codecov_public_api_request(
-            user_id=self.command["user_id"],
-            endpoint_name=self.command_name,
-            service=params_dict.get("service"),
-            params_dict=params_dict,
-            optional_params=optional_params,
-        )
+        data = self.fetch(params_dict, optional_params)
 
         repo = params_dict.get("repository")
         if data["count"] == 0:
@@ -560,6 +563,7 @@ class CoverageTrendsResolver(BaseResolver):
 
         data = handle_codecov_public_api_request(
             user_id=self.command["user_id"],
+            slack_user=self.context.slack_user,
             endpoint_name=self.command_name,
             service=params_dict.get("service"),
             params_dict=params_dict,
@@ -583,6 +587,7 @@ class CoverageTrendResolver(BaseResolver):
         optional_params["interval"] = "1d"
         data = handle_codecov_public_api_request(
             user_id=self.command["user_id"],
+            slack_user=self.context.slack_user,
             endpoint_name=self.command_name,
             params_dict=params_dict,
             optional_params=optional_params,
@@ -604,6 +609,7 @@ class FileCoverageReport(BaseResolver):
     def resolve(self, params_dict, optional_params):
         data = handle_codecov_public_api_request(
             user_id=self.command["user_id"],
+            slack_user=self.context.slack_user,
             endpoint_name=self.command_name,
             params_dict=params_dict,
             optional_params=optional_params,
@@ -629,6 +635,7 @@ class CommitCoverageReport(BaseResolver):
     def resolve(self, params_dict, optional_params):
         data = handle_codecov_public_api_request(
             user_id=self.command["user_id"],
+            slack_user=self.context.slack_user,
             endpoint_name=self.command_name,
             params_dict=params_dict,
             optional_params=optional_params,
@@ -655,6 +662,7 @@ class CommitCoverageTotals(BaseResolver):
     def resolve(self, params_dict, optional_params):
         data = handle_codecov_public_api_request(
             user_id=self.command["user_id"],
+            slack_user=self.context.slack_user,
             endpoint_name=self.command_name,
             params_dict=params_dict,
             optional_params=optional_params,
@@ -673,57 +681,137 @@ class CommitCoverageTotals(BaseResolver):
         return formatted_data
 
 
+SUMMARY_LIST_LIMIT = 5
+
+
+class SummaryResolver(BaseResolver):
+    """Returns an overview of the repository, its default branch coverage, open pulls and flags"""
+
+    command_name = EndpointName.SUMMARY
+
+    def resolve(self, params_dict, optional_params):
+        data = handle_codecov_public_api_requests(
+            user_id=self.command["user_id"],
+            slack_user=self.context.slack_user,
+            endpoints={
+                "repo": (EndpointName.REPO, None),
+                "totals": (EndpointName.COMMIT_COVERAGE_TOTALS, None),
+                "pulls": (EndpointName.PULLS, {"state": "open"}),
+                "flags": (EndpointName.FLAGS, None),
+            },
+            service=params_dict.get("service"),
+            params_dict=params_dict,
+        )
+
+        repo = data["repo"]
+        if isinstance(repo, Exception):
+            raise repo
+
+        formatted_data = f"*Summary for {params_dict.get('repository')}*\n\n"
+        formatted_data += f"Default branch: {repo.get('branch')}\n"
+
+        totals = data["totals"]
+        if isinstance(totals, Exception):
+            formatted_data += "Coverage: unavailable\n"
+        else:
+            coverage = (totals.get("totals") or {}).get("coverage")
+            formatted_data += f"Coverage: {coverage}%\n"
+
+        pulls = data["pulls"]
+        if isinstance(pulls, Exception):
+            formatted_data += "Open pulls: unavailable\n"
+        else:
+            formatted_data += f"Open pulls: {pulls.get('count')}\n"
+            for pull in pulls.get("results", [])[:SUMMARY_LIST_LIMIT]:
+                formatted_data += (
+                    f"    #{pull.get('pullid')} {pull.get('title')}\n"
+                )
+
+        flags = data["flags"]
+        if isinstance(flags, Exception):
+            formatted_data += "Flags: unavailable\n"
+        else:
+            formatted_data += f"Flags: {flags.get('count')}\n"
+            for flag in flags.get("results", [])[:SUMMARY_LIST_LIMIT]:
+                formatted_data += (
+                    f"    {flag.get('flag_name')}: {flag.get('coverage')}%\n"
+                )
+
+        return formatted_data
+
+
+def open_notification_modal(client, command):
+    """
+    Opens the /codecov notify modal in a loading state and returns its view
+    id. The trigger_id expires within seconds, so this runs on the request
+    thread and the queued command fills the modal in.
+    """
+    response = client.views_open(
+        trigger_id=command["trigger_id"],
+        view=loading_modal(NOTIFICATION_MODAL_TITLE),
+    )
+    return response["view"]["id"]
+
+
 class NotificationResolver(BaseResolver):
     """Saves a user's notification preferences for a repository"""
 
     def __init__(self, command, client, say, notify=False):
         super().__init__(client, command, say)
         self.notify = notify
+        # opened on the request thread by open_notification_modal
+        self.view_id = command.get("view_id")
 
     command_name = EndpointName.NOTIFICATION
 
+    def respond(self, text, blocks=None):
+        super().respond(text, blocks=blocks)
+        if self.view_id:
+            # replaces the loading modal the command was opened with
+            self.client.views_update(
+                view_id=self.view_id,
+                view=message_modal(NOTIFICATION_MODAL_TITLE, text),
+            )
+
     def resolve(self, params_dict, optional_params):
         bot_token = self.client.token
         user_id = self.command["user_id"]
         channel_id = self.command["channel_id"]
-        installation = SlackInstallation.objects.get(
-            bot_token=bot_token,
-        )
+        installation = self.context.installation
 
-        notification = Notification.objects.filter(
+        notifications = Notification.objects.filter(
             repo=params_dict["repository"],
             owner=params_dict["username"],
             installation=installation,
-        ).first()
+        )
+        subscribed = notifications.filter(channels__contains=[channel_id])
 
         # Disable notifications
         if not self.notify:
-            if not notification:
-                return f"Notification is not enabled for {params_dict['repository']} in this channel 👀"
-
-            if not (channel_id in notification.channels):
+            # removed in the UPDATE, so concurrent changes aren't lost
+            disabled = subscribed.update(
+                channels=ArrayRemove("channels", Value(channel_id)),
+                updated_at=timezone.now(),
+            )
+            if not disabled:
                 return f"Notification is not enabled for {params_dict['repository']} in this channel 👀"
 
-            notification.channels.remove(channel_id)
-            notification.save()
-
-            if not notification.channels:
-                # No channels left, delete notification
-                notification.delete()
+            # No channels left, delete notification
+            delete_unsubscribed_notifications(notifications)
 
             return f"Notifications disabled for {params_dict['repository']} in this channel 📴"
 
         # Notification already exists
-        if notification:
-            if notification.channels and channel_id in notification.channels:
-                return f"Notification already enabled for {params_dict['repository']} in this channel 👀"
+        if subscribed.exists():
+            return f"Notification already enabled for {params_dict['repository']} in this channel 👀"
 
-        user_info = self.client.users_info(user=user_id)
-        user = get_or_create_slack_user(user_info)
+        user = get_cached_slack_user(self.client, user_id)
+        self.context.slack_user = user
 
         # Is repo public or private
         data = handle_codecov_public_api_request(
             user_id=user_id,
+            slack_user=user,
             endpoint_name=EndpointName.REPO,
             service=params_dict.get("service"),
             params_dict=params_dict,
@@ -743,19 +831,21 @@ class NotificationResolver(BaseResolver):
 
         # Configure notifications if repo is public
         if data["private"] == False:
-            return configure_notification(data=params_dict)
+            return configure_notification(
+                data=params_dict, installation=self.context.installation
+            )
 
         else:
             repo_name = params_dict["repository"]
             # Double check if user approve of notifications for private repo
-            self.client.views_open(
-                trigger_id=self.command["trigger_id"],
+            self.client.views_update(
+                view_id=self.view_id,
                 view={
                     "type": "modal",
                     "private_metadata": json.dumps(params_dict),
                     "title": {
                         "type": "plain_text",
-                        "text": "Codecov Notifications",
+                        "text": NOTIFICATION_MODAL_TITLE,
                     },
                     "blocks": [
                         {"type": "divider"},
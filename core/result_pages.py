@@ -0,0 +1,120 @@
+import os
+import secrets
+from typing import List, Optional
+
+from django.core.cache import cache
+
+RESULT_PAGES_CACHE_TTL = int(
+    os.environ.get("RESULT_PAGES_CACHE_TTL", 15 * 60)
+)  # seconds the pages of a large result can be browsed for
+RESULT_PAGE_SIZE = 2900  # section block text is capped at 3000 characters
+RESULT_SEPARATOR = "------------------\n"  # written by format_nested_keys
+
+RESULT_EXPIRED_MESSAGE = (
+    "These results have expired, please run the command again."
+)
+
+
+def _split_long_entry(entry: str, size: int) -> List[str]:
+    chunks = []
+    while len(entry) > size:
+        cut = entry.rfind("\n", 0, size) + 1 or size
+        chunks.append(entry[:cut])
+        entry = entry[cut:]
+    return chunks + [entry] if entry else chunks
+
+
+def paginate_text(text: str, size: int = RESULT_PAGE_SIZE) -> List[str]:
+    """
+    Splits a formatted list response into pages of at most `size`
+    characters, only breaking inside a result when it can't fit on a page
+    """
+    # the first line is the title, it's repeated on every page
+    title, _, body = text.partition("\n")
+    header = f"{title}\n\n"
+    body = body.lstrip("\n")
+    if len(header) > size // 2:
+        header, body = "", text
+
+    entries = [
+        entry + RESULT_SEPARATOR for entry in body.split(RESULT_SEPARATOR)
+    ]
+    entries[-1] = entries[-1][: -len(RESULT_SEPARATOR)]
+
+    page_size = size - len(header)
+    pages = []
+    page = ""
+    for entry in entries:
+        for chunk in _split_long_entry(entry, page_size):
+            if page and len(page) + len(chunk) > page_size:
+                pages.append(page)
+                page = ""
+            page += chunk
+    if page.strip() or not pages:
+        pages.append(page)
+
+    return [header + page for page in pages]
+
+
+def store_result_pages(pages: List[str]) -> str:
+    """Caches the pages under a new opaque cursor and returns it"""
+    cursor = secrets.token_urlsafe(16)
+    # pages are stored one per key in the shared cache, so any worker can
+    # serve a Prev/Next click by loading just the page it shows
+    entries = {
+        f"result_pages:{cursor}:{page}": text
+        for page, text in enumerate(pages)
+    }
+    entries[f"result_pages:{cursor}:count"] = len(pages)
+    cache.set_many(entries, RESULT_PAGES_CACHE_TTL)
+    return cursor
+
+
+def result_page_blocks(cursor: str, page: int) -> Optional[list]:
+    """Block Kit message for one cached page, None once the cache expired"""
+    count_key = f"result_pages:{cursor}:count"
+    page_key = f"result_pages:{cursor}:{page}"
+    entries = cache.get_many([count_key, page_key])
+    if count_key not in entries or page_key not in entries:
+        return None
+    count = entries[count_key]
+
+    buttons = []
+    if page > 0:
+        buttons.append(
+            {
+                "type": "button",
+                "text": {"type": "plain_text", "text": "Prev"},
+                "value": f"{cursor}:{page - 1}",
+                "action_id": "result-page-prev",
+            }
+        )
+    if page < count - 1:
+        buttons.append(
+            {
+                "type": "button",
+                "text": {"type": "plain_text", "text": "Next"},
+                "value": f"{cursor}:{page + 1}",
+                "action_id": "result-page-next",
+            }
+        )
+
+    blocks = [
+        {
+            "type": "section",
+            "text": {"type": "mrkdwn", "text": entries[page_key]},
+        },
+        {
+            "type": "context",
+            "elements": [
+                {
+                    "type": "mrkdwn",
+                    "text": f"Page {page + 1} of {count}",
+                }
+            ],
+        },
+    ]
+    if buttons:
+        blocks.append({"type": "actions", "elements": buttons})
+
+    return blocks
@@ -3,17 +3,71 @@
 # ----------------------
 
 import datetime
+import os
 from logging import Logger
 from typing import Optional
 from uuid import uuid4
 
-from django.db.models import F
+from django.core import signing
+from django.core.cache import caches
+from django.db import IntegrityError, transaction
+from django.db.models import F, Subquery
 from django.utils import timezone
 from django.utils.timezone import is_naive, make_aware
 from slack_sdk.oauth import InstallationStore, OAuthStateStore
 from slack_sdk.oauth.installation_store import Bot, Installation
 
+from core.db_router import (REPLICA_STICKY_SECONDS, read_replica,
+                            replica_configured)
 from core.models import SlackBot, SlackInstallation, SlackOAuthState
+from core.workspace_cleanup import cancel_workspace_cleanup
+
+# installations are cached in each process, an invalidation only reaches
+# the process that made it, so the TTLs bound how stale the others get
+SLACK_INSTALLATION_CACHE_TTL = int(
+    os.environ.get("SLACK_INSTALLATION_CACHE_TTL", 60)
+)  # seconds
+# Bolt also looks up the installation of every user other than the
+# installer, which usually doesn't exist
+SLACK_NO_USER_INSTALLATION_CACHE_TTL = int(
+    os.environ.get("SLACK_NO_USER_INSTALLATION_CACHE_TTL", 10)
+)  # seconds
+
+
+def _update_fields(model):
+    """Every column an upsert on team_id overwrites"""
+    return [
+        field.name
+        for field in model._meta.concrete_fields
+        if not field.primary_key and field.name != "team_id"
+    ]
+
+
+INSTALLATION_UPDATE_FIELDS = _update_fields(SlackInstallation)
+BOT_UPDATE_FIELDS = _update_fields(SlackBot)
+
+# fields of the workspace's latest bot token, which override the ones on an
+# older user installation row
+LATEST_BOT_FIELDS = (
+    "bot_id",
+    "bot_user_id",
+    "bot_scopes",
+    "bot_token",
+    "bot_refresh_token",
+    "bot_token_expires_at",
+)
+
+# "database" keeps a SlackOAuthState row per issued state, "signed" issues
+# self-verifying tokens and only remembers the consumed ones
+SLACK_OAUTH_STATE_STORE = os.environ.get("SLACK_OAUTH_STATE_STORE", "database")
+
+SLACK_OAUTH_STATE_PURGE_BATCH_SIZE = int(
+    os.environ.get("SLACK_OAUTH_STATE_PURGE_BATCH_SIZE", 1000)
+)
+
+
+# a cached "this user has no installation", distinct from a cache miss
+_NO_USER_INSTALLATION = "no-user-installation"
 
 
 class DjangoInstallationStore(InstallationStore):
@@ -27,6 +81,66 @@ class DjangoInstallationStore(InstallationStore):
         self.client_id = client_id
         self._logger = logger
 
+    def _generation(self, enterprise_id, team_id):
+        return caches["installations"].get_or_set(
+            f"slack_installation_generation:{enterprise_id}:{team_id}",
+            lambda: uuid4().hex,
+            None,
+        )
+
+    def invalidate(self, *, enterprise_id, team_id):
+        """
+        Drops every cached installation and bot of a workspace, whatever
+        user_id they were looked up with, by moving it to a new generation.
+        Enterprise-wide lookups (team_id=None) are dropped along with it.
+        Other processes keep theirs for at most the cache TTL.
+        """
+        installations = caches["installations"]
+        for team in {team_id, None}:
+            installations.set(
+                f"slack_installation_generation:{enterprise_id}:{team}",
+                uuid4().hex,
+                None,
+            )
+            # the replica may not have the change yet
+            installations.set(
+                f"slack_installation_written:{enterprise_id}:{team}",
+                True,
+                REPLICA_STICKY_SECONDS,
+            )
+
+    def _cached(self, kind, enterprise_id, team_id, user_id, fetch):
+        installations = caches["installations"]
+        generation = self._generation(enterprise_id, team_id)
+        key = (
+            f"slack_{kind}:{self.client_id}:{generation}:"
+            f"{enterprise_id}:{team_id}:{user_id}"
+        )
+        found = installations.get(key)
+        if found is None:
+            if installations.get(
+                f"slack_installation_written:{enterprise_id}:{team_id}"
+            ):
+                found = fetch()
+            else:
+                with read_replica():
+                    found = fetch()
+                if found is None and replica_configured():
+                    found = fetch()  # a new install may not be replicated yet
+
+            if found is not None:
+                installations.set(key, found, SLACK_INSTALLATION_CACHE_TTL)
+            elif user_id is not None:
+                installations.set(
+                    key,
+                    _NO_USER_INSTALLATION,
+                    SLACK_NO_USER_INSTALLATION_CACHE_TTL,
+                )
+            # a workspace that isn't installed isn't cached, it may be
+            # installing through another worker right now
+
+        return None if found == _NO_USER_INSTALLATION else found
+
     def save(self, installation: Installation):
         bot_token_expires_at = installation.bot_token_expires_at
         user_token_expires_at = installation.user_token_expires_at
@@ -51,13 +165,8 @@ class DjangoInstallationStore(InstallationStore):
             if is_naive(user_token_expires_at):
                 user_token_expires_at = make_aware(user_token_expires_at)
 
-        # can have one installation per team id
-        slack_installation = SlackInstallation.objects.filter(
-            team_id=installation.team_id,
-        ).first()
-
-        if slack_installation is None:
-            slack_installation = SlackInstallation()
+        # can have one installation per team id, upserted on team_id below
+        slack_installation = SlackInstallation()
 
         slack_installation.client_id = self.client_id
         slack_installation.app_id = installation.app_id
@@ -96,12 +205,27 @@ class DjangoInstallationStore(InstallationStore):
         slack_installation.installed_at = installed_at
 
         try:
-            slack_installation.save()
-            self.save_bot(installation.to_bot())
+            with transaction.atomic():
+                # a reinstall keeps the workspace's data, cancelled first
+                # so a running cleanup stops before its next batch, see
+                # core.workspace_cleanup
+                cancel_workspace_cleanup(installation.team_id)
+                SlackInstallation.objects.bulk_create(
+                    [slack_installation],
+                    update_conflicts=True,
+                    unique_fields=["team_id"],
+                    update_fields=INSTALLATION_UPDATE_FIELDS,
+                )
+                self.save_bot(installation.to_bot())
 
         except Exception as e:
             self._logger.error(f"Error saving installation: {e}")
 
+        self.invalidate(
+            enterprise_id=installation.enterprise_id,
+            team_id=installation.team_id,
+        )
+
     def save_bot(self, bot: Bot):
         installed_at = bot.installed_at
         bot_token_expires_at = bot.bot_token_expires_at
@@ -118,15 +242,8 @@ class DjangoInstallationStore(InstallationStore):
             if is_naive(bot_token_expires_at):
                 bot_token_expires_at = make_aware(bot_token_expires_at)
 
-        slack_bot = SlackBot.objects.filter(
-            client_id=self.client_id,
-            enterprise_id=bot.enterprise_id,
-            team_id=bot.team_id,
-            installed_at=installed_at,
-        ).first()
-
-        if slack_bot is None:
-            slack_bot = SlackBot()
+        # one bot per team id as well
+        slack_bot = SlackBot()
 
         slack_bot.client_id = self.client_id
         slack_bot.app_id = bot.app_id
@@ -143,7 +260,48 @@ class DjangoInstallationStore(InstallationStore):
         slack_bot.is_enterprise_install = bot.is_enterprise_install
         slack_bot.installed_at = installed_at
 
-        slack_bot.save()
+        SlackBot.objects.bulk_create(
+            [slack_bot],
+            update_conflicts=True,
+            unique_fields=["team_id"],
+            update_fields=BOT_UPDATE_FIELDS,
+        )
+        self.invalidate(enterprise_id=bot.enterprise_id, team_id=bot.team_id)
+
+    def delete_bot(
+        self,
+        *,
+        enterprise_id: Optional[str],
+        team_id: Optional[str],
+    ) -> None:
+        SlackBot.objects.filter(
+            client_id=self.client_id,
+            enterprise_id=enterprise_id,
+            team_id=team_id,
+        ).delete()
+        SlackInstallation.objects.filter(
+            client_id=self.client_id,
+            enterprise_id=enterprise_id,
+            team_id=team_id,
+        ).update(bot_token=None, bot_refresh_token=None)
+        self.invalidate(enterprise_id=enterprise_id, team_id=team_id)
+
+    def delete_installation(
+        self,
+        *,
+        enterprise_id: Optional[str],
+        team_id: Optional[str],
+        user_id: Optional[str] = None,
+    ) -> None:
+        # the bot token lives on the same row, so a user's revoked
+        # token is cleared rather than the whole row deleted
+        SlackInstallation.objects.filter(
+            client_id=self.client_id,
+            enterprise_id=enterprise_id,
+            team_id=team_id,
+            user_id=user_id,
+        ).update(user_token=None, user_refresh_token=None)
+        self.invalidate(enterprise_id=enterprise_id, team_id=team_id)
 
     def find_bot(
         self,
@@ -154,6 +312,15 @@ class DjangoInstallationStore(InstallationStore):
     ) -> Optional[Bot]:
         if is_enterprise_install:
             team_id = None
+        return self._cached(
+            "bot",
+            enterprise_id,
+            team_id,
+            None,
+            lambda: self._fetch_bot(enterprise_id, team_id),
+        )
+
+    def _fetch_bot(self, enterprise_id, team_id) -> Optional[Bot]:
         row = (
             SlackBot.objects.filter(
                 client_id=self.client_id,
@@ -189,28 +356,38 @@ class DjangoInstallationStore(InstallationStore):
     ) -> Optional[Installation]:
         if is_enterprise_install:
             team_id = None
+        return self._cached(
+            "installation",
+            enterprise_id,
+            team_id,
+            user_id,
+            lambda: self._fetch_installation(enterprise_id, team_id, user_id),
+        )
+
+    def _fetch_installation(
+        self, enterprise_id, team_id, user_id
+    ) -> Optional[Installation]:
+        installations = SlackInstallation.objects.filter(
+            client_id=self.client_id,
+            enterprise_id=enterprise_id,
+            team_id=team_id,
+        )
         if user_id is None:
-            row = (
-                SlackInstallation.objects.filter(
-                    client_id=self.client_id,
-                    enterprise_id=enterprise_id,
-                    team_id=team_id,
-                )
-                .order_by(F("installed_at").desc())
-                .first()
-            )
+            rows = installations
         else:
-            row = (
-                SlackInstallation.objects.filter(
-                    client_id=self.client_id,
-                    enterprise_id=enterprise_id,
-                    team_id=team_id,
-                    user_id=user_id,
-                )
-                .order_by(F("installed_at").desc())
-                .first()
+            # a user's row may predate the latest bot token, so the latest
+            # bot fields of the workspace are joined into the same query
+            latest_bot = installations.filter(
+                bot_token__isnull=False
+            ).order_by(F("installed_at").desc())
+            rows = installations.filter(user_id=user_id).annotate(
+                **{
+                    f"latest_{field}": Subquery(latest_bot.values(field)[:1])
+                    for field in LATEST_BOT_FIELDS
+                }
             )
 
+        row = rows.order_by(F("installed_at").desc()).first()
         if not row:
             return None  # no installation found
 
@@ -235,30 +412,9 @@ class DjangoInstallationStore(InstallationStore):
             installed_at=row.installed_at,
         )
 
-        if user_id is not None:
-            # Fetch the latest bot token
-            latest_bot_row = (
-                SlackInstallation.objects.filter(
-                    client_id=self.client_id,
-                    enterprise_id=enterprise_id,
-                    team_id=team_id,
-                )
-                .exclude(bot_token__isnull=True)
-                .order_by(F("installed_at").desc())
-                .first()
-            )
-
-            if latest_bot_row:
-                installation.bot_id = latest_bot_row.bot_id
-                installation.bot_user_id = latest_bot_row.bot_user_id
-                installation.bot_scopes = latest_bot_row.bot_scopes
-                installation.bot_token = latest_bot_row.bot_token
-                installation.bot_refresh_token = (
-                    latest_bot_row.bot_refresh_token
-                )
-                installation.bot_token_expires_at = (
-                    latest_bot_row.bot_token_expires_at
-                )
+        if getattr(row, "latest_bot_token", None) is not None:
+            for field in LATEST_BOT_FIELDS:
+                setattr(installation, field, getattr(row, f"latest_{field}"))
 
         return installation
 
@@ -286,10 +442,75 @@ class DjangoOAuthStateStore(OAuthStateStore):
 
     # Consume a state value and return True if it exists in the database and is not expired
     def consume(self, state: str) -> bool:
-        rows = SlackOAuthState.objects.filter(state=state).filter(
-            expire_at__gte=timezone.now()
+        # a single DELETE, so of two concurrent consumers only one deletes it
+        deleted, _ = SlackOAuthState.objects.filter(
+            state=state, expire_at__gte=timezone.now()
+        ).delete()
+        return deleted > 0
+
+    def purge_expired(self, batch_size=SLACK_OAUTH_STATE_PURGE_BATCH_SIZE):
+        """
+        Deletes expired states in batches, so no single statement holds
+        locks on a large part of the table. Returns how many were deleted.
+        """
+        expired = SlackOAuthState.objects.filter(expire_at__lt=timezone.now())
+        purged = 0
+        while True:
+            deleted, _ = SlackOAuthState.objects.filter(
+                pk__in=expired.values("pk")[:batch_size]
+            ).delete()
+            purged += deleted
+            if deleted < batch_size:
+                return purged
+
+
+class SignedOAuthStateStore(OAuthStateStore):
+    """
+    Issues HMAC-signed, timestamped states, so issuing and checking them
+    needs no database. A consumed state is recorded as a SlackOAuthState
+    row until it would have expired anyway, which makes it single use
+    across every worker.
+    """
+
+    expiration_seconds: int
+
+    def __init__(
+        self,
+        expiration_seconds: int,
+        logger: Logger,
+    ):
+        self.expiration_seconds = expiration_seconds
+        self._logger = logger
+        self._signer = signing.TimestampSigner(salt="slack-oauth-state")
+
+    def issue(self) -> str:
+        return self._signer.sign(uuid4().hex)
+
+    def consume(self, state: str) -> bool:
+        try:
+            value = self._signer.unsign(state, max_age=self.expiration_seconds)
+        except signing.BadSignature:  # also raised once it expired
+            return False
+
+        expire_at = timezone.now() + timezone.timedelta(
+            seconds=self.expiration_seconds
         )
-        if rows.count() > 0:
-            rows.delete()
-            return True
-        return False
+        # state is unique, so of two concurrent consumers only one inserts
+        try:
+            with transaction.atomic():
+                SlackOAuthState.objects.create(
+                    state=value, expire_at=expire_at
+                )
+        except IntegrityError:
+            return False
+        return True
+
+
+def oauth_state_store(expiration_seconds: int, logger: Logger):
+    """The OAuth state store picked by SLACK_OAUTH_STATE_STORE"""
+    store_class = (
+        SignedOAuthStateStore
+        if SLACK_OAUTH_STATE_STORE == "signed"
+        else DjangoOAuthStateStore
+    )
+    return store_class(expiration_seconds=expiration_seconds, logger=logger)
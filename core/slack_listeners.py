@@ -1,27 +1,36 @@
 import json
 import logging
 import os
+import re
 
 from slack_bolt import App
 from slack_bolt.oauth.oauth_settings import OAuthSettings
 
+from core.command_executor import TOO_MANY_COMMANDS_MESSAGE, command_executor
 from core.enums import EndpointName
 from core.helpers import (bot_is_member_of_channel, configure_notification,
-                          send_not_member_response)
-from core.models import SlackBot, SlackInstallation
-from service_auth.models import SlackUser
-
-from .resolvers import (BranchesResolver, BranchResolver, CommitCoverageReport,
+                          get_bot_user_id, message_modal,
+                          send_ephemeral_response, send_not_member_response,
+                          set_bot_channel_membership)
+from service_auth.actions import sync_slack_user_profile
+
+from .event_dedupe import dedupe_slack_events, forget_event
+from .home_tab import publish_home_tab
+from .resolvers import (NOTIFICATION_MODAL_TITLE, BranchesResolver,
+                        BranchResolver, CommitCoverageReport,
                         CommitCoverageTotals, CommitResolver, CommitsResolver,
                         ComparisonResolver, ComponentsResolver,
                         CoverageTrendResolver, CoverageTrendsResolver,
                         FileCoverageReport, FlagsResolver,
                         NotificationResolver, OrgsResolver, OwnerResolver,
                         PullResolver, PullsResolver, RepoConfigResolver,
-                        RepoResolver, ReposResolver, UsersResolver,
-                        resolve_help, resolve_service_login,
-                        resolve_service_logout)
-from .slack_datastores import DjangoInstallationStore, DjangoOAuthStateStore
+                        RepoResolver, ReposResolver, SummaryResolver,
+                        UsersResolver, open_notification_modal, resolve_help,
+                        resolve_service_login, resolve_service_logout)
+from .result_pages import RESULT_EXPIRED_MESSAGE, result_page_blocks
+from .slack_datastores import DjangoInstallationStore, oauth_state_store
+from .workspace_cleanup import (cleanup_workspace, schedule_workspace_cleanup,
+                                submit_cleanup)
 
 logger = logging.getLogger(__name__)
 client_id, client_secret, signing_secret, scopes, user_scopes = (
@@ -32,6 +41,11 @@ client_id, client_secret, signing_secret, scopes, user_scopes = (
     os.environ.get("SLACK_USER_SCOPES", "search:read").split(","),
 )
 
+installation_store = DjangoInstallationStore(
+    client_id=client_id,
+    logger=logger,
+)
+
 app = App(
     signing_secret=signing_secret,
     oauth_settings=OAuthSettings(
@@ -41,11 +55,8 @@ app = App(
         user_scopes=user_scopes,
         # If you want to test token rotation, enabling the following line will make it easy
         # token_rotation_expiration_minutes=1000000,
-        installation_store=DjangoInstallationStore(
-            client_id=client_id,
-            logger=logger,
-        ),
-        state_store=DjangoOAuthStateStore(
+        installation_store=installation_store,
+        state_store=oauth_state_store(
             expiration_seconds=120,
             logger=logger,
         ),
@@ -53,15 +64,67 @@ app = App(
     ),
 )
 
+app.use(dedupe_slack_events)
+
+
+@app.error
+def handle_errors(error, body, logger):
+    logger.exception(f"Error handling Slack request: {error}")
+
+    # the event id was recorded before the listener ran, drop it so Slack's
+    # retry isn't skipped as a duplicate
+    event_id = body.get("event_id")
+    if event_id:
+        forget_event(event_id)
+
 
 @app.command("/codecov")
 def handle_codecov_commands(ack, command, say, client):
-    ack()
+    command_name = command["text"].strip().split(" ")[0]
+    # modals need the trigger_id, which expires within seconds and can't
+    # wait in the queue behind other commands
+    if command_name == "login":
+        ack()
+        resolve_service_login(client, command, say)
+        return
+    if command_name == "notify":
+        # acking doesn't use up the trigger_id, and Slack shows the user an
+        # error if the ack misses its 3 seconds while views.open runs
+        ack()
+        command = {
+            **command,
+            "view_id": open_notification_modal(client, command),
+        }
+        if not command_executor.submit(
+            command["user_id"], run_codecov_command, command, say, client
+        ):
+            # already acked, the loading modal carries the answer
+            client.views_update(
+                view_id=command["view_id"],
+                view=message_modal(
+                    NOTIFICATION_MODAL_TITLE, TOO_MANY_COMMANDS_MESSAGE
+                ),
+            )
+        return
+
+    # only ack on the request thread, the command itself runs in the
+    # background and answers through the command's response_url
+    accepted = command_executor.submit(
+        command["user_id"], run_codecov_command, command, say, client
+    )
+    if accepted:
+        ack()
+    else:
+        ack(text=TOO_MANY_COMMANDS_MESSAGE)
+
 
+def run_codecov_command(command, say, client):
     command_text = command["text"].strip().split(" ")[0]
     response_url = command["response_url"]
 
-    is_member = bot_is_member_of_channel(client, command["channel_id"])
+    is_member = bot_is_member_of_channel(
+        client, command["channel_id"], team_id=command.get("team_id")
+    )
 
     if not is_member:
         send_not_member_response(response_url)
@@ -93,8 +156,6 @@ def handle_codecov_commands(ack, command, say, client):
 
     try:
         match command_text:
-            case "login":
-                resolve_service_login(client, command, say)
             case "logout":
                 resolve_service_logout(client, command, say)
             case "organizations":
@@ -164,21 +225,20 @@ def handle_codecov_commands(ack, command, say, client):
                 NotificationResolver(command, client, say, notify=True)()
             case "notify-off":
                 NotificationResolver(command, client, say)()
+            case "summary":
+                SummaryResolver(client, command, say)()
             case "help":
                 resolve_help(command["channel_id"], command["user_id"], client)
             case _:
-                client.chat_postEphemeral(
-                    channel=command["channel_id"],
-                    user=command["user_id"],
-                    blocks=message_payload,
+                send_ephemeral_response(
+                    response_url, "", blocks=message_payload
                 )
 
     except Exception as e:
         logger.error(f"Error processing command: {e}")
-        client.chat_postEphemeral(
-            channel=command["channel_id"],
-            user=command["user_id"],
-            text="There was an error processing your request. Please try again later.",
+        send_ephemeral_response(
+            response_url,
+            "There was an error processing your request. Please try again later.",
         )
 
 
@@ -192,159 +252,24 @@ def handle_help_message(ack, body, client):
     resolve_help(channel_id, user_id, client)
 
 
-@app.event("app_home_opened")
-def update_home_tab(client, event, logger):
-    home_tab_blocks = [
-        {
-            "type": "section",
-            "text": {
-                "type": "mrkdwn",
-                "text": ":rocket: *Welcome to Codecov App for Slack* :rocket:\n\nTake control of your notifications and streamline your workflow. With just a few simple commands, you can enhance collaboration across multiple channels and repositories. Here's what you can do:",
-            },
-        },
-        {
-            "type": "section",
-            "text": {
-                "type": "mrkdwn",
-                "text": "1. Interact with Codecov Public API:\n- Explore the full potential of our app by interacting with Codecov public API. Simply use the `/codecov help` command to discover available features and commands.",
-            },
-        },
-        {
-            "type": "section",
-            "text": {
-                "type": "mrkdwn",
-                "text": "2. Redirect Notifications to Multiple Channels:\n- Use the command `/codecov notify` to effortlessly redirect notifications from multiple repositories to designated channels.",
-            },
-        },
-        {
-            "type": "section",
-            "text": {
-                "type": "mrkdwn",
-                "text": "3. Public Repo PR Notifications without Authentication:\n- No need to authenticate with external providers! With our app, you can receive notifications for pull requests from public repositories directly in Slack. Stay informed and collaborate seamlessly with your team.",
-            },
-        },
-        {
-            "type": "section",
-            "text": {
-                "type": "mrkdwn",
-                "text": "4. Access Private Data with Provider Authentication:\n- For more advanced commands that require access to private data, we've got you covered. Currently supporting GitHub authentication, you can securely connect your account to unlock additional functionalities and ensure data privacy using `/codecov login`.",
-            },
-        },
-        {"type": "divider"},
-        {
-            "type": "section",
-            "text": {
-                "type": "mrkdwn",
-                "text": "👇 Here are the list of the commands you can use:",
-            },
-        },
-        {
-            "type": "section",
-            "text": {
-                "type": "mrkdwn",
-                "text": "*Auth commands:*\n`/codecov login` - Login to a service\n`/codecov logout` - Logout of current active service\n",
-            },
-        },
-        {
-            "type": "section",
-            "text": {
-                "type": "mrkdwn",
-                "text": "*Users commands:*\n`/codecov organizations` - Get a list of organizations that user has access to\n`/codecov owner username=<org_name> service=<service>` - Get owner's information\n`/codecov users username=<org_name> service=<service>` Optional params: `is_admin=<is_admin> activated=<activated> page=<page> page_size=<page_size>` - Get a list of users for the specified owner\n",
-            },
-        },
-        {
-            "type": "section",
-            "text": {
-                "type": "mrkdwn",
-                "text": "*Repositories commands:*\n`/codecov repos username=<org_name> service=<service>` Optional params: `names=<names> active=<active> page=<page> page_size=<page_size>` - Get a list of repos for the specified owner\n`/codecov repo repository=<repository> username=<org_name> service=<service>` - Get repo information\n`/codecov repo-config username=<org_name> service=<service> repository=<repository>` - Get the repository configuration for the specified owner and repository\n",
-            },
-        },
-        {
-            "type": "section",
-            "text": {
-                "type": "mrkdwn",
-                "text": "*Branches commands:*\n`/codecov branches username=<org_name> service=<service> repository=<repository>` Optional params: `ordering=<ordering> author=<author> page=<page> page_size=<page_size>` - Get a list of branches for the repository\n`/codecov branch repository=<repository> username=<org_name> service=<service> branch=<branch>` - Get branch information\n",
-            },
-        },
-        {"type": "divider"},
-        {
-            "type": "section",
-            "text": {
-                "type": "mrkdwn",
-                "text": "*Commits commands:*\n`/codecov commits username=<org_name> service=<service> repository=<repository>` Optional params: `branch=<branch> page=<page> page_size=<page_size>` - Get a list of commits for the repository\n`/codecov commit repository=<repository> username=<org_name> service=<service> commitid=<commitid>` - Get commit information\n",
-            },
-        },
-        {"type": "divider"},
-        {
-            "type": "section",
-            "text": {
-                "type": "mrkdwn",
-                "text": "*Pulls commands:*\n`/codecov pulls username=<org_name> service=<service> repository=<repository>` Optional params: `ordering=<ordering> page=<page> page_size=<page_size> state=<closed,open,merged>` - Get a list of pulls for the repository\n`/codecov pull repository=<repository> username=<org_name> service=<service> pullid=<pullid>` - Get pull information\n",
-            },
-        },
-        {"type": "divider"},
-        {
-            "type": "section",
-            "text": {
-                "type": "mrkdwn",
-                "text": "*Components commands:*\n`/codecov components username=<org_name> service=<service> repository=<repository>` Optional params: `branch=<branch> sha=<sha>` - Gets a list of components for the specified repository\n\n",
-            },
-        },
-        {"type": "divider"},
-        {
-            "type": "section",
-            "text": {
-                "type": "mrkdwn",
-                "text": "*Flags commands:*\n`/codecov flags username=<org_name> service=<service> repository=<repository>` Optional params: `page=<page> page_size=<page_size>` - Gets a paginated list of flags for the specified repository\n`/codecov coverage-trends username=<org_name> service=<service> repository=<repository> flag=<flag>` Optional params: `page=<page> page_size=<page_size> start_date=<start_date> end_date=<end_date> branch=<branch> interval=<1d,30d,7d>`- Gets a paginated list of timeseries measurements aggregated by the specified interval\n\n",
-            },
-        },
-        {"type": "divider"},
-        {
-            "type": "section",
-            "text": {
-                "type": "mrkdwn",
-                "text": "*Comparison commands:*\n `/codecov compare username=<org_name> service=<service> repository=<repository>` - Get a comparison between two commits or a pull and its base\n`/codecov compare-component username=<org_name> service=<service> repository=<repository>` - Gets a component comparison\n`/codecov compare-file username=<org_name> service=<service> repository=<repository> path=<path>` - Gets a comparison for a specific file path\n`/codecov compare-flag username=<org_name> service=<service> repository=<repository>` - Get a flag comparison\n\n _*NOTE*_\n _You must either pass `pullid=<pullid>` or both of `head=<head> base=<base>` in the comparison commands_\n",
-            },
-        },
-        {"type": "divider"},
-        {
-            "type": "section",
-            "text": {
-                "type": "mrkdwn",
-                "text": "*Coverage commands:*\n`/codecov coverage-trend username=<org_name> service=<service> repository=<repository>` Optional params: `branch=<branch> end_date=<end_date> start_date=<start_date> interval=<1d,30d,7d> page=<page> page_size=<page_size>` - Get a paginated list of timeseries measurements aggregated by the specified interval\n`/codecov file-coverage-report repository=<repository> username=<org_name> service=<service> path=<path>` Optional params: `branch=<branch> sha=<sha>` - Get coverage info for a single file specified by path\n`/codecov commit-coverage-report repository=<repository> username=<org_name> service=<service>` Optional params: `path=<path> branch=<branch> sha=<sha> component_id=<component_id> flag=<flag>` - Get line-by-line coverage info (hit=0/miss=1/partial=2)\n`/codecov commit-coverage-totals repository=<repository> username=<org_name> service=<service> path=<path>` Optional params: `path=<path> branch=<branch> sha=<sha> component_id=<component_id> flag=<flag>` - Get the coverage totals for a given commit and the coverage totals broken down by file\n",
-            },
-        },
-        {"type": "divider"},
-        {
-            "type": "section",
-            "text": {
-                "type": "mrkdwn",
-                "text": "*Notifications commands 📳*:\n`/codecov notify username=<org_name> service=<service> repository=<repository>` - Direct Notifications for a specific repo to a specific channel\n`/codecov notify-off username=<org_name> service=<service> repository=<repository>` - Turn off Notifications for a specific repo in a specific channel\n",
-            },
-        },
-        {"type": "divider"},
-        {
-            "type": "section",
-            "text": {
-                "type": "mrkdwn",
-                "text": "Learn more about the Codecov API here:\n"
-                "<https://docs.codecov.io/reference|https://docs.codecov.io/reference>",
-            },
-        },
-        {
-            "type": "context",
-            "elements": [
-                {
-                    "type": "mrkdwn",
-                    "text": "Have questions or need assistance? Reach out to our friendly support team on https://codecov.freshdesk.com/support/home.",
-                }
-            ],
-        },
-    ]
+@app.action(re.compile("^result-page-(prev|next)$"))
+def handle_result_page(ack, body, respond):
+    ack()
 
-    client.views_publish(
-        user_id=event["user"], view={"type": "home", "blocks": home_tab_blocks}
-    )
+    cursor, page = body["actions"][0]["value"].rsplit(":", 1)
+    blocks = result_page_blocks(cursor, int(page))
+
+    # the results are ephemeral, so they are replaced through the action's
+    # response_url rather than chat.update
+    if blocks is None:
+        respond(text=RESULT_EXPIRED_MESSAGE, replace_original=True)
+    else:
+        respond(blocks=blocks, replace_original=True)
+
+
+@app.event("app_home_opened")
+def update_home_tab(client, event, context):
+    publish_home_tab(client, event, team_id=context.team_id)
 
 
 @app.action("close-modal")
@@ -430,14 +355,47 @@ def handle_app_uninstalled(body, logger):
         logger.info(event)
         logger.info("App was uninstalled, removing installation data")
 
-        # Delete workspace installation data
-        SlackInstallation.objects.filter(team_id=body["team_id"]).delete()
+        enterprise_id, team_id = body.get("enterprise_id"), body["team_id"]
+        # recorded first, so the cleanup_workspaces command finishes it if
+        # this worker stops before the cleanup does
+        schedule_workspace_cleanup(enterprise_id, team_id)
+
+        # big workspaces take a while, Slack expects the event acked quickly
+        if not submit_cleanup(
+            cleanup_uninstalled_workspace, enterprise_id, team_id
+        ):
+            logger.warning(
+                f"Cleanup of workspace {team_id} left to cleanup_workspaces"
+            )
+
+
+def cleanup_uninstalled_workspace(enterprise_id, team_id):
+    deleted = cleanup_workspace(team_id)
+    if deleted is None:
+        return  # reinstalled, or already cleaned up
+
+    installation_store.invalidate(enterprise_id=enterprise_id, team_id=team_id)
+    logger.info(
+        f"Removed {sum(deleted.values())} rows of uninstalled workspace"
+        f" {team_id}"
+    )
+
+
+@app.event("tokens_revoked")
+def handle_tokens_revoked(body, event, logger):
+    enterprise_id, team_id = body.get("enterprise_id"), body.get("team_id")
+    tokens = event["tokens"]
+    logger.info(f"Tokens revoked for team {team_id}")
 
-        # Delete workspace bot data
-        SlackBot.objects.filter(team_id=body["team_id"]).delete()
+    for user_id in tokens.get("oauth") or []:
+        installation_store.delete_installation(
+            enterprise_id=enterprise_id, team_id=team_id, user_id=user_id
+        )
 
-        # Delete users data
-        SlackUser.objects.filter(team_id=body["team_id"]).delete()
+    if tokens.get("bot"):
+        installation_store.delete_bot(
+            enterprise_id=enterprise_id, team_id=team_id
+        )
 
 
 @app.action("view-pr")
@@ -446,12 +404,29 @@ def handle_view_pr(ack, body, client, logger):
     logger.info(body)
 
 
+@app.event("member_joined_channel")
+def handle_member_joined_channel(event, client):
+    if event["user"] == get_bot_user_id(client):
+        set_bot_channel_membership(event.get("team"), event["channel"], True)
+
+
+@app.event("member_left_channel")
+def handle_member_left_channel(event, client):
+    if event["user"] == get_bot_user_id(client):
+        set_bot_channel_membership(event.get("team"), event["channel"], False)
+
+
+@app.event("user_change")
+def handle_user_change(event):
+    sync_slack_user_profile({"user": event["user"]})
+
+
 @app.event("message")
 def handle_dm_messages(event, client, logger):
     # Check if the message is from a user and not the bot itself
     if event.get("subtype") == "bot_message":
         return
-    
+
     channel_id = event["channel"]
 
     try:
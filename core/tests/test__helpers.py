@@ -1,13 +1,18 @@
 from unittest.mock import Mock, patch
 
 import pytest
+from django.core.cache import cache
+from django.core.cache.backends.db import DatabaseCache
 from slack_sdk.models.blocks import ButtonElement, DividerBlock, SectionBlock
 
 from core.enums import EndpointName
-from core.helpers import (channel_exists, extract_command_params,
-                          extract_optional_params, format_comparison,
-                          format_nested_keys, validate_comparison_params,
+from core.helpers import (_bot_user_ids, bot_is_member_of_channel,
+                          channel_exists, channel_is_im, format_comparison,
+                          format_nested_keys, get_dm_channel_id, parse_command,
+                          set_bot_channel_membership, upload_snippet,
+                          validate_comparison_params,
                           validate_notification_params, validate_service)
+from core.home_tab import publish_home_tab
 
 
 def test_validate_service():
@@ -17,35 +22,88 @@ def test_validate_service():
         validate_service("invalid_gh")
 
 
-def test_extract_command_params():
-    command_name = EndpointName.OWNER
-    assert extract_command_params(
+def test_parse_command_without_optional_params():
+    assert parse_command(
         command={"text": "/codecov owner username=rula service=gh"},
-        command_name=command_name,
-    ) == {"username": "rula", "service": "gh"}
+        command_name=EndpointName.OWNER,
+    ) == ({"username": "rula", "service": "gh"}, {})
 
-    with pytest.raises(ValueError) as e:
-        extract_command_params(
-            command={"text": "/codecov owner service=gh"},
-            command_name=command_name,
-        )
 
-    assert str(e.value) == "Missing required parameter username"
+def test_parse_command():
+    params_dict, optional_params = parse_command(
+        command={
+            "text": 'repos username=rula service=gh names="my repo" '
+            "active=true page=2"
+        },
+        command_name=EndpointName.REPOS,
+    )
+    assert params_dict == {
+        "username": "rula",
+        "service": "gh",
+        "names": "my repo",
+        "active": "true",
+        "page": "2",
+    }
+    assert optional_params == {
+        "names": "my repo",
+        "active": "true",
+        "page": "2",
+    }
 
 
-def test_extract_optional_params():
-    assert (
-        extract_optional_params(
-            params_dict={"username": "rula", "service": "gh"},
-            command_name=EndpointName.OWNER,
-        )
-        == {}
+def test_parse_command_quoting_and_separators():
+    params_dict, _ = parse_command(
+        command={
+            "text": "file-coverage-report username=rula service=gh "
+            "repository=app path='src/a b.py' ref=a=b"
+        },
+        command_name=EndpointName.FILE_COVERAGE_REPORT,
     )
+    assert params_dict["path"] == "src/a b.py"
+    assert params_dict["ref"] == "a=b"
 
-    assert extract_optional_params(
-        params_dict={"username": "rula", "service": "gh", "active": True},
-        command_name=EndpointName.REPOS,
-    ) == {"active": True}
+    params_dict, _ = parse_command(
+        command={"text": "owner username=“rula k” service=gh"},
+        command_name=EndpointName.OWNER,
+    )
+    assert params_dict["username"] == "rula k"
+
+    params_dict, _ = parse_command(
+        command={
+            "text": "file-coverage-report username=‘rula k’ service=gh "
+            "repository=app path=‘src/a b.py’"
+        },
+        command_name=EndpointName.FILE_COVERAGE_REPORT,
+    )
+    assert params_dict["username"] == "rula k"
+    assert params_dict["path"] == "src/a b.py"
+
+
+@pytest.mark.parametrize(
+    "text, error",
+    [
+        ("owner service=gh", "Missing required parameter username"),
+        ("owner", "Missing required parameters username, service"),
+        ("owner username= service=gh", "Missing value for parameter username"),
+        (
+            'owner username="rula service=gh',
+            "Missing closing quote for parameter username",
+        ),
+        (
+            "owner username=‘rula service=gh",
+            "Missing closing quote for parameter username",
+        ),
+        (
+            "owner username=‘’ service=gh",
+            "Missing value for parameter username",
+        ),
+    ],
+)
+def test_parse_command_errors(text, error):
+    with pytest.raises(ValueError) as e:
+        parse_command(command={"text": text}, command_name=EndpointName.OWNER)
+
+    assert str(e.value) == error
 
 
 @pytest.fixture
@@ -74,6 +132,20 @@ def test_format_nested_keys(data):
     assert format_nested_keys(data, "") == expected_output
 
 
+def test_format_nested_keys_truncated():
+    data = {
+        "count": 50,
+        "truncated": True,
+        "shown": 1,
+        "results": [{"name": "repo"}],
+    }
+    assert format_nested_keys(data, "*Repos*: (50)\n\n") == (
+        "*Repos*: (50)\n\n"
+        "⚠️ Results truncated: showing the first 1 of 50.\n\n"
+        "*Name*: repo\n------------------\n"
+    )
+
+
 def test_validate_comparison_params():
     with pytest.raises(Exception) as e:
         validate_comparison_params(
@@ -160,3 +232,138 @@ def test_format_comparison():
     ]
 
     assert format_comparison(comparison) == expected_blocks
+
+
+class TestBotIsMemberOfChannel:
+    @pytest.fixture(autouse=True)
+    def clear_caches(self):
+        cache.clear()
+        _bot_user_ids.clear()
+        yield
+        cache.clear()
+        _bot_user_ids.clear()
+
+    def make_client(self, pages):
+        client = Mock(token="xoxb-token")
+        client.auth_test.return_value = {"user_id": "UBOT"}
+        client.conversations_members.side_effect = [
+            {
+                "members": members,
+                "response_metadata": {"next_cursor": cursor},
+            }
+            for members, cursor in pages
+        ]
+        return client
+
+    def test_pages_through_members_and_caches(self):
+        client = self.make_client([(["U1", "U2"], "next"), (["UBOT"], "")])
+
+        assert bot_is_member_of_channel(client, "C1", team_id="T1")
+        assert client.conversations_members.call_count == 2
+
+        # second check is served from the cache
+        assert bot_is_member_of_channel(client, "C1", team_id="T1")
+        assert client.conversations_members.call_count == 2
+        client.auth_test.assert_called_once()
+
+    def test_not_a_member(self):
+        client = self.make_client([(["U1"], ""), (["U2"], "")])
+
+        assert not bot_is_member_of_channel(client, "C1", team_id="T1")
+        assert not bot_is_member_of_channel(client, "C1", team_id="T1")
+        client.conversations_members.assert_called_once()
+
+    def test_bot_user_id_is_cached_per_token(self):
+        client = self.make_client([(["U1"], ""), (["UBOT"], "")])
+
+        assert not bot_is_member_of_channel(client, "C1", team_id="T1")
+        assert bot_is_member_of_channel(client, "C2", team_id="T1")
+        client.auth_test.assert_called_once()
+
+    def test_membership_events_update_cache(self):
+        client = self.make_client([])
+
+        set_bot_channel_membership("T1", "C1", True)
+        assert bot_is_member_of_channel(client, "C1", team_id="T1")
+
+        set_bot_channel_membership("T1", "C1", False)
+        assert not bot_is_member_of_channel(client, "C1", team_id="T1")
+        client.conversations_members.assert_not_called()
+
+    @pytest.mark.django_db
+    @pytest.mark.database_cache
+    def test_membership_is_shared_between_workers(self):
+        set_bot_channel_membership("T1", "C1", True)
+
+        # another gunicorn worker reads the same table
+        other_worker = DatabaseCache("codecov_slack_cache", {})
+        assert other_worker.get("bot_membership:T1:C1") is True
+
+    @pytest.mark.django_db
+    @pytest.mark.database_cache
+    def test_membership_survives_many_home_tabs(self):
+        set_bot_channel_membership("T1", "C1", True)
+
+        # more entries than the 300 Django keeps by default
+        client = Mock()
+        for i in range(400):
+            publish_home_tab(client, {"user": f"U{i}"}, team_id="T1")
+
+        assert cache.get("bot_membership:T1:C1") is True
+
+
+class TestSnippetUpload:
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        cache.clear()
+        yield
+        cache.clear()
+
+    def test_channel_is_im_is_cached(self):
+        client = Mock()
+        client.conversations_info.return_value = {"channel": {"is_im": False}}
+
+        assert channel_is_im(client, "C1") is False
+        assert channel_is_im(client, "C1") is False
+        client.conversations_info.assert_called_once_with(channel="C1")
+
+    def test_upload_snippet_spools_chunks(self):
+        client = Mock()
+        uploaded = []
+
+        def upload(**kwargs):
+            uploaded.append(kwargs.pop("file").read())
+            assert kwargs == {
+                "channel": "D1",
+                "filename": "codecov.json",
+                "title": "Codecov JSON",
+                "snippet_type": "javascript",
+                "request_file_info": False,
+            }
+            return {"files": [{"id": "F1", "title": "Codecov JSON"}]}
+
+        client.files_upload_v2.side_effect = upload
+
+        file_id = upload_snippet(
+            client,
+            "D1",
+            (f"line {i}\n" for i in range(3)),
+            filename="codecov.json",
+            title="Codecov JSON",
+        )
+
+        assert file_id == "F1"
+        assert uploaded == [b"line 0\nline 1\nline 2\n"]
+
+    def test_dm_channel_is_cached_per_workspace(self):
+        client = Mock()
+        client.conversations_open.side_effect = [
+            {"channel": {"id": "D1"}},
+            {"channel": {"id": "D2"}},
+        ]
+
+        assert get_dm_channel_id(client, "U1", team_id="T1") == "D1"
+        assert get_dm_channel_id(client, "U1", team_id="T1") == "D1"
+        # the same user id in another workspace is another user
+        assert get_dm_channel_id(client, "U1", team_id="T2") == "D2"
+        assert client.conversations_open.call_count == 2
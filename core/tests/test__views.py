@@ -114,3 +114,28 @@ class TestHealth(APITestCase):
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.content, b"Codecov Slack App is live!")
+
+
+class TestDatabaseMetrics(APITestCase):
+    def test_requires_internal_token(self):
+        response = self.client.post(reverse("db_metrics"))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @patch("core.views.connection_metrics")
+    def test_db_metrics(self, connection_metrics):
+        connection_metrics.stats.return_value = {
+            "opened": 2,
+            "acquire_p50": 0.01,
+            "acquire_p99": 0.03,
+        }
+
+        response = self.client.post(
+            reverse("db_metrics"),
+            HTTP_AUTHORIZATION=f"Bearer {codecov_internal_token}",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data,
+            {"opened": 2, "acquire_p50": 0.01, "acquire_p99": 0.03},
+        )
@@ -0,0 +1,129 @@
+import threading
+from unittest.mock import Mock, patch
+
+from django.test import TestCase
+
+from core.command_executor import TOO_MANY_COMMANDS_MESSAGE, CommandExecutor
+from core.slack_listeners import handle_codecov_commands, run_codecov_command
+
+
+class TestCommandExecutor(TestCase):
+    def setUp(self):
+        self.executor = CommandExecutor(
+            max_workers=4, max_in_flight_per_user=2
+        )
+        self.release = threading.Event()
+        self.finished = threading.Semaphore(0)
+
+    def tearDown(self):
+        self.release.set()
+
+    def blocking_command(self):
+        self.release.wait(timeout=5)
+        self.finished.release()
+
+    def test_limits_in_flight_commands_per_user(self):
+        assert self.executor.submit("U1", self.blocking_command)
+        assert self.executor.submit("U1", self.blocking_command)
+        assert not self.executor.submit("U1", self.blocking_command)
+
+        # other users are not affected
+        assert self.executor.submit("U2", self.blocking_command)
+        assert self.executor.in_flight("U1") == 2
+
+        self.release.set()
+        for _ in range(3):
+            assert self.finished.acquire(timeout=5)
+
+        self.executor._executor.shutdown(wait=True)
+        assert self.executor.in_flight("U1") == 0
+        assert self.executor.in_flight("U2") == 0
+
+    def test_failing_command_releases_its_slot(self):
+        command = Mock(side_effect=Exception("boom"))
+
+        assert self.executor.submit("U1", command, "arg")
+        self.executor._executor.shutdown(wait=True)
+
+        command.assert_called_once_with("arg")
+        assert self.executor.in_flight("U1") == 0
+
+
+class TestHandleCodecovCommands(TestCase):
+    def setUp(self):
+        self.command = {"user_id": "U1", "text": "help"}
+        self.ack = Mock()
+
+    @patch("core.slack_listeners.command_executor")
+    def test_acks_before_running_the_command(self, mock_executor):
+        mock_executor.submit.return_value = True
+        say, client = Mock(), Mock()
+
+        handle_codecov_commands(self.ack, self.command, say, client)
+
+        self.ack.assert_called_once_with()
+        mock_executor.submit.assert_called_once_with(
+            "U1", run_codecov_command, self.command, say, client
+        )
+        client.chat_postEphemeral.assert_not_called()
+
+    @patch("core.slack_listeners.command_executor")
+    def test_rejects_when_user_is_at_the_limit(self, mock_executor):
+        mock_executor.submit.return_value = False
+
+        handle_codecov_commands(self.ack, self.command, Mock(), Mock())
+
+        self.ack.assert_called_once_with(text=TOO_MANY_COMMANDS_MESSAGE)
+
+    @patch("core.slack_listeners.resolve_service_login")
+    @patch("core.slack_listeners.command_executor")
+    def test_login_opens_its_modal_on_the_request_thread(
+        self, mock_executor, mock_login
+    ):
+        command = {"user_id": "U1", "text": "login"}
+        say, client = Mock(), Mock()
+
+        handle_codecov_commands(self.ack, command, say, client)
+
+        self.ack.assert_called_once_with()
+        mock_login.assert_called_once_with(client, command, say)
+        mock_executor.submit.assert_not_called()
+
+    @patch("core.slack_listeners.command_executor")
+    def test_notify_acks_then_opens_its_modal_before_queueing(
+        self, mock_executor
+    ):
+        mock_executor.submit.return_value = True
+        command = {"user_id": "U1", "text": "notify", "trigger_id": "T"}
+        say, client = Mock(), Mock()
+        client.views_open.return_value = {"view": {"id": "V1"}}
+        calls = Mock()
+        calls.attach_mock(self.ack, "ack")
+        calls.attach_mock(client.views_open, "views_open")
+
+        handle_codecov_commands(self.ack, command, say, client)
+
+        assert [name for name, _, _ in calls.mock_calls] == [
+            "ack",
+            "views_open",
+        ]
+        assert client.views_open.call_args[1]["trigger_id"] == "T"
+        queued = mock_executor.submit.call_args[0][2]
+        assert queued["view_id"] == "V1"
+        self.ack.assert_called_once_with()
+
+    @patch("core.slack_listeners.command_executor")
+    def test_rejected_notify_updates_its_loading_modal(self, mock_executor):
+        mock_executor.submit.return_value = False
+        command = {"user_id": "U1", "text": "notify", "trigger_id": "T"}
+        client = Mock()
+        client.views_open.return_value = {"view": {"id": "V1"}}
+
+        handle_codecov_commands(self.ack, command, Mock(), client)
+
+        self.ack.assert_called_once_with()
+        update = client.views_update.call_args[1]
+        assert update["view_id"] == "V1"
+        assert update["view"]["blocks"][0]["text"]["text"] == (
+            TOO_MANY_COMMANDS_MESSAGE
+        )
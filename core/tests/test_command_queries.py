@@ -0,0 +1,160 @@
+from collections import defaultdict
+from unittest.mock import AsyncMock, MagicMock, Mock, patch
+
+import pytest
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+
+from core.helpers import set_bot_channel_membership
+from core.models import SlackInstallation
+from core.slack_listeners import run_codecov_command
+from service_auth.models import Service, SlackUser
+
+PARAMS = (
+    "username=codecov service=gh repository=app branch=main commitid=abc "
+    "pullid=1 flag=unit path=app.py"
+)
+
+# number of queries each command runs for a known, logged in user
+COMMAND_QUERIES = {
+    "organizations": 1,
+    "owner": 1,
+    "users": 1,
+    "repo-config": 1,
+    "repos": 1,
+    "repo": 1,
+    "branches": 1,
+    "branch": 1,
+    "commits": 1,
+    "commit": 1,
+    "pulls": 1,
+    "pull": 1,
+    "components": 1,
+    "flags": 1,
+    "coverage-trends": 1,
+    "compare": 1,
+    "compare-component": 1,
+    "compare-file": 1,
+    "compare-flag": 1,
+    "coverage-trend": 1,
+    "commit-coverage-report": 1,
+    "commit-coverage-totals": 1,
+    "file-coverage-report": 1,
+    "summary": 1,
+    "notify": 8,
+    # the last channel's notification is locked, then Django's delete loads
+    # it and removes its statuses and itself, in a savepoint
+    "notify-off": 8,
+    "logout": 3,
+    "help": 0,
+}
+
+# the same with the production cache, whose table adds a query for the bot
+# membership check of every command
+DATABASE_CACHE_COMMAND_QUERIES = {
+    "repos": 2,
+    "help": 1,
+}
+
+# the same for a user that isn't logged in to any service
+LOGGED_OUT_COMMAND_QUERIES = {
+    "organizations": 1,
+    "users": 1,
+    "repos": 1,
+    "repo": 1,
+    "notify": 8,
+    "logout": 1,
+}
+
+
+@patch("service_auth.actions.USER_ID_SECRET", "secret")
+class TestCommandQueries(TestCase):
+    def setUp(self):
+        cache.clear()
+        slack_user = SlackUser.objects.create(
+            user_id="U1",
+            username="my_slack_user",
+            codecov_access_token="12345678-1234-5678-1234-567822245672",
+            codecov_access_token_verified_at=timezone.now(),
+            profile_synced_at=timezone.now(),
+        )
+        Service.objects.create(
+            name="github",
+            service_username="codecov",
+            service_userid="1",
+            user=slack_user,
+            active=True,
+        )
+        SlackInstallation.objects.create(
+            client_id="client_id",
+            app_id="app_id",
+            team_id="T1",
+            bot_token="xoxb-token",
+            user_id="U1",
+            installed_at=timezone.now(),
+        )
+        set_bot_channel_membership("T1", "C1", True)
+
+        self.client = MagicMock(token="xoxb-token")
+        data = defaultdict(str, {"count": 1, "results": [], "private": False})
+        self.response = Mock(status_code=200, json=lambda: data)
+        # components is the one endpoint that answers with a bare list
+        self.list_response = Mock(status_code=200, json=lambda: [])
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_command_queries(self):
+        self.assert_command_queries(COMMAND_QUERIES)
+
+    @pytest.mark.database_cache
+    def test_command_queries_with_the_database_cache(self):
+        self.assert_command_queries(DATABASE_CACHE_COMMAND_QUERIES)
+
+    def test_logged_out_command_queries(self):
+        SlackUser.objects.filter(user_id="U1").update(
+            codecov_access_token=None, codecov_access_token_verified_at=None
+        )
+        Service.objects.all().delete()
+
+        self.assert_command_queries(LOGGED_OUT_COMMAND_QUERIES)
+        # organizations and users are private and ask to log in instead
+        login_modals = [
+            c
+            for c in self.client.views_open.call_args_list
+            if c[1]["view"]["title"]["text"] == "Codecov App"
+        ]
+        assert len(login_modals) == 2
+
+    def assert_command_queries(self, command_queries):
+        for command_text, queries in command_queries.items():
+            command = {
+                "user_id": "U1",
+                "team_id": "T1",
+                "channel_id": "C1",
+                "trigger_id": "trigger_id",
+                "response_url": "https://hooks.slack.com/commands/1",
+                "text": f"{command_text} {PARAMS}",
+            }
+            response = (
+                self.list_response
+                if command_text == "components"
+                else self.response
+            )
+            with self.subTest(command=command_text), patch(
+                "requests.get", return_value=response
+            ), patch("requests.post") as mock_post, patch(
+                "httpx.AsyncClient.get",
+                new_callable=AsyncMock,
+                return_value=self.response,
+            ), self.assertNoLogs(
+                "core", level="ERROR"
+            ):
+                with self.assertNumQueries(queries):
+                    run_codecov_command(command, Mock(), self.client)
+
+                # answers go to the command's response_url, help is posted
+                # through the Web API like the Help button's
+                if command_text != "help":
+                    assert mock_post.call_args[0] == (command["response_url"],)
@@ -0,0 +1,30 @@
+from django.db import connection, connections
+from django.test import TestCase
+
+from core.db_backends.postgresql import base
+from core.db_metrics import ConnectionMetrics, connection_metrics
+
+
+def test_connection_metrics():
+    metrics = ConnectionMetrics()
+    metrics.record(0.01)
+    metrics.record(0.03)
+
+    assert metrics.stats() == {
+        "opened": 2,
+        "acquire_p50": 0.03,
+        "acquire_p99": 0.03,
+    }
+
+
+class TestDatabaseWrapper(TestCase):
+    def test_default_database_is_wrapped(self):
+        assert isinstance(connections["default"], base.DatabaseWrapper)
+
+    def test_new_connections_are_recorded(self):
+        opened = connection_metrics.opened
+
+        raw = connection.get_new_connection(connection.get_connection_params())
+        raw.close()
+
+        assert connection_metrics.opened == opened + 1
@@ -0,0 +1,60 @@
+from unittest.mock import patch
+
+from django.db import router
+from django.test import SimpleTestCase, TestCase
+
+from core.db_router import ReplicaRouter, read_replica
+from core.models import Notification
+from service_auth.models import SlackUser
+
+
+class TestReplicaRouter(SimpleTestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+        patcher = patch("core.db_router.replica_configured", return_value=True)
+        self.replica_configured = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_reads_use_the_primary_by_default(self):
+        assert self.router.db_for_read(SlackUser) is None
+
+    def test_reads_in_a_replica_block(self):
+        with read_replica():
+            assert self.router.db_for_read(SlackUser) == "replica"
+
+        assert self.router.db_for_read(SlackUser) is None
+
+    def test_reads_after_a_write_stick_to_the_primary(self):
+        with read_replica():
+            assert self.router.db_for_write(Notification) == "default"
+            assert self.router.db_for_read(Notification) is None
+            assert self.router.db_for_read(SlackUser) is None
+
+        # a new block starts on the replica again
+        with read_replica():
+            assert self.router.db_for_read(SlackUser) == "replica"
+
+    def test_no_replica_configured(self):
+        self.replica_configured.return_value = False
+
+        with read_replica():
+            assert self.router.db_for_read(SlackUser) is None
+
+    def test_migrations_only_run_on_the_primary(self):
+        assert self.router.allow_migrate("default", "core")
+        assert not self.router.allow_migrate("replica", "core")
+
+
+class TestWritesAfterReplicaReads(TestCase):
+    def test_object_read_from_the_replica_is_saved_to_the_primary(self):
+        SlackUser.objects.create(user_id="U1", team_id="T1")
+        with read_replica():
+            user = SlackUser.objects.get(user_id="U1")
+        # as if the replica had served the read
+        user._state.db = "replica"
+
+        assert router.db_for_write(SlackUser, instance=user) == "default"
+        user.email = "user@example.com"
+        user.save()
+
+        assert SlackUser.objects.get(user_id="U1").email == "user@example.com"
@@ -0,0 +1,59 @@
+from unittest.mock import Mock
+
+import pytest
+from django.core.cache import caches
+from django.core.cache.backends.db import DatabaseCache
+from django.test import TestCase
+
+from core.event_dedupe import dedupe_slack_events, is_duplicate_event
+from core.slack_listeners import handle_errors
+
+
+class TestEventDedupe(TestCase):
+    def setUp(self):
+        caches["slack_events"].clear()
+
+    def tearDown(self):
+        caches["slack_events"].clear()
+
+    def test_is_duplicate_event(self):
+        assert not is_duplicate_event("Ev1")
+        assert is_duplicate_event("Ev1")
+        assert not is_duplicate_event("Ev2")
+
+    def test_middleware_skips_retries(self):
+        body = {"event_id": "Ev1", "event": {"type": "message"}}
+
+        next_ = Mock()
+        assert dedupe_slack_events(body, next_, Mock()) is None
+        next_.assert_called_once()
+
+        # the retry is acked without reaching the listeners
+        retry_next = Mock()
+        response = dedupe_slack_events(body, retry_next, Mock())
+        retry_next.assert_not_called()
+        assert response.status == 200
+
+    def test_middleware_ignores_requests_without_event_id(self):
+        for _ in range(2):
+            next_ = Mock()
+            dedupe_slack_events({"command": "/codecov"}, next_, Mock())
+            next_.assert_called_once()
+
+    def test_failed_event_can_be_retried(self):
+        body = {"event_id": "Ev1", "event": {"type": "member_joined_channel"}}
+        assert dedupe_slack_events(body, Mock(), Mock()) is None
+
+        # the listener raised, Bolt hands the error to the global handler
+        handle_errors(Exception("boom"), body, Mock())
+
+        retry_next = Mock()
+        assert dedupe_slack_events(body, retry_next, Mock()) is None
+        retry_next.assert_called_once()
+
+    @pytest.mark.database_cache
+    def test_retries_are_deduped_across_workers(self):
+        assert not is_duplicate_event("Ev1")
+
+        other_worker = DatabaseCache("codecov_slack_events", {})
+        assert not other_worker.add("slack_event:Ev1", True)
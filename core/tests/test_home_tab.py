@@ -0,0 +1,40 @@
+from unittest.mock import Mock
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from core.home_tab import HOME_TAB_VIEW, publish_home_tab
+
+
+class TestPublishHomeTab(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Mock()
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_publishes_once_per_version(self):
+        event = {"user": "U1", "tab": "home"}
+
+        assert publish_home_tab(self.client, event, team_id="T1")
+        self.client.views_publish.assert_called_once_with(
+            user_id="U1", view=HOME_TAB_VIEW
+        )
+
+        # reopening the tab shows the view Slack already has
+        event["view"] = {"id": "V1"}
+        assert not publish_home_tab(self.client, event, team_id="T1")
+        assert self.client.views_publish.call_count == 1
+
+        # other users still get it
+        assert publish_home_tab(
+            self.client, {"user": "U2", "view": {"id": "V2"}}, team_id="T1"
+        )
+        assert self.client.views_publish.call_count == 2
+
+    def test_republishes_when_slack_has_no_view(self):
+        publish_home_tab(self.client, {"user": "U1"}, team_id="T1")
+        publish_home_tab(self.client, {"user": "U1"}, team_id="T1")
+
+        assert self.client.views_publish.call_count == 2
@@ -0,0 +1,120 @@
+from datetime import timedelta
+
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TransactionTestCase
+from django.utils import timezone
+
+
+class TestRemoveDuplicateTeams(TransactionTestCase):
+    migrate_from = ("core", "0007_slackinstallation_latest_bot_idx")
+    migrate_to = ("core", "0008_unique_installation_team")
+
+    def setUp(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate([self.migrate_from])
+        self.apps = executor.loader.project_state([self.migrate_from]).apps
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def migrate(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate([self.migrate_to])
+        return executor.loader.project_state([self.migrate_to]).apps
+
+    def create_installation(self, installed_at):
+        SlackInstallation = self.apps.get_model("core", "SlackInstallation")
+        return SlackInstallation.objects.create(
+            client_id="client",
+            app_id="app",
+            team_id="T1",
+            user_id="U1",
+            installed_at=installed_at,
+        )
+
+    def test_notifications_of_the_same_repo_are_merged(self):
+        Notification = self.apps.get_model("core", "Notification")
+        NotificationStatus = self.apps.get_model("core", "NotificationStatus")
+        NotificationConfig = self.apps.get_model("core", "NotificationConfig")
+        NotificationConfigStatus = self.apps.get_model(
+            "core", "NotificationConfigStatus"
+        )
+        older = self.create_installation(timezone.now() - timedelta(days=1))
+        latest = self.create_installation(timezone.now())
+
+        older_notification = Notification.objects.create(
+            installation=older,
+            repo="worker",
+            owner="codecov",
+            channels=["C1", "C2"],
+        )
+        Notification.objects.create(
+            installation=latest,
+            repo="worker",
+            owner="codecov",
+            channels=["C2", "C3"],
+        )
+        Notification.objects.create(
+            installation=older, repo="api", owner="codecov", channels=["C1"]
+        )
+        NotificationStatus.objects.create(
+            notification=older_notification,
+            status="success",
+            pullid="1",
+            channel="C1",
+        )
+        for installation, pullid in ((older, "1"), (latest, "2")):
+            config = NotificationConfig.objects.create(
+                installation=installation,
+                repo="worker",
+                owner="codecov",
+                channel="C1",
+            )
+            NotificationConfigStatus.objects.create(
+                notification_config=config, pullid=pullid
+            )
+
+        apps = self.migrate()
+
+        Notification = apps.get_model("core", "Notification")
+        NotificationStatus = apps.get_model("core", "NotificationStatus")
+        NotificationConfig = apps.get_model("core", "NotificationConfig")
+        NotificationConfigStatus = apps.get_model(
+            "core", "NotificationConfigStatus"
+        )
+        self.assertFalse(
+            apps.get_model("core", "SlackInstallation")
+            .objects.filter(pk=older.pk)
+            .exists()
+        )
+
+        worker = Notification.objects.get(
+            installation_id=latest.pk, repo="worker"
+        )
+        self.assertEqual(sorted(worker.channels), ["C1", "C2", "C3"])
+        self.assertEqual(
+            list(
+                NotificationStatus.objects.values_list(
+                    "notification_id", flat=True
+                )
+            ),
+            [worker.pk],
+        )
+        self.assertTrue(
+            Notification.objects.filter(
+                installation_id=latest.pk, repo="api"
+            ).exists()
+        )
+
+        config = NotificationConfig.objects.get()
+        self.assertEqual(config.installation_id, latest.pk)
+        self.assertEqual(
+            sorted(
+                NotificationConfigStatus.objects.filter(
+                    notification_config=config
+                ).values_list("pullid", flat=True)
+            ),
+            ["1", "2"],
+        )
@@ -0,0 +1,119 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Barrier, Event
+
+from django.db import connection, transaction
+from django.db.models import Value
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from core.helpers import (configure_notification,
+                          delete_unsubscribed_notifications)
+from core.models import ArrayAppend, Notification, SlackInstallation
+
+
+class TestNotificationChannels(TestCase):
+    def setUp(self):
+        self.installation = SlackInstallation.objects.create(
+            bot_token="xoxb-token", installed_at=timezone.now()
+        )
+        self.data = {
+            "repository": "repo",
+            "username": "owner",
+            "slack__bot_token": "xoxb-token",
+        }
+
+    def subscribe(self, channel_id):
+        return configure_notification(
+            {**self.data, "slack__channel_id": channel_id},
+            installation=self.installation,
+        )
+
+    def test_subscribing_appends_each_channel_once(self):
+        self.subscribe("C1")
+        self.subscribe("C2")
+        message = self.subscribe("C1")
+
+        assert message == "Notifications for repo enabled in this channel 📳."
+        assert Notification.objects.get().channels == ["C1", "C2"]
+
+    def test_subscribe_is_one_update(self):
+        self.subscribe("C1")
+
+        # the get of get_or_create, then the append
+        with self.assertNumQueries(2):
+            self.subscribe("C2")
+
+    def test_channel_subscriptions_query(self):
+        self.subscribe("C1")
+
+        assert list(
+            Notification.objects.filter(channels__contains=["C1"]).values_list(
+                "repo", flat=True
+            )
+        ) == ["repo"]
+
+
+class TestConcurrentSubscriptions(TransactionTestCase):
+    def test_no_subscription_is_lost(self):
+        installation = SlackInstallation.objects.create(
+            bot_token="xoxb-token", installed_at=timezone.now()
+        )
+        channels = [f"C{i}" for i in range(8)]
+        barrier = Barrier(len(channels))
+
+        def subscribe(channel_id):
+            barrier.wait()
+            try:
+                configure_notification(
+                    {
+                        "repository": "repo",
+                        "username": "owner",
+                        "slack__channel_id": channel_id,
+                    },
+                    installation=installation,
+                )
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=len(channels)) as executor:
+            list(executor.map(subscribe, channels))
+
+        assert sorted(Notification.objects.get().channels) == channels
+
+
+class TestConcurrentUnsubscribe(TransactionTestCase):
+    def test_resubscribed_notification_is_kept(self):
+        installation = SlackInstallation.objects.create(
+            bot_token="xoxb-token", installed_at=timezone.now()
+        )
+        notification = Notification.objects.create(
+            installation=installation, repo="repo", owner="owner", channels=[]
+        )
+        subscribing = Event()
+
+        def subscribe():
+            try:
+                # holds the appended channel until the delete is waiting
+                with transaction.atomic():
+                    Notification.objects.filter(pk=notification.pk).update(
+                        channels=ArrayAppend("channels", Value("C2"))
+                    )
+                    subscribing.set()
+                    time.sleep(0.2)
+            finally:
+                connection.close()
+
+        def unsubscribe():
+            subscribing.wait()
+            try:
+                delete_unsubscribed_notifications(
+                    Notification.objects.filter(installation=installation)
+                )
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            list(executor.map(lambda fn: fn(), [subscribe, unsubscribe]))
+
+        assert Notification.objects.get().channels == ["C2"]
@@ -0,0 +1,175 @@
+from django.db import connection
+from django.db.models import F
+from django.test import TestCase
+from django.utils import timezone
+
+from core.models import (Notification, NotificationStatus, SlackBot,
+                         SlackInstallation, SlackOAuthState)
+from service_auth.models import Service, SlackUser
+
+
+class TestHotPathQueryPlans(TestCase):
+    """
+    Every query made while handling a Slack request or a Codecov
+    notification has to be served by an index. Sequential scans are
+    disabled so the planner picks an index whenever one can be used, even
+    on these small tables, and the plan tells which one it was.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        cls.installation = SlackInstallation.objects.create(
+            client_id="client",
+            app_id="app",
+            team_id="T1",
+            user_id="U1",
+            bot_token="xoxb-1",
+            installed_at=now,
+        )
+        SlackBot.objects.create(
+            client_id="client", app_id="app", team_id="T1", installed_at=now
+        )
+        SlackOAuthState.objects.create(state="state", expire_at=now)
+        cls.notification = Notification.objects.create(
+            installation=cls.installation,
+            repo="repo",
+            owner="owner",
+            channels=["C1"],
+        )
+        NotificationStatus.objects.create(
+            notification=cls.notification, pullid="1", channel="C1"
+        )
+        cls.user = SlackUser.objects.create(user_id="U1", team_id="T1")
+        Service.objects.create(
+            user=cls.user, name="github", service_userid="1", active=True
+        )
+
+    def setUp(self):
+        with connection.cursor() as cursor:
+            # only for the test's transaction
+            cursor.execute("SET LOCAL enable_seqscan = off")
+
+    def assertUsesIndex(self, queryset, *index_names):
+        """Any of `index_names` (or name prefixes) will do"""
+        plan = queryset.explain()
+        self.assertNotIn("Seq Scan", plan)
+        self.assertTrue(any(name in plan for name in index_names), plan)
+
+    def test_installation_by_bot_token(self):
+        self.assertUsesIndex(
+            SlackInstallation.objects.filter(bot_token="xoxb-1"),
+            # unique text columns also get a pattern_ops (_like) index
+            "core_slackinstallation_bot_token_key",
+            "core_slackinstallation_bot_token_5774e33e_like",
+        )
+
+    def test_installation_by_team(self):
+        self.assertUsesIndex(
+            SlackInstallation.objects.filter(team_id="T1"),
+            "unique_slackinstallation_team",
+        )
+
+    def test_find_installation(self):
+        self.assertUsesIndex(
+            SlackInstallation.objects.filter(
+                client_id="client",
+                enterprise_id=None,
+                team_id="T1",
+                user_id="U1",
+            ).order_by(F("installed_at").desc())[:1],
+            "unique_slackinstallation_team",
+        )
+
+    def test_find_latest_bot_token(self):
+        self.assertUsesIndex(
+            SlackInstallation.objects.filter(
+                client_id="client",
+                enterprise_id=None,
+                team_id=None,
+                bot_token__isnull=False,
+            ).order_by(F("installed_at").desc())[:1],
+            "slackinstallation_latest_bot",
+        )
+
+    def test_find_org_wide_installation(self):
+        self.assertUsesIndex(
+            SlackInstallation.objects.filter(
+                client_id="client",
+                enterprise_id="E1",
+                team_id=None,
+                user_id="U1",
+            ).order_by(F("installed_at").desc())[:1],
+            "core_slacki_client__",
+            "unique_slackinstallation_team",
+        )
+
+    def test_find_bot(self):
+        self.assertUsesIndex(
+            SlackBot.objects.filter(
+                client_id="client", enterprise_id=None, team_id="T1"
+            ).order_by(F("installed_at").desc())[:1],
+            "unique_slackbot_team",
+        )
+
+    def test_consume_oauth_state(self):
+        self.assertUsesIndex(
+            SlackOAuthState.objects.filter(
+                state="state", expire_at__gte=timezone.now()
+            ),
+            "unique_slackoauthstate_state",
+        )
+
+    def test_purge_expired_oauth_states(self):
+        expired = SlackOAuthState.objects.filter(expire_at__lt=timezone.now())
+        self.assertUsesIndex(
+            SlackOAuthState.objects.filter(pk__in=expired.values("pk")[:1000]),
+            "slackoauthstate_expire_at",
+        )
+
+    def test_notifications_of_repo(self):
+        self.assertUsesIndex(
+            Notification.objects.filter(owner="owner", repo="repo"),
+            "notification_repo_owner",
+        )
+
+    def test_notifications_of_channel(self):
+        self.assertUsesIndex(
+            Notification.objects.filter(channels__contains=["C1"]),
+            "notification_channels",
+        )
+
+    def test_notification_of_installation(self):
+        self.assertUsesIndex(
+            Notification.objects.filter(
+                repo="repo", owner="owner", installation=self.installation
+            ),
+            "core_notification_installation_id_repo_owner",
+            "notification_repo_owner",
+        )
+
+    def test_notification_status_of_message(self):
+        self.assertUsesIndex(
+            NotificationStatus.objects.filter(
+                notification=self.notification, pullid="1", channel="C1"
+            ),
+            "notificationstatus_message",
+        )
+
+    def test_slack_user(self):
+        self.assertUsesIndex(
+            SlackUser.objects.filter(user_id="U1"),
+            "service_auth_slackuser_pkey",
+            "service_auth_slackuser_user_id_f3ba16e4_like",
+        )
+
+    def test_slack_users_of_team(self):
+        self.assertUsesIndex(
+            SlackUser.objects.filter(team_id="T1"), "slackuser_team"
+        )
+
+    def test_active_service(self):
+        self.assertUsesIndex(
+            Service.objects.filter(user=self.user, active=True),
+            "service_auth_service_user_id",
+        )
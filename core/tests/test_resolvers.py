@@ -1,5 +1,8 @@
-from unittest.mock import MagicMock, Mock, patch
+import json
+from unittest.mock import AsyncMock, MagicMock, Mock, patch
 
+import httpx
+from django.core.cache import cache
 from django.test import TestCase
 from django.utils import timezone
 
@@ -13,8 +16,8 @@ from core.resolvers import (BranchesResolver, BranchResolver,
                             FileCoverageReport, FlagsResolver,
                             NotificationResolver, OrgsResolver, OwnerResolver,
                             PullResolver, PullsResolver, RepoConfigResolver,
-                            RepoResolver, ReposResolver, UsersResolver,
-                            resolve_help, resolve_service_login,
+                            RepoResolver, ReposResolver, SummaryResolver,
+                            UsersResolver, resolve_help, resolve_service_login,
                             resolve_service_logout)
 from service_auth.models import Service, SlackUser
 
@@ -26,18 +29,21 @@ class TestServiceAuthResolvers(TestCase):
             user_id="user_random_id",
             email="",
             codecov_access_token="12345678-1234-5678-1234-567822245672",
+            profile_synced_at=timezone.now(),
         )
         self.client = Mock()
         self.command = {
             "user_id": "user_random_id",
             "trigger_id": "random_trigger_id",
             "channel_id": "random_channel_id",
+            "response_url": "https://hooks.slack.com/commands/1",
         }
         self.say = Mock()
 
+    @patch("requests.post")
     @patch("service_auth.actions.get_or_create_slack_user")
     def test_resolve_service_logout_no_active_service(
-        self, mock_get_or_create_slack_user
+        self, mock_get_or_create_slack_user, mock_post
     ):
         self.client.users_info.return_value = {
             "user": {"id": "user_random_id"}
@@ -48,15 +54,20 @@ class TestServiceAuthResolvers(TestCase):
         resolve_service_logout(
             client=self.client, command=self.command, say=self.say
         )
-        assert self.client.chat_postEphemeral.call_count == 1
-        assert self.client.chat_postEphemeral.call_args[1] == {
-            "channel": "random_channel_id",
-            "text": "You are not logged in to any service",
-            "user": "user_random_id",
-        }
+        mock_post.assert_called_once_with(
+            "https://hooks.slack.com/commands/1",
+            json={
+                "response_type": "ephemeral",
+                "text": "You are not logged in to any service",
+            },
+        )
+        self.client.chat_postEphemeral.assert_not_called()
 
+    @patch("requests.post")
     @patch("service_auth.actions.get_or_create_slack_user")
-    def test_resolve_service_logout(self, mock_get_or_create_slack_user):
+    def test_resolve_service_logout(
+        self, mock_get_or_create_slack_user, mock_post
+    ):
         self.client.users_info.return_value = {
             "user": {"id": "user_random_id"}
         }
@@ -74,12 +85,13 @@ class TestServiceAuthResolvers(TestCase):
         resolve_service_logout(
             client=self.client, command=self.command, say=self.say
         )
-        assert self.client.chat_postEphemeral.call_count == 1
-        assert self.client.chat_postEphemeral.call_args[1] == {
-            "channel": "random_channel_id",
-            "text": "Successfully logged out of active_service",
-            "user": "user_random_id",
-        }
+        mock_post.assert_called_once_with(
+            "https://hooks.slack.com/commands/1",
+            json={
+                "response_type": "ephemeral",
+                "text": "Successfully logged out of active_service",
+            },
+        )
 
     @patch("service_auth.actions.get_or_create_slack_user")
     def test_resolve_service_login(self, mock_get_or_create_slack_user):
@@ -90,6 +102,33 @@ class TestServiceAuthResolvers(TestCase):
 
         assert self.client.views_open.call_count == 1
 
+    def test_resolve_service_login_opens_modal_first(self):
+        SlackUser.objects.all().delete()
+        manager = Mock()
+        manager.attach_mock(self.client.views_open, "views_open")
+        manager.attach_mock(self.client.users_info, "users_info")
+        self.client.users_info.return_value = {
+            "user": {
+                "id": "user_random_id",
+                "name": "my_slack_user",
+                "profile": {"email": "", "display_name": ""},
+                "team_id": "T1",
+                "is_bot": False,
+                "is_owner": False,
+                "is_admin": False,
+            }
+        }
+
+        resolve_service_login(
+            client=self.client, command=self.command, say=self.say
+        )
+
+        assert [c[0] for c in manager.mock_calls] == [
+            "views_open",
+            "users_info",
+        ]
+        assert SlackUser.objects.filter(user_id="user_random_id").exists()
+
 
 class TestBaseResolvers(TestCase):
     def setUp(self):
@@ -240,6 +279,30 @@ class TestBaseResolvers(TestCase):
                 client=self.client, command=self.command, say=self.say
             ).resolve(self.params_dict, self.optional_params)
 
+    @patch("requests.get")
+    def test_repositories_resolver_all_pages(self, mock_requests_get):
+        mock_requests_get.side_effect = [
+            Mock(
+                status_code=200,
+                json=lambda: {"count": 2, "results": [{"repo1": "repo1"}]},
+            ),
+            Mock(
+                status_code=200,
+                json=lambda: {"count": 2, "results": [{"repo2": "repo2"}]},
+            ),
+        ]
+
+        res = ReposResolver(
+            client=self.client, command=self.command, say=self.say
+        ).resolve(self.params_dict, {"all": "true"})
+        assert res == (
+            "*Repositories for owner1*: (2)\n\n"
+            "*Repo1*: repo1\n------------------\n"
+            "*Repo2*: repo2\n------------------\n"
+        )
+        assert "all=" not in mock_requests_get.call_args_list[0][0][0]
+        assert "page=2" in mock_requests_get.call_args_list[1][0][0]
+
     @patch("requests.get")
     def test_repository_resolver(self, mock_requests_get):
         data = {
@@ -631,6 +694,65 @@ class TestBaseResolvers(TestCase):
         ).resolve(self.params_dict, self.optional_params)
         assert res == "No coverage report found for None in repo1"
 
+    def test_summary_resolver(self):
+        responses = {
+            "repos/repo1": {"name": "repo1", "branch": "main"},
+            "repos/repo1/totals": {"totals": {"coverage": 85.5}},
+            "repos/repo1/pulls?state=open": {
+                "count": 1,
+                "results": [{"pullid": 7, "title": "Add tests"}],
+            },
+            "repos/repo1/flags": {
+                "count": 1,
+                "results": [{"flag_name": "unit", "coverage": 90.0}],
+            },
+        }
+
+        async def get(url, headers):
+            url = url.replace("/?", "?").rstrip("/")
+            for suffix, data in responses.items():
+                if url.endswith(suffix):
+                    return Mock(status_code=200, json=lambda data=data: data)
+            return Mock(status_code=404)
+
+        with patch.object(
+            httpx.AsyncClient, "get", new=AsyncMock(side_effect=get)
+        ) as mock_get:
+            res = SummaryResolver(
+                client=self.client, command=self.command, say=self.say
+            ).resolve(self.params_dict, self.optional_params)
+
+        assert mock_get.await_count == 4
+        assert res == (
+            "*Summary for repo1*\n\n"
+            "Default branch: main\n"
+            "Coverage: 85.5%\n"
+            "Open pulls: 1\n"
+            "    #7 Add tests\n"
+            "Flags: 1\n"
+            "    unit: 90.0%\n"
+        )
+
+    def test_summary_resolver_partial_failure(self):
+        async def get(url, headers):
+            if url.rstrip("/").endswith("repos/repo1"):
+                return Mock(
+                    status_code=200,
+                    json=lambda: {"name": "repo1", "branch": "main"},
+                )
+            return Mock(status_code=500)
+
+        with patch.object(
+            httpx.AsyncClient, "get", new=AsyncMock(side_effect=get)
+        ):
+            res = SummaryResolver(
+                client=self.client, command=self.command, say=self.say
+            ).resolve(self.params_dict, self.optional_params)
+
+        assert "Coverage: unavailable" in res
+        assert "Open pulls: unavailable" in res
+        assert "Flags: unavailable" in res
+
 
 def test_help_resolver():
     client = MagicMock()
@@ -643,6 +765,50 @@ def test_help_resolver():
     assert client.chat_postEphemeral.call_count == 1
 
 
+class TestPostSnippet(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = MagicMock()
+        self.client.conversations_info.return_value = {
+            "channel": {"is_im": False}
+        }
+        self.client.conversations_open.return_value = {
+            "channel": {"id": "D1"}
+        }
+        self.client.files_upload_v2.return_value = {
+            "files": [{"id": "F1", "title": "Codecov JSON"}]
+        }
+        self.command = {
+            "user_id": "U1",
+            "channel_id": "C1",
+            "response_url": "https://hooks.slack.com/commands/1",
+        }
+
+    def tearDown(self):
+        cache.clear()
+
+    @patch("requests.post")
+    def test_post_snippet_in_channel_uploads_to_dm(self, mock_post):
+        resolver = RepoResolver(
+            client=self.client, command=self.command, say=Mock()
+        )
+
+        resolver.post_snippet("x" * 5000)
+        resolver.post_snippet("y" * 5000)
+
+        # channel type and dm channel are looked up once
+        self.client.conversations_info.assert_called_once_with(channel="C1")
+        self.client.conversations_open.assert_called_once_with(users="U1")
+        # a notice through the response_url and an upload, per snippet
+        assert mock_post.call_count == 2
+        assert mock_post.call_args[0] == (
+            "https://hooks.slack.com/commands/1",
+        )
+        assert self.client.files_upload_v2.call_count == 2
+        assert self.client.files_upload_v2.call_args[1]["channel"] == "D1"
+        self.client.files_upload.assert_not_called()
+
+
 class TestNotifications(TestCase):
     def setUp(self):
         self.slack_user = SlackUser.objects.create(
@@ -650,6 +816,7 @@ class TestNotifications(TestCase):
             user_id="random_user_id",
             email="",
             codecov_access_token="12345678-1234-5678-1234-567822245672",
+            profile_synced_at=timezone.now(),
         )
 
         self.params_dict = {
@@ -669,6 +836,9 @@ class TestNotifications(TestCase):
             "trigger_id": "random_trigger_id",
             "channel_id": "random_channel_id",
             "user_id": "random_user_id",
+            "response_url": "https://hooks.slack.com/commands/1",
+            "text": "notify username=owner1 service=gh repository=repo1",
+            "view_id": "V1",
         }
         self.say = Mock()
 
@@ -772,13 +942,21 @@ class TestNotifications(TestCase):
             json=lambda: {"private": False},
         )
 
-        res = NotificationResolver(
-            command=self.command, client=self.client, say=self.say, notify=True
-        ).resolve(self.params_dict, self.optional_params)
-        assert (
-            res
-            == f"Notifications for {self.params_dict['repository']} enabled in this channel 📳."
-        )
+        with patch("requests.post") as mock_post:
+            NotificationResolver(
+                command=self.command,
+                client=self.client,
+                say=self.say,
+                notify=True,
+            )()
+
+        res = f"Notifications for {self.params_dict['repository']} enabled in this channel 📳."
+        assert mock_post.call_args[1]["json"]["text"] == res
+        # the loading modal opened with the command shows the outcome
+        self.client.views_open.assert_not_called()
+        update = self.client.views_update.call_args[1]
+        assert update["view_id"] == "V1"
+        assert update["view"]["blocks"][0]["text"]["text"] == res
 
     @patch("requests.get")
     def test_notification_resolver_repo_not_found(self, mock_requests_get):
@@ -812,9 +990,21 @@ class TestNotifications(TestCase):
                 say=self.say,
                 notify=True,
             ).resolve(self.params_dict, self.optional_params)
-
         assert str(e.exception) == f"Error: 404 Repo Not Found."
 
+        with patch("requests.post"):
+            NotificationResolver(
+                command=self.command,
+                client=self.client,
+                say=self.say,
+                notify=True,
+            )()
+        update = self.client.views_update.call_args[1]
+        assert (
+            update["view"]["blocks"][0]["text"]["text"]
+            == "Error: 404 Repo Not Found."
+        )
+
     @patch("requests.get")
     def test_notification_resolver_private_repo(self, mock_requests_get):
         Service.objects.create(
@@ -844,4 +1034,13 @@ class TestNotifications(TestCase):
             command=self.command, client=self.client, say=self.say, notify=True
         ).resolve(self.params_dict, self.optional_params)
 
-        assert self.client.views_open.call_count == 1
+        assert res is None
+        self.client.views_open.assert_not_called()
+        update = self.client.views_update.call_args[1]
+        assert update["view_id"] == "V1"
+        assert json.loads(update["view"]["private_metadata"])["repository"] == (
+            self.params_dict["repository"]
+        )
+        assert update["view"]["blocks"][3]["elements"][0]["action_id"] == (
+            "approve-notification"
+        )
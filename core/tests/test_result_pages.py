@@ -0,0 +1,148 @@
+from unittest.mock import MagicMock, Mock, patch
+
+import pytest
+from django.core.cache import cache
+from django.core.cache.backends.db import DatabaseCache
+from django.test import TestCase
+
+from core.helpers import format_nested_keys
+from core.resolvers import ReposResolver
+from core.result_pages import (RESULT_EXPIRED_MESSAGE, RESULT_PAGE_SIZE,
+                               paginate_text, result_page_blocks,
+                               store_result_pages)
+from core.slack_listeners import handle_result_page
+from service_auth.models import SlackUser
+
+
+def repos_text(count):
+    data = {
+        "count": count,
+        "results": [
+            {"name": f"repo{i}", "description": "x" * 100}
+            for i in range(count)
+        ],
+    }
+    return format_nested_keys(
+        data, f"*Repositories for codecov*: ({count})\n\n"
+    )
+
+
+def test_paginate_text_keeps_results_whole():
+    pages = paginate_text(repos_text(100))
+
+    assert len(pages) > 1
+    for page in pages:
+        assert len(page) <= RESULT_PAGE_SIZE
+        assert page.startswith("*Repositories for codecov*: (100)\n\n")
+        assert page.endswith("------------------\n")
+
+    assert sum(page.count("*Name*") for page in pages) == 100
+
+
+def test_paginate_text_splits_long_results():
+    pages = paginate_text("*Title*\n" + ("y" * 99 + "\n") * 100, size=1000)
+
+    assert len(pages) == 12  # 9 lines fit next to the title
+    assert all(len(page) <= 1000 for page in pages)
+    assert sum(page.count("y" * 99) for page in pages) == 100
+
+
+def test_paginate_text_short_text():
+    assert paginate_text("*Title*\nsmall") == ["*Title*\n\nsmall"]
+
+
+class TestResultPageBlocks(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_navigation_buttons(self):
+        cursor = store_result_pages(["one", "two", "three"])
+
+        first = result_page_blocks(cursor, 0)
+        assert first[0]["text"]["text"] == "one"
+        assert [b["action_id"] for b in first[2]["elements"]] == [
+            "result-page-next"
+        ]
+
+        middle = result_page_blocks(cursor, 1)
+        assert [b["value"] for b in middle[2]["elements"]] == [
+            f"{cursor}:0",
+            f"{cursor}:2",
+        ]
+
+        last = result_page_blocks(cursor, 2)
+        assert [b["action_id"] for b in last[2]["elements"]] == [
+            "result-page-prev"
+        ]
+
+    def test_expired_cursor(self):
+        assert result_page_blocks("unknown", 0) is None
+        cursor = store_result_pages(["one"])
+        assert result_page_blocks(cursor, 1) is None
+
+    @pytest.mark.database_cache
+    def test_pages_are_shared_between_workers(self):
+        cursor = store_result_pages(["one", "two", "three"])
+
+        # the Next click can land on another gunicorn worker
+        other_worker = DatabaseCache("codecov_slack_cache", {})
+        assert other_worker.get(f"result_pages:{cursor}:2") == "three"
+        with self.assertNumQueries(1):
+            blocks = result_page_blocks(cursor, 1)
+        assert blocks[0]["text"]["text"] == "two"
+
+    def test_handle_result_page(self):
+        cursor = store_result_pages(["one", "two"])
+        ack, respond = Mock(), Mock()
+        body = {"actions": [{"value": f"{cursor}:1"}]}
+
+        handle_result_page(ack, body, respond)
+
+        ack.assert_called_once()
+        respond.assert_called_once_with(
+            blocks=result_page_blocks(cursor, 1), replace_original=True
+        )
+
+    def test_handle_expired_result_page(self):
+        respond = Mock()
+        body = {"actions": [{"value": "unknown:1"}]}
+
+        handle_result_page(Mock(), body, respond)
+
+        respond.assert_called_once_with(
+            text=RESULT_EXPIRED_MESSAGE, replace_original=True
+        )
+
+    @patch("requests.get")
+    def test_large_list_is_posted_as_pages(self, mock_requests_get):
+        SlackUser.objects.create(user_id="random-userid", username="user")
+        data = {
+            "count": 100,
+            "results": [
+                {"name": f"repo{i}", "description": "x" * 100}
+                for i in range(100)
+            ],
+        }
+        mock_requests_get.return_value = Mock(
+            status_code=200, json=lambda: data
+        )
+        client = MagicMock()
+        command = {
+            "user_id": "random-userid",
+            "channel_id": "random-channel",
+            "text": "repos username=codecov service=gh",
+            "response_url": "https://hooks.slack.com/commands/1",
+        }
+
+        with patch("requests.post") as mock_post:
+            ReposResolver(client=client, command=command, say=Mock())()
+
+        client.files_upload.assert_not_called()
+        blocks = mock_post.call_args[1]["json"]["blocks"]
+        assert blocks[0]["text"]["text"].startswith(
+            "*Repositories for codecov*: (100)"
+        )
+        assert blocks[2]["elements"][0]["action_id"] == "result-page-next"
@@ -1,13 +1,27 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
 from logging import Logger
+from threading import Barrier
+from unittest.mock import Mock, patch
 from uuid import uuid4
 
-from django.test import TestCase
+import pytest
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
 from django.utils import timezone
+from slack_bolt import BoltContext
+from slack_bolt.authorization.authorize import InstallationStoreAuthorize
 from slack_sdk.oauth.installation_store import Bot, Installation
 
-from core.models import SlackBot, SlackInstallation, SlackOAuthState
-from core.slack_datastores import (DjangoInstallationStore,
-                                   DjangoOAuthStateStore)
+from core.models import (PendingWorkspaceCleanup, SlackBot, SlackInstallation,
+                         SlackOAuthState)
+from core.slack_datastores import (SLACK_NO_USER_INSTALLATION_CACHE_TTL,
+                                   DjangoInstallationStore,
+                                   DjangoOAuthStateStore,
+                                   SignedOAuthStateStore, oauth_state_store)
 
 
 class TestDjangoOAuthStateStore(TestCase):
@@ -54,9 +68,136 @@ class TestDjangoOAuthStateStore(TestCase):
         rows = SlackOAuthState.objects.filter(state=state)
         self.assertEqual(len(rows), 0)
 
+    def test_consume_is_one_query(self):
+        state = self.store.issue()
+
+        with self.assertNumQueries(1):
+            self.assertTrue(self.store.consume(state=state))
+
+    def test_purge_expired(self):
+        now = timezone.now()
+        SlackOAuthState.objects.bulk_create(
+            SlackOAuthState(
+                state=str(uuid4()),
+                expire_at=now - timezone.timedelta(seconds=1),
+            )
+            for _ in range(5)
+        )
+        state = self.store.issue()
+
+        self.assertEqual(self.store.purge_expired(batch_size=2), 5)
+        self.assertEqual(
+            list(SlackOAuthState.objects.values_list("state", flat=True)),
+            [state],
+        )
+
+    def test_purge_command(self):
+        SlackOAuthState.objects.create(
+            state=str(uuid4()),
+            expire_at=timezone.now() - timezone.timedelta(seconds=1),
+        )
+        out = StringIO()
+
+        call_command("purge_oauth_states", stdout=out)
+
+        self.assertEqual(out.getvalue(), "Purged 1 expired OAuth states\n")
+        self.assertFalse(SlackOAuthState.objects.exists())
+
+
+class TestConcurrentOAuthStateConsume(TransactionTestCase):
+    def test_only_one_consumer_wins(self):
+        store = DjangoOAuthStateStore(
+            expiration_seconds=60, logger=Logger(__name__)
+        )
+        state = store.issue()
+        consumers = 8
+        barrier = Barrier(consumers)
+
+        def consume():
+            barrier.wait()
+            try:
+                return store.consume(state)
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=consumers) as executor:
+            results = list(executor.map(lambda _: consume(), range(consumers)))
+
+        self.assertEqual(results.count(True), 1)
+        self.assertFalse(SlackOAuthState.objects.exists())
+
+
+class TestSignedOAuthStateStore(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.store = SignedOAuthStateStore(
+            expiration_seconds=60, logger=Logger(__name__)
+        )
+
+    def test_issue_without_queries(self):
+        with self.assertNumQueries(0):
+            state = self.store.issue()
+
+        self.assertTrue(self.store.consume(state))
+        self.assertEqual(SlackOAuthState.objects.count(), 1)
+
+    def test_consume_once(self):
+        state = self.store.issue()
+
+        self.assertTrue(self.store.consume(state))
+        self.assertFalse(self.store.consume(state))
+
+    def test_consume_once_across_workers(self):
+        state = self.store.issue()
+        other_worker = SignedOAuthStateStore(
+            expiration_seconds=60, logger=Logger(__name__)
+        )
+
+        self.assertTrue(self.store.consume(state))
+        cache.clear()
+        self.assertFalse(other_worker.consume(state))
+
+    def test_consumed_states_are_purged(self):
+        self.assertTrue(self.store.consume(self.store.issue()))
+
+        with patch(
+            "django.utils.timezone.now",
+            return_value=timezone.now() + timezone.timedelta(seconds=61),
+        ):
+            purged = DjangoOAuthStateStore(
+                expiration_seconds=60, logger=Logger(__name__)
+            ).purge_expired()
+
+        self.assertEqual(purged, 1)
+
+    def test_consume_tampered(self):
+        state = self.store.issue()
+
+        self.assertFalse(self.store.consume(state[:-1] + "x"))
+        self.assertFalse(self.store.consume(str(uuid4())))
+
+    def test_consume_expired(self):
+        state = self.store.issue()
+
+        with patch("time.time", return_value=timezone.now().timestamp() + 61):
+            self.assertFalse(self.store.consume(state))
+
+    def test_store_is_picked_by_setting(self):
+        logger = Logger(__name__)
+        self.assertIsInstance(
+            oauth_state_store(120, logger), DjangoOAuthStateStore
+        )
+        with patch("core.slack_datastores.SLACK_OAUTH_STATE_STORE", "signed"):
+            self.assertIsInstance(
+                oauth_state_store(120, logger), SignedOAuthStateStore
+            )
+
 
 class TestDjangoInstallationStore(TestCase):
     def setUp(self):
+        caches["installations"].clear()
+        self.addCleanup(caches["installations"].clear)
         self.client_id = str(uuid4())[:32]
         self.logger = Logger(__name__)
         self.store = DjangoInstallationStore(self.client_id, self.logger)
@@ -100,6 +241,15 @@ class TestDjangoInstallationStore(TestCase):
         self.assertEqual(row.team_id, self.installation.team_id)
         self.assertEqual(row.user_id, self.installation.user_id)
 
+    def test_reinstall_cancels_the_workspace_cleanup(self):
+        PendingWorkspaceCleanup.objects.create(
+            team_id=self.installation.team_id
+        )
+
+        self.store.save(self.installation)
+
+        self.assertFalse(PendingWorkspaceCleanup.objects.exists())
+
     def test_update_if_exists(self):
         self.store.save(self.installation)
         self.store.save(self.second_installation)
@@ -151,3 +301,187 @@ class TestDjangoInstallationStore(TestCase):
         self.assertEqual(row.enterprise_id, self.installation.enterprise_id)
         self.assertEqual(row.team_id, self.installation.team_id)
         self.assertEqual(row.app_id, self.installation.app_id)
+
+    def test_find_installation_is_cached(self):
+        self.store.save(self.installation)
+        lookup = dict(
+            team_id=self.installation.team_id,
+            enterprise_id=self.installation.enterprise_id,
+            user_id=self.installation.user_id,
+        )
+        self.store.find_installation(**lookup)
+
+        with self.assertNumQueries(0):
+            row = self.store.find_installation(**lookup)
+        self.assertEqual(row.bot_token, self.installation.bot_token)
+
+    def test_not_found_is_not_cached(self):
+        lookup = dict(
+            team_id=self.bot.team_id, enterprise_id=self.bot.enterprise_id
+        )
+        self.assertIsNone(self.store.find_bot(**lookup))
+
+        SlackBot.objects.create(
+            client_id=self.client_id,
+            app_id=self.bot.app_id,
+            enterprise_id=self.bot.enterprise_id,
+            team_id=self.bot.team_id,
+            bot_token=self.bot.bot_token,
+            bot_id=self.bot.bot_id,
+            bot_user_id=self.bot.bot_user_id,
+            installed_at=timezone.now(),
+        )
+
+        self.assertIsNotNone(self.store.find_bot(**lookup))
+
+    def test_no_user_installation_is_cached_briefly(self):
+        self.store.save(self.installation)
+        lookup = dict(
+            team_id=self.installation.team_id,
+            enterprise_id=self.installation.enterprise_id,
+            user_id="another-user-id",
+        )
+        self.assertIsNone(self.store.find_installation(**lookup))
+
+        with self.assertNumQueries(0):
+            self.assertIsNone(self.store.find_installation(**lookup))
+
+        expired = time.time() + SLACK_NO_USER_INSTALLATION_CACHE_TTL + 1
+        with patch("time.time", return_value=expired):
+            with self.assertNumQueries(1):
+                self.store.find_installation(**lookup)
+
+    @pytest.mark.database_cache
+    def test_authorization_queries_with_the_production_caches(self):
+        """Bolt authorizing a user who didn't install the app"""
+        self.store.save(self.installation)
+        authorize = InstallationStoreAuthorize(
+            logger=self.logger, installation_store=self.store
+        )
+        client = Mock()
+        client.auth_test.return_value = {
+            "bot_id": self.installation.bot_id,
+            "user_id": self.installation.bot_user_id,
+            "team_id": self.installation.team_id,
+            "url": "https://example.slack.com/",
+        }
+
+        def authorize_user():
+            return authorize(
+                context=BoltContext(client=client),
+                enterprise_id=self.installation.enterprise_id,
+                team_id=self.installation.team_id,
+                user_id="another-user-id",
+            )
+
+        # the workspace's installation, then the user's, which isn't found
+        with self.assertNumQueries(2):
+            self.assertIsNotNone(authorize_user())
+        with self.assertNumQueries(0):
+            self.assertIsNotNone(authorize_user())
+
+    def test_save_invalidates_cached_installation(self):
+        lookup = dict(
+            team_id=self.installation.team_id,
+            enterprise_id=self.installation.enterprise_id,
+            user_id=self.installation.user_id,
+        )
+        self.store.save(self.installation)
+        self.store.find_installation(**lookup)
+
+        self.store.save(self.second_installation)
+
+        row = self.store.find_installation(**lookup)
+        self.assertEqual(row.bot_user_id, "other-test-bot-user-id")
+
+    def test_delete_installation_clears_user_token(self):
+        self.installation.user_token = "test-user-token"
+        self.store.save(self.installation)
+        lookup = dict(
+            team_id=self.installation.team_id,
+            enterprise_id=self.installation.enterprise_id,
+            user_id=self.installation.user_id,
+        )
+        self.store.find_installation(**lookup)
+
+        self.store.delete_installation(**lookup)
+
+        row = self.store.find_installation(**lookup)
+        self.assertIsNone(row.user_token)
+        self.assertEqual(row.bot_token, self.installation.bot_token)
+
+    def test_delete_bot(self):
+        self.store.save(self.installation)
+        lookup = dict(
+            team_id=self.installation.team_id,
+            enterprise_id=self.installation.enterprise_id,
+        )
+        self.store.find_installation(**lookup)
+
+        self.store.delete_bot(**lookup)
+
+        self.assertIsNone(self.store.find_bot(**lookup))
+        self.assertIsNone(self.store.find_installation(**lookup).bot_token)
+
+    def test_find_installation_with_latest_bot_in_one_query(self):
+        # org-wide installations have no team, so several can coexist
+        for user_id, bot_token, days in [
+            ("test-user-id", "old-bot-token", 0),
+            ("other-user-id", "latest-bot-token", 1),
+        ]:
+            SlackInstallation.objects.create(
+                client_id=self.client_id,
+                app_id="test-app-id",
+                enterprise_id="test-enterprise-id",
+                team_id=None,
+                user_id=user_id,
+                bot_token=bot_token,
+                installed_at=timezone.now() + timezone.timedelta(days=days),
+            )
+
+        with self.assertNumQueries(1):
+            row = self.store.find_installation(
+                team_id=None,
+                enterprise_id="test-enterprise-id",
+                user_id="test-user-id",
+            )
+
+        self.assertEqual(row.user_id, "test-user-id")
+        self.assertEqual(row.bot_token, "latest-bot-token")
+
+    def test_save_upserts_in_one_transaction(self):
+        self.store.save(self.installation)
+
+        # installation and bot upserts and the cancelled workspace cleanup,
+        # between a savepoint and its release
+        with self.assertNumQueries(5):
+            self.store.save(self.second_installation)
+
+        self.assertEqual(
+            SlackInstallation.objects.filter(
+                team_id=self.installation.team_id
+            ).count(),
+            1,
+        )
+        self.assertEqual(
+            SlackBot.objects.filter(team_id=self.installation.team_id).count(),
+            1,
+        )
+
+    @patch("core.slack_datastores.replica_configured", return_value=True)
+    def test_installation_missing_on_replica_is_read_from_primary(self, _):
+        fetch = Mock(side_effect=[None, self.installation])
+
+        found = self.store._cached("installation", "E1", "T1", None, fetch)
+
+        self.assertIs(found.team_id, self.installation.team_id)
+        self.assertEqual(fetch.call_count, 2)
+
+    def test_recently_written_team_is_read_from_primary(self):
+        self.store.invalidate(enterprise_id="E1", team_id="T1")
+        fetch = Mock(return_value=None)
+
+        with patch("core.slack_datastores.read_replica") as read_replica:
+            self.store._cached("installation", "E1", "T1", None, fetch)
+
+        read_replica.assert_not_called()
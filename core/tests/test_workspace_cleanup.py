@@ -0,0 +1,178 @@
+from io import StringIO
+from unittest.mock import Mock, patch
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from core.models import (Notification, NotificationConfig,
+                         NotificationConfigStatus, NotificationStatus,
+                         PendingWorkspaceCleanup, SlackBot, SlackInstallation)
+from core.slack_listeners import (cleanup_uninstalled_workspace,
+                                  handle_app_uninstalled)
+from core.workspace_cleanup import (cancel_workspace_cleanup,
+                                    cleanup_workspace, delete_workspace_data,
+                                    schedule_workspace_cleanup, submit_cleanup)
+from service_auth.models import Service, SlackUser
+
+
+def create_workspace(team_id, repos=3):
+    now = timezone.now()
+    installation = SlackInstallation.objects.create(
+        client_id="client",
+        app_id="app",
+        team_id=team_id,
+        user_id="U1",
+        bot_token=f"xoxb-{team_id}",
+        installed_at=now,
+    )
+    SlackBot.objects.create(
+        client_id="client", app_id="app", team_id=team_id, installed_at=now
+    )
+    for i in range(repos):
+        notification = Notification.objects.create(
+            installation=installation, repo=f"repo{i}", owner="owner"
+        )
+        NotificationStatus.objects.create(
+            notification=notification, status="success", pullid=str(i)
+        )
+        config = NotificationConfig.objects.create(
+            installation=installation, repo=f"repo{i}", owner="owner"
+        )
+        NotificationConfigStatus.objects.create(notification_config=config)
+    user = SlackUser.objects.create(user_id=f"{team_id}-user", team_id=team_id)
+    Service.objects.create(user=user, name="github", service_userid="1")
+
+
+class TestDeleteWorkspaceData(TestCase):
+    def test_deletes_only_the_workspace_in_batches(self):
+        create_workspace("T1")
+        create_workspace("T2")
+
+        deleted = delete_workspace_data("T1", batch_size=2)
+
+        assert deleted == {
+            "core_notificationstatus": 3,
+            "core_notification": 3,
+            "core_notificationconfigstatus": 3,
+            "core_notificationconfig": 3,
+            "core_slackinstallation": 1,
+            "core_slackbot": 1,
+            "service_auth_service": 1,
+            "service_auth_slackuser": 1,
+        }
+        assert not SlackInstallation.objects.filter(team_id="T1").exists()
+        assert not SlackUser.objects.filter(team_id="T1").exists()
+
+        assert (
+            Notification.objects.filter(installation__team_id="T2").count()
+            == 3
+        )
+        assert NotificationStatus.objects.count() == 3
+        assert Service.objects.filter(user__team_id="T2").exists()
+        assert SlackBot.objects.filter(team_id="T2").exists()
+
+    def test_batches_run_without_loading_rows(self):
+        create_workspace("T1", repos=5)
+
+        # 3 batches for each notification table, 1 for the other 4 tables,
+        # each a DELETE between a savepoint and its release
+        with self.assertNumQueries(3 * (4 * 3 + 4)):
+            delete_workspace_data("T1", batch_size=2)
+
+
+class TestAppUninstalled(TestCase):
+    @patch("core.slack_listeners.submit_cleanup")
+    def test_cleanup_runs_in_the_background(self, submit_cleanup):
+        body = {"team_id": "T1", "event": {"type": "app_uninstalled"}}
+
+        handle_app_uninstalled(body, Mock())
+
+        assert PendingWorkspaceCleanup.objects.filter(team_id="T1").exists()
+        submit_cleanup.assert_called_once_with(
+            cleanup_uninstalled_workspace, None, "T1"
+        )
+
+    @patch("core.slack_listeners.submit_cleanup", return_value=False)
+    def test_rejected_cleanup_stays_pending(self, _):
+        create_workspace("T1")
+        body = {"team_id": "T1", "event": {"type": "app_uninstalled"}}
+
+        handle_app_uninstalled(body, Mock())
+
+        assert PendingWorkspaceCleanup.objects.filter(team_id="T1").exists()
+        assert SlackInstallation.objects.filter(team_id="T1").exists()
+
+    @patch("core.slack_listeners.installation_store")
+    def test_cleanup_invalidates_cached_installation(self, store):
+        create_workspace("T1")
+        schedule_workspace_cleanup("E1", "T1")
+
+        cleanup_uninstalled_workspace("E1", "T1")
+
+        assert not SlackInstallation.objects.exists()
+        assert not PendingWorkspaceCleanup.objects.exists()
+        store.invalidate.assert_called_once_with(
+            enterprise_id="E1", team_id="T1"
+        )
+
+    @patch("core.workspace_cleanup.cleanup_executor")
+    def test_submit_cleanup_when_shutting_down(self, executor):
+        executor.submit.side_effect = RuntimeError
+
+        assert not submit_cleanup(cleanup_uninstalled_workspace, None, "T1")
+
+    def test_reinstall_cancels_the_cleanup(self):
+        create_workspace("T1")
+        schedule_workspace_cleanup(None, "T1")
+
+        cancel_workspace_cleanup("T1")
+
+        assert cleanup_workspace("T1") is None
+        assert SlackInstallation.objects.filter(team_id="T1").exists()
+
+    def test_reinstall_during_the_cleanup_stops_it(self):
+        create_workspace("T1")
+        schedule_workspace_cleanup(None, "T1")
+
+        # the reinstall lands once the first table is done
+        with patch("core.workspace_cleanup.logger") as logger:
+            logger.info.side_effect = lambda _: cancel_workspace_cleanup("T1")
+            assert cleanup_workspace("T1", batch_size=2) is None
+
+        assert not NotificationStatus.objects.exists()
+        assert Notification.objects.count() == 3
+        assert SlackInstallation.objects.filter(team_id="T1").exists()
+        assert SlackBot.objects.filter(team_id="T1").exists()
+
+    def test_installations_saved_after_the_uninstall_are_kept(self):
+        create_workspace("T1")
+        schedule_workspace_cleanup(None, "T1")
+        SlackInstallation.objects.filter(team_id="T1").update(
+            installed_at=timezone.now()
+        )
+
+        deleted = cleanup_workspace("T1")
+
+        assert deleted["core_slackinstallation"] == 0
+        assert deleted["core_notification"] == 0
+        assert deleted["core_slackbot"] == 1
+        assert SlackInstallation.objects.filter(team_id="T1").exists()
+        assert not PendingWorkspaceCleanup.objects.exists()
+
+
+class TestCleanupWorkspacesCommand(TestCase):
+    @patch("core.slack_datastores.DjangoInstallationStore.invalidate")
+    def test_finishes_pending_cleanups(self, invalidate):
+        create_workspace("T1")
+        create_workspace("T2")
+        schedule_workspace_cleanup("E1", "T1")
+        out = StringIO()
+
+        call_command("cleanup_workspaces", stdout=out)
+
+        assert out.getvalue() == "Cleaned up 1 uninstalled workspaces\n"
+        assert not SlackInstallation.objects.filter(team_id="T1").exists()
+        assert SlackInstallation.objects.filter(team_id="T2").exists()
+        assert not PendingWorkspaceCleanup.objects.exists()
+        invalidate.assert_called_once_with(enterprise_id="E1", team_id="T1")
@@ -5,7 +5,7 @@ from django.views.decorators.csrf import csrf_exempt
 from slack_bolt.adapter.django import SlackRequestHandler
 
 from .slack_listeners import app
-from .views import NotificationView, health, slack_install
+from .views import DatabaseMetricsView, NotificationView, health, slack_install
 
 handler = SlackRequestHandler(app=app)
 
@@ -28,4 +28,5 @@ urlpatterns = [
     path("slack/oauth_redirect", slack_oauth_handler, name="oauth_redirect"),
     path("notify", NotificationView.as_view(), name="notify"),
     path("health", health, name="health"),
+    path("db-metrics", DatabaseMetricsView.as_view(), name="db_metrics"),
 ]
@@ -8,10 +8,12 @@ from rest_framework.views import APIView
 from slack_sdk import WebClient
 
 from core.authentication import InternalTokenAuthentication
+from core.db_metrics import connection_metrics
+from core.db_router import read_replica
 from core.helpers import format_comparison, validate_notification_params
 from core.models import Notification, NotificationStatus
 from core.permissions import InternalTokenPermissions
-from core.slack_datastores import DjangoOAuthStateStore
+from core.slack_datastores import oauth_state_store
 
 logger = logging.getLogger(__name__)
 
@@ -24,6 +26,19 @@ def health(request):
     return HttpResponse("Codecov Slack App is live!")
 
 
+class DatabaseMetricsView(APIView):
+    """
+    Database connection stats of the worker that serves the request,
+    a POST like every internal endpoint
+    """
+
+    authentication_classes = [InternalTokenAuthentication]
+    permission_classes = [InternalTokenPermissions]
+
+    def post(self, request, format=None):
+        return Response(connection_metrics.stats())
+
+
 class NotificationView(APIView):
     """
     Handle comparison data from Codecov
@@ -39,8 +54,14 @@ class NotificationView(APIView):
 
         validate_notification_params(comparison, repo, owner)
 
-        notifications = Notification.objects.filter(owner=owner, repo=repo)
-        if not notifications.exists():
+        # routing only reads, the statuses below are written to the primary
+        with read_replica():
+            notifications = list(
+                Notification.objects.filter(
+                    owner=owner, repo=repo
+                ).select_related("installation")
+            )
+        if not notifications:
             return Response({"detail": "No notifications found"}, status=200)
 
         for notification in notifications:
@@ -117,7 +138,7 @@ class NotificationView(APIView):
 
 
 def slack_install(request):
-    store = DjangoOAuthStateStore(
+    store = oauth_state_store(
         expiration_seconds=120,
         logger=logger,
     )
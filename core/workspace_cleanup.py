@@ -0,0 +1,199 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+
+from core.models import (Notification, NotificationConfig,
+                         NotificationConfigStatus, NotificationStatus,
+                         PendingWorkspaceCleanup, SlackBot, SlackInstallation)
+from service_auth.models import Service, SlackUser
+
+logger = logging.getLogger(__name__)
+
+WORKSPACE_CLEANUP_BATCH_SIZE = int(
+    os.environ.get("WORKSPACE_CLEANUP_BATCH_SIZE", 1000)
+)
+
+# cleanups run off the request thread, apart from the slash commands
+cleanup_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("WORKSPACE_CLEANUP_WORKERS", 1)),
+    thread_name_prefix="codecov-workspace-cleanup",
+)
+
+
+def _workspace_rows():
+    """
+    (model, query of the ids of its rows that belong to the workspace in
+    %(team_id)s), children before their parents. The tables have no
+    ON DELETE CASCADE, so deleting in this order is what cascades.
+    Installations and bots saved after %(installed_before)s, by a reinstall,
+    are left alone with their notifications.
+    """
+    installations = (
+        f"SELECT id FROM {SlackInstallation._meta.db_table}"
+        " WHERE team_id = %(team_id)s"
+        " AND installed_at <= %(installed_before)s"
+    )
+    notifications = (
+        f"SELECT id FROM {Notification._meta.db_table}"
+        f" WHERE installation_id IN ({installations})"
+    )
+    notification_configs = (
+        f"SELECT id FROM {NotificationConfig._meta.db_table}"
+        f" WHERE installation_id IN ({installations})"
+    )
+    users = (
+        f"SELECT user_id FROM {SlackUser._meta.db_table}"
+        " WHERE team_id = %(team_id)s"
+    )
+    return [
+        (
+            NotificationStatus,
+            f"SELECT id FROM {NotificationStatus._meta.db_table}"
+            f" WHERE notification_id IN ({notifications})",
+        ),
+        (Notification, notifications),
+        (
+            NotificationConfigStatus,
+            f"SELECT id FROM {NotificationConfigStatus._meta.db_table}"
+            f" WHERE notification_config_id IN ({notification_configs})",
+        ),
+        (NotificationConfig, notification_configs),
+        (SlackInstallation, installations),
+        (
+            SlackBot,
+            f"SELECT id FROM {SlackBot._meta.db_table}"
+            " WHERE team_id = %(team_id)s"
+            " AND installed_at <= %(installed_before)s",
+        ),
+        (
+            Service,
+            f"SELECT id FROM {Service._meta.db_table}"
+            f" WHERE user_id IN ({users})",
+        ),
+        (SlackUser, users),
+    ]
+
+
+def _delete_in_batches(
+    model, ids_query, params, batch_size, pending=None
+) -> Optional[int]:
+    table = model._meta.db_table
+    pk = model._meta.pk.column
+    deleted = 0
+    while True:
+        # each batch is its own short transaction, keyed on the primary key
+        with transaction.atomic(), connection.cursor() as cursor:
+            if pending is not None:
+                # a reinstall deletes the pending cleanup before it saves
+                # the installation, so holding the row until the batch
+                # commits keeps the two apart
+                cursor.execute(
+                    f"SELECT 1 FROM {PendingWorkspaceCleanup._meta.db_table}"
+                    " WHERE id = %s FOR UPDATE",
+                    [pending.pk],
+                )
+                if cursor.fetchone() is None:
+                    return None
+            cursor.execute(
+                f"DELETE FROM {table} WHERE {pk} IN"
+                f" ({ids_query} ORDER BY 1 LIMIT %(batch_size)s)",
+                {**params, "batch_size": batch_size},
+            )
+            batch = cursor.rowcount
+
+        deleted += batch
+        if batch < batch_size:
+            return deleted
+
+
+def delete_workspace_data(
+    team_id, batch_size=WORKSPACE_CLEANUP_BATCH_SIZE, pending=None
+) -> Optional[Dict[str, int]]:
+    """
+    Deletes everything stored for an uninstalled workspace, in batches of
+    plain SQL deletes so nothing is loaded into memory. Returns how many
+    rows were deleted per table.
+
+    With the workspace's `pending` cleanup, only installations from before
+    it are deleted, and every batch first checks it's still pending.
+    Returns None once it isn't, the workspace was installed again.
+    """
+    params = {
+        "team_id": team_id,
+        "installed_before": (
+            pending.created_at if pending is not None else timezone.now()
+        ),
+    }
+    deleted = {}
+    for model, ids_query in _workspace_rows():
+        rows = _delete_in_batches(
+            model, ids_query, params, batch_size, pending=pending
+        )
+        if rows is None:
+            logger.info(f"Workspace {team_id} cleanup: cancelled")
+            return None
+
+        deleted[model._meta.db_table] = rows
+        logger.info(
+            f"Workspace {team_id} cleanup: deleted"
+            f" {deleted[model._meta.db_table]} rows from"
+            f" {model._meta.db_table}"
+        )
+
+    return deleted
+
+
+def _run_cleanup(fn, *args):
+    try:
+        fn(*args)
+    except Exception as e:
+        logger.error(f"Error cleaning up workspace: {e}")
+    finally:
+        # the executor's threads outlive the request
+        close_old_connections()
+
+
+def submit_cleanup(fn, *args) -> bool:
+    """Runs `fn` on the cleanup executor, False if it's shutting down"""
+    try:
+        cleanup_executor.submit(_run_cleanup, fn, *args)
+    except RuntimeError:
+        return False
+    return True
+
+
+def schedule_workspace_cleanup(enterprise_id, team_id):
+    """Records that the workspace's data has to be deleted"""
+    PendingWorkspaceCleanup.objects.get_or_create(
+        team_id=team_id, defaults={"enterprise_id": enterprise_id}
+    )
+
+
+def cancel_workspace_cleanup(team_id):
+    """The workspace installed the app again, its data stays"""
+    PendingWorkspaceCleanup.objects.filter(team_id=team_id).delete()
+
+
+def cleanup_workspace(
+    team_id, batch_size=WORKSPACE_CLEANUP_BATCH_SIZE
+) -> Optional[Dict[str, int]]:
+    """
+    Deletes the data of a workspace with a pending cleanup, then the
+    pending cleanup itself. Returns None if there was none pending, like
+    after a reinstall, including one that happens while it runs. Safe to run
+    again after an interruption.
+    """
+    pending = PendingWorkspaceCleanup.objects.filter(team_id=team_id).first()
+    if pending is None:
+        return None
+
+    deleted = delete_workspace_data(
+        team_id, batch_size=batch_size, pending=pending
+    )
+    if deleted is not None:
+        pending.delete()
+    return deleted
@@ -1,13 +1,22 @@
 import json
 import logging
+import math
 import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Dict, Tuple
 
 import jwt
 import requests
+from django.utils import timezone
+from slack_sdk.errors import SlackApiError
 
 from core.enums import EndpointName
 
-from .helpers import _user_info, get_endpoint_details
+from .codecov_client import (CODECOV_REQUEST_TIMEOUT, AsyncCodecovClient,
+                             CodecovUnauthorizedError, codecov_get,
+                             codecov_request_headers, parse_codecov_response)
+from .helpers import ENDPOINT_ROUTES, _user_info, get_endpoint_details
 from .models import SlackUser
 
 logger = logging.getLogger(__name__)
@@ -19,51 +28,124 @@ CODECOV_INTERNAL_TOKEN = os.environ.get("CODECOV_INTERNAL_TOKEN")
 USER_ID_SECRET = os.environ.get("USER_ID_SECRET")
 CODECOV_PUBLIC_API = os.environ.get("CODECOV_PUBLIC_API")
 CODECOV_API_URL = os.environ.get("CODECOV_API_URL")
+CODECOV_TOKEN_VERIFICATION_TTL = int(
+    os.environ.get("CODECOV_TOKEN_VERIFICATION_TTL", 3600)
+)  # seconds a verified codecov access token is trusted without a new probe
+SLACK_PROFILE_TTL = int(
+    os.environ.get("SLACK_PROFILE_TTL", 24 * 60 * 60)
+)  # seconds a cached slack profile is used before calling users.info again
+CODECOV_PAGINATION_CONCURRENCY = int(
+    os.environ.get("CODECOV_PAGINATION_CONCURRENCY", 4)
+)
+CODECOV_PAGINATION_MAX_PAGES = int(
+    os.environ.get("CODECOV_PAGINATION_MAX_PAGES", 20)
+)
 
 
 def verify_codecov_access_token(slack_user: SlackUser):
     owner = slack_user.active_service.service_username
     service = slack_user.active_service.name
     codecov_access_token = slack_user.codecov_access_token
-    url = f"{CODECOV_PUBLIC_API}/{service}/{owner}"
+    url = get_endpoint_details(
+        EndpointName.OWNER, service=service, params_dict={"username": owner}
+    ).url
     headers = {
         "accept": "application/json",
         "Authorization": f"Bearer {codecov_access_token}",
     }
 
-    response = requests.get(url, headers=headers)
+    response = codecov_get(EndpointName.OWNER, url, headers)
     return response.status_code == 200
 
 
+def codecov_access_token_recently_verified(slack_user: SlackUser):
+    verified_at = slack_user.codecov_access_token_verified_at
+    if not verified_at:
+        return False
+
+    return timezone.now() - verified_at < timedelta(
+        seconds=CODECOV_TOKEN_VERIFICATION_TTL
+    )
+
+
+def invalidate_codecov_access_token_verification(slack_user: SlackUser):
+    slack_user.codecov_access_token_verified_at = None
+    slack_user.save(update_fields=["codecov_access_token_verified_at"])
+
+
+def refresh_rejected_codecov_access_token(slack_user: SlackUser) -> bool:
+    """
+    Codecov answered 401 to a token we trusted: drops its cached verification
+    and mints a new one. Returns whether there's a new token to retry with.
+    """
+    if not (slack_user.codecov_access_token and slack_user.active_service):
+        return False
+
+    invalidate_codecov_access_token_verification(slack_user)
+    try:
+        create_new_codecov_access_token(slack_user)
+    except Exception as e:
+        logger.warning(f"Could not refresh codecov access token: {e}")
+        return False
+    return True
+
+
 def get_or_create_slack_user(user_info):
     user_id = user_info["user"]["id"]
     current_user = SlackUser.objects.filter(user_id=user_id).first()
 
     if not current_user:
-        user_info = _user_info(user_info)
-        (
-            username,
-            email,
-            display_name,
-            team_id,
-            is_bot,
-            is_owner,
-            is_admin,
-        ) = user_info.values()
-
         current_user = SlackUser.objects.create(
             user_id=user_id,
-            username=username,
-            email=email,
-            team_id=team_id,
-            is_bot=is_bot,
-            display_name=display_name,
-            is_owner=is_owner,
-            is_admin=is_admin,
+            profile_synced_at=timezone.now(),
+            **_user_info(user_info),
         )
     return current_user
 
 
+def slack_user_profile_is_fresh(slack_user: SlackUser):
+    synced_at = slack_user.profile_synced_at
+    if not synced_at:
+        return False
+
+    return timezone.now() - synced_at < timedelta(seconds=SLACK_PROFILE_TTL)
+
+
+def sync_slack_user_profile(user_info):
+    """Refreshes the stored profile of a known user from a users.info payload"""
+    return SlackUser.objects.filter(user_id=user_info["user"]["id"]).update(
+        profile_synced_at=timezone.now(),
+        updated_at=timezone.now(),
+        **_user_info(user_info),
+    )
+
+
+def _get_slack_user(user_id):
+    return (
+        SlackUser.objects.with_active_service().filter(user_id=user_id).first()
+    )
+
+
+def get_cached_slack_user(client, user_id) -> SlackUser:
+    """
+    Returns the SlackUser for `user_id`, only calling users.info for unknown
+    users or when the stored profile is older than SLACK_PROFILE_TTL
+    """
+    slack_user = _get_slack_user(user_id)
+    if slack_user and slack_user_profile_is_fresh(slack_user):
+        return slack_user
+
+    user_info = client.users_info(user=user_id)
+    if not slack_user:
+        return get_or_create_slack_user(user_info)
+
+    for field, value in _user_info(user_info).items():
+        setattr(slack_user, field, value)
+    slack_user.profile_synced_at = timezone.now()
+    slack_user.save()
+    return slack_user
+
+
 def create_new_codecov_access_token(slack_user: SlackUser):
     request_url = f"{CODECOV_API_URL}/internal/slack/generate-token/"
     headers = {
@@ -75,30 +157,45 @@ def create_new_codecov_access_token(slack_user: SlackUser):
         "service": slack_user.active_service.name,
     }
     response = requests.post(
-        request_url, headers=headers, data=json.dumps(data)
+        request_url,
+        headers=headers,
+        data=json.dumps(data),
+        timeout=CODECOV_REQUEST_TIMEOUT,
     )
 
     if response.status_code == 200:
         data = response.json()
         slack_user.codecov_access_token = data.get("token")
+        # a freshly minted token doesn't need to be probed again
+        slack_user.codecov_access_token_verified_at = timezone.now()
         slack_user.save()
     else:
         raise Exception("Error creating codecov access token")
 
 
-def authenticate_command(client, command):
-    slack_user_id = command["user_id"]
-    user_info = client.users_info(user=slack_user_id)
-    slack_user = get_or_create_slack_user(user_info)
+def authenticate_command(client, command) -> SlackUser:
+    slack_user = get_cached_slack_user(client, command["user_id"])
 
     codecov_access_token = slack_user.codecov_access_token
     if codecov_access_token:
+        if codecov_access_token_recently_verified(slack_user):
+            return slack_user
+
         verified = verify_codecov_access_token(slack_user)
         if not verified:
             create_new_codecov_access_token(slack_user)
-        return
+        else:
+            slack_user.codecov_access_token_verified_at = timezone.now()
+            slack_user.save(update_fields=["codecov_access_token_verified_at"])
+        return slack_user
 
-    view_login_modal(client, command)
+    try:
+        view_login_modal(client, command)
+    except SlackApiError as e:
+        # the command waited in the queue past the trigger_id's lifetime
+        logger.warning(f"Could not open the login modal: {e}")
+        raise Exception("Please use `/codecov login` to log in first")
+    return slack_user
 
 
 def view_login_modal(
@@ -112,10 +209,6 @@ def view_login_modal(
         algorithm="HS256",
     )
 
-    # create slack user
-    user_info = client.users_info(user=slack_user_id)
-    get_or_create_slack_user(user_info)
-
     # we support gh flow at first
     github_auth_url = f"https://github.com/login/oauth/authorize?client_id={GITHUB_CLIENT_ID}&redirect_uri={GITHUB_REDIRECT_URI}&scope={GITHUB_SCOPES}&state={slack_state_jwt}"
 
@@ -149,8 +242,8 @@ def view_login_modal(
     )
 
 
-def handle_codecov_public_api_request(
-    user_id,
+def _codecov_public_api_request(
+    slack_user: SlackUser,
     endpoint_name: EndpointName,
     service=None,
     optional_params=None,
@@ -159,7 +252,6 @@ def handle_codecov_public_api_request(
     if not params_dict:
         params_dict = {}
 
-    slack_user = SlackUser.objects.filter(user_id=user_id).first()
     if slack_user.active_service:
         service = slack_user.active_service.name
 
@@ -170,32 +262,177 @@ def handle_codecov_public_api_request(
         params_dict=params_dict,
     )
 
-    if not endpoint_details:
-        raise Exception("Endpoint not found")
-
     request_url = endpoint_details.url
-    headers = {
-        "accept": "application/json",
-    }
-
     codecov_access_token = slack_user.codecov_access_token
+    headers = codecov_request_headers(slack_user.codecov_access_token)
 
-    if codecov_access_token:
-        headers["Authorization"] = f"Bearer {codecov_access_token}"
+    response = codecov_get(endpoint_name, request_url, headers)
+    # the cached verification is stale, mint a new token and retry once
+    if response.status_code == 401 and refresh_rejected_codecov_access_token(
+        slack_user
+    ):
+        headers = codecov_request_headers(slack_user.codecov_access_token)
+        response = codecov_get(endpoint_name, request_url, headers)
 
-    response = requests.get(request_url, headers=headers)
-    if response.status_code == 200:
-        return response.json()
-    elif response.status_code == 404:
-        msg = (
-            f"Please use `/codecov login` if you are accessing private data."
-            if not codecov_access_token
-            else ""
+    return parse_codecov_response(response, codecov_access_token)
+
+
+def handle_codecov_public_api_request(
+    user_id,
+    endpoint_name: EndpointName,
+    service=None,
+    optional_params=None,
+    params_dict=None,
+    slack_user: SlackUser = None,
+):
+    if slack_user is None:
+        slack_user = _get_slack_user(user_id)
+    return _codecov_public_api_request(
+        slack_user,
+        endpoint_name,
+        service=service,
+        optional_params=optional_params,
+        params_dict=params_dict,
+    )
+
+
+def handle_codecov_public_api_paginated_request(
+    user_id,
+    endpoint_name: EndpointName,
+    service=None,
+    optional_params=None,
+    params_dict=None,
+    slack_user: SlackUser = None,
+):
+    """
+    Fetches every page of a list endpoint. The first page tells us the total
+    count and the page size, the remaining pages are then fetched concurrently
+    and their results are yielded in order as they come in.
+    """
+    if slack_user is None:
+        slack_user = _get_slack_user(user_id)
+    route = ENDPOINT_ROUTES.get(endpoint_name)
+    if not route or not route.paginated:
+        return _codecov_public_api_request(
+            slack_user,
+            endpoint_name,
+            service=service,
+            optional_params=optional_params,
+            params_dict=params_dict,
+        )
+
+    optional_params = dict(optional_params or {})
+    optional_params.pop("page", None)
+
+    first_page = _codecov_public_api_request(
+        slack_user,
+        endpoint_name,
+        service=service,
+        optional_params=optional_params,
+        params_dict=params_dict,
+    )
+
+    count = first_page.get("count") or 0
+    page_size = len(first_page.get("results") or [])
+    if not page_size or count <= page_size:
+        return first_page
+
+    total_pages = min(
+        math.ceil(count / page_size), CODECOV_PAGINATION_MAX_PAGES
+    )
+    # every fetched page is full when the cap cuts the results short
+    truncated = {}
+    if page_size * total_pages < count:
+        truncated = {"truncated": True, "shown": page_size * total_pages}
+    if slack_user.active_service:
+        service = slack_user.active_service.name
+
+    # resolve everything that touches the database before fanning out
+    codecov_access_token = slack_user.codecov_access_token
+    headers = codecov_request_headers(slack_user.codecov_access_token)
+    page_urls = [
+        get_endpoint_details(
+            endpoint_name,
+            service=service,
+            optional_params={**optional_params, "page": page},
+            params_dict=params_dict or {},
+        ).url
+        for page in range(2, total_pages + 1)
+    ]
+
+    def fetch_page(url):
+        return codecov_get(endpoint_name, url, headers)
+
+    def iter_results():
+        yield from first_page["results"]
+        retry_headers = None
+        with ThreadPoolExecutor(
+            max_workers=min(CODECOV_PAGINATION_CONCURRENCY, len(page_urls))
+        ) as executor:
+            for url, response in zip(
+                page_urls, executor.map(fetch_page, page_urls)
+            ):
+                # back on the caller's thread, where the token can be
+                # minted again, once for all the pages
+                if response.status_code == 401 and retry_headers is None:
+                    retry_headers = {}
+                    if refresh_rejected_codecov_access_token(slack_user):
+                        retry_headers = codecov_request_headers(
+                            slack_user.codecov_access_token
+                        )
+                if response.status_code == 401 and retry_headers:
+                    response = codecov_get(endpoint_name, url, retry_headers)
+
+                page = parse_codecov_response(response, codecov_access_token)
+                yield from page.get("results") or []
+
+    return {**first_page, **truncated, "results": iter_results()}
+
+
+def handle_codecov_public_api_requests(
+    user_id,
+    endpoints: Dict[str, Tuple[EndpointName, Dict]],
+    service=None,
+    params_dict=None,
+    slack_user: SlackUser = None,
+):
+    """
+    Runs several Codecov requests for the same user concurrently.
+    `endpoints` maps a key to an (endpoint_name, optional_params) pair, the
+    result maps the same keys to the data or to the exception raised.
+    """
+    if slack_user is None:
+        slack_user = _get_slack_user(user_id)
+    if slack_user.active_service:
+        service = slack_user.active_service.name
+
+    urls = {
+        key: (
+            endpoint_name,
+            get_endpoint_details(
+                endpoint_name,
+                service=service,
+                optional_params=optional_params,
+                params_dict=params_dict or {},
+            ).url,
         )
-        raise Exception("Error: Not found." + msg)
-    elif response.status_code == 401:
-        raise Exception(
-            "Error: Unauthorized access, are you sure you have a Codecov account?"
+        for key, (endpoint_name, optional_params) in endpoints.items()
+    }
+
+    client = AsyncCodecovClient(
+        codecov_access_token=slack_user.codecov_access_token
+    )
+    results = client.fetch_many(urls)
+
+    rejected = {
+        key: urls[key]
+        for key, result in results.items()
+        if isinstance(result, CodecovUnauthorizedError)
+    }
+    # same as a single request, mint a new token and retry those once
+    if rejected and refresh_rejected_codecov_access_token(slack_user):
+        client = AsyncCodecovClient(
+            codecov_access_token=slack_user.codecov_access_token
         )
-    else:
-        raise Exception("Error: Could not get data from Codecov")
+        results.update(client.fetch_many(rejected))
+    return results
@@ -0,0 +1,77 @@
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and rejects calls
+    until `reset_timeout` seconds have passed, then lets a single trial call
+    through (half-open) to decide whether to close again.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.half_open = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        return self.opened_at is not None
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            if self.opened_at is None:
+                return True
+
+            if self.half_open:
+                return False  # a trial call is already in flight
+
+            if time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.half_open = True
+                return True
+
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.half_open = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.half_open or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+                self.half_open = False
+
+
+class LatencyTracker:
+    """Keeps the most recent latencies to estimate a percentile"""
+
+    def __init__(self, window: int = 100, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, latency: float):
+        with self._lock:
+            self._samples.append(latency)
+
+    def percentile(self, percent: float) -> Optional[float]:
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            samples = sorted(self._samples)
+
+        index = min(len(samples) - 1, int(len(samples) * percent / 100))
+        return samples[index]
@@ -0,0 +1,229 @@
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, Tuple
+
+import httpx
+import requests
+
+from core.command_executor import COMMAND_EXECUTOR_MAX_WORKERS
+from core.enums import EndpointName
+
+from .circuit_breaker import CircuitBreaker, CircuitOpenError, LatencyTracker
+
+logger = logging.getLogger(__name__)
+
+CODECOV_REQUEST_TIMEOUT = float(
+    os.environ.get("CODECOV_REQUEST_TIMEOUT", 10)
+)  # seconds
+CODECOV_BREAKER_FAILURE_THRESHOLD = int(
+    os.environ.get("CODECOV_BREAKER_FAILURE_THRESHOLD", 5)
+)
+CODECOV_BREAKER_RESET_TIMEOUT = float(
+    os.environ.get("CODECOV_BREAKER_RESET_TIMEOUT", 30)
+)  # seconds
+CODECOV_HEDGE_REQUESTS = (
+    os.environ.get("CODECOV_HEDGE_REQUESTS", "false").lower() == "true"
+)
+# room for a request and its backup from every command worker, so hedging
+# never caps outbound concurrency below the command pool
+CODECOV_HEDGE_MAX_WORKERS = int(
+    os.environ.get(
+        "CODECOV_HEDGE_MAX_WORKERS", 2 * COMMAND_EXECUTOR_MAX_WORKERS
+    )
+)
+
+CIRCUIT_OPEN_MESSAGE = (
+    "Codecov is not responding right now, please try again in a few minutes."
+)
+
+# one breaker and latency window per endpoint (url template) so a degraded
+# endpoint doesn't fail fast the ones that are still healthy
+_circuit_breakers: Dict[EndpointName, CircuitBreaker] = {}
+_latencies: Dict[EndpointName, LatencyTracker] = {}
+_hedge_executor = ThreadPoolExecutor(
+    max_workers=CODECOV_HEDGE_MAX_WORKERS,
+    thread_name_prefix="codecov-hedge",
+)
+
+
+def get_circuit_breaker(endpoint_name: EndpointName) -> CircuitBreaker:
+    breaker = _circuit_breakers.get(endpoint_name)
+    if breaker is None:
+        breaker = _circuit_breakers.setdefault(
+            endpoint_name,
+            CircuitBreaker(
+                failure_threshold=CODECOV_BREAKER_FAILURE_THRESHOLD,
+                reset_timeout=CODECOV_BREAKER_RESET_TIMEOUT,
+            ),
+        )
+    return breaker
+
+
+def get_latency_tracker(endpoint_name: EndpointName) -> LatencyTracker:
+    tracker = _latencies.get(endpoint_name)
+    if tracker is None:
+        tracker = _latencies.setdefault(endpoint_name, LatencyTracker())
+    return tracker
+
+
+def _record_outcome(breaker: CircuitBreaker, status_code: int):
+    if status_code >= 500:
+        breaker.record_failure()
+    else:
+        breaker.record_success()
+
+
+def codecov_request_headers(codecov_access_token=None):
+    headers = {
+        "accept": "application/json",
+    }
+
+    if codecov_access_token:
+        headers["Authorization"] = f"Bearer {codecov_access_token}"
+
+    return headers
+
+
+class CodecovUnauthorizedError(Exception):
+    """Codecov rejected the access token, a new one may be minted"""
+
+
+def parse_codecov_response(response, codecov_access_token):
+    if response.status_code == 200:
+        return response.json()
+    elif response.status_code == 404:
+        msg = (
+            f"Please use `/codecov login` if you are accessing private data."
+            if not codecov_access_token
+            else ""
+        )
+        raise Exception("Error: Not found." + msg)
+    elif response.status_code == 401:
+        raise CodecovUnauthorizedError(
+            "Error: Unauthorized access, are you sure you have a Codecov account?"
+        )
+    else:
+        raise Exception("Error: Could not get data from Codecov")
+
+
+def _timed_get(endpoint_name: EndpointName, url: str, headers: Dict):
+    start = time.monotonic()
+    response = requests.get(
+        url, headers=headers, timeout=CODECOV_REQUEST_TIMEOUT
+    )
+    get_latency_tracker(endpoint_name).record(time.monotonic() - start)
+    return response
+
+
+def _hedged_get(endpoint_name: EndpointName, url: str, headers: Dict):
+    """
+    Sends a second identical request when the first one is slower than the
+    endpoint's p95 latency and returns whichever succeeds first.
+    """
+    hedge_delay = get_latency_tracker(endpoint_name).percentile(95)
+    first = _hedge_executor.submit(_timed_get, endpoint_name, url, headers)
+    if hedge_delay is None:
+        return first.result()
+
+    done, _ = wait([first], timeout=hedge_delay)
+    if done:
+        return first.result()
+
+    logger.info(f"Hedging slow codecov request for {endpoint_name.value}")
+    pending = {
+        first,
+        _hedge_executor.submit(_timed_get, endpoint_name, url, headers),
+    }
+    error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            try:
+                return future.result()
+            except requests.RequestException as e:
+                error = e
+    raise error
+
+
+def codecov_get(endpoint_name: EndpointName, url: str, headers: Dict):
+    """
+    GET against the Codecov public API, bounded by CODECOV_REQUEST_TIMEOUT and
+    guarded by the endpoint's circuit breaker.
+    """
+    breaker = get_circuit_breaker(endpoint_name)
+    if not breaker.allow_request():
+        raise CircuitOpenError(CIRCUIT_OPEN_MESSAGE)
+
+    try:
+        if CODECOV_HEDGE_REQUESTS:
+            response = _hedged_get(endpoint_name, url, headers)
+        else:
+            response = _timed_get(endpoint_name, url, headers)
+    except requests.RequestException as e:
+        breaker.record_failure()
+        logger.warning(f"Codecov request to {endpoint_name.value} failed: {e}")
+        raise Exception("Error: Could not get data from Codecov")
+
+    _record_outcome(breaker, response.status_code)
+    return response
+
+
+class AsyncCodecovClient:
+    """
+    asyncio client for the Codecov public API, used to fan out several
+    requests for a single command so it waits on the slowest call only
+    """
+
+    def __init__(self, codecov_access_token=None):
+        self.codecov_access_token = codecov_access_token
+        self.headers = codecov_request_headers(codecov_access_token)
+
+    async def get(
+        self,
+        client: httpx.AsyncClient,
+        endpoint_name: EndpointName,
+        url: str,
+    ):
+        breaker = get_circuit_breaker(endpoint_name)
+        if not breaker.allow_request():
+            raise CircuitOpenError(CIRCUIT_OPEN_MESSAGE)
+
+        try:
+            response = await client.get(url, headers=self.headers)
+        except httpx.HTTPError as e:
+            breaker.record_failure()
+            logger.warning(
+                f"Codecov request to {endpoint_name.value} failed: {e}"
+            )
+            raise Exception("Error: Could not get data from Codecov")
+
+        _record_outcome(breaker, response.status_code)
+        return parse_codecov_response(response, self.codecov_access_token)
+
+    async def get_many(
+        self, urls: Dict[str, Tuple[EndpointName, str]]
+    ) -> Dict:
+        """
+        Fetches all (endpoint_name, url) pairs concurrently. Failed requests
+        don't cancel the others, their exception is returned in place of the
+        data.
+        """
+        async with httpx.AsyncClient(
+            timeout=CODECOV_REQUEST_TIMEOUT
+        ) as client:
+            results = await asyncio.gather(
+                *(
+                    self.get(client, endpoint_name, url)
+                    for endpoint_name, url in urls.values()
+                ),
+                return_exceptions=True,
+            )
+
+        return dict(zip(urls.keys(), results))
+
+    def fetch_many(self, urls: Dict[str, Tuple[EndpointName, str]]) -> Dict:
+        """Sync entrypoint for the Bolt listeners"""
+        return asyncio.run(self.get_many(urls))
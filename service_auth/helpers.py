@@ -1,7 +1,8 @@
 import os
+import string
 import urllib.parse
 from dataclasses import dataclass
-from typing import Dict
+from typing import Dict, Tuple
 
 import requests
 from rest_framework.exceptions import ValidationError
@@ -15,8 +16,9 @@ CODECOV_PUBLIC_API = os.environ.get("CODECOV_PUBLIC_API")
 
 def _user_info(user_info):
     username = user_info["user"]["name"]
-    email = user_info["user"]["profile"]["email"]
-    display_name = user_info["user"]["profile"]["display_name"]
+    # email is only shared with the users:read.email scope
+    email = user_info["user"]["profile"].get("email")
+    display_name = user_info["user"]["profile"].get("display_name")
     team_id = user_info["user"]["team_id"]
     is_bot = user_info["user"]["is_bot"]
     is_owner = user_info["user"]["is_owner"]
@@ -56,99 +58,128 @@ class Endpoint:  # keeping this here for now
     url: str
 
 
+@dataclass(frozen=True)
+class EndpointRoute:
+    url_template: str
+    path_params: Tuple[str, ...]
+    paginated: bool = False
+
+    def build_url(self, service=None, params_dict: Dict = None) -> str:
+        params_dict = params_dict or {}
+        values = {}
+        for name in self.path_params:
+            value = service if name == "service" else params_dict.get(name)
+            # file paths keep their separators, every other value is a
+            # single path segment
+            safe = "/" if name == "path" else ""
+            values[name] = urllib.parse.quote(str(value), safe=safe)
+
+        return self.url_template.format(**values)
+
+
+def _route(
+    path: str,
+    paginated: bool = False,
+) -> EndpointRoute:
+    url_template = f"{CODECOV_PUBLIC_API}/{path}"
+    path_params = tuple(
+        field
+        for _, field, _, _ in string.Formatter().parse(path)
+        if field is not None
+    )
+    return EndpointRoute(
+        url_template=url_template,
+        path_params=path_params,
+        paginated=paginated,
+    )
+
+
+REPO_PATH = "{service}/{username}/repos/{repository}"
+
+# compiled once at import, every command resolves its url from this table
+ENDPOINT_ROUTES: Dict[EndpointName, EndpointRoute] = {
+    endpoint_name: _route(*args, **kwargs)
+    for endpoint_name, args, kwargs in [
+        (EndpointName.SERVICE_OWNERS, ("{service}/",), {"paginated": True}),
+        (EndpointName.OWNER, ("{service}/{username}/",), {}),
+        (
+            EndpointName.USERS_LIST,
+            ("{service}/{username}/users/",),
+            {"paginated": True},
+        ),
+        (EndpointName.REPO_CONFIG, (f"{REPO_PATH}/config/",), {}),
+        (
+            EndpointName.REPOS,
+            ("{service}/{username}/repos/",),
+            {"paginated": True},
+        ),
+        (EndpointName.REPO, (f"{REPO_PATH}/",), {}),
+        (
+            EndpointName.BRANCHES,
+            (f"{REPO_PATH}/branches/",),
+            {"paginated": True},
+        ),
+        (EndpointName.BRANCH, (f"{REPO_PATH}/branches/{{branch}}/",), {}),
+        (
+            EndpointName.COMMITS,
+            (f"{REPO_PATH}/commits/",),
+            {"paginated": True},
+        ),
+        (EndpointName.COMMIT, (f"{REPO_PATH}/commits/{{commitid}}/",), {}),
+        (EndpointName.PULLS, (f"{REPO_PATH}/pulls/",), {"paginated": True}),
+        (EndpointName.PULL, (f"{REPO_PATH}/pulls/{{pullid}}/",), {}),
+        (EndpointName.COMPONENTS, (f"{REPO_PATH}/components/",), {}),
+        (EndpointName.FLAGS, (f"{REPO_PATH}/flags/",), {"paginated": True}),
+        (
+            EndpointName.COVERAGE_TRENDS,
+            (f"{REPO_PATH}/flags/{{flag}}/coverage/",),
+            {"paginated": True},
+        ),
+        (EndpointName.COMPARISON, (f"{REPO_PATH}/compare/",), {}),
+        (
+            EndpointName.COMPONENT_COMPARISON,
+            (f"{REPO_PATH}/compare/components/",),
+            {},
+        ),
+        (
+            EndpointName.FILE_COMPARISON,
+            (f"{REPO_PATH}/compare/file/{{path}}",),
+            {},
+        ),
+        (EndpointName.FLAG_COMPARISON, (f"{REPO_PATH}/compare/flags/",), {}),
+        (
+            EndpointName.COVERAGE_TREND,
+            (f"{REPO_PATH}/coverage/",),
+            {"paginated": True},
+        ),
+        (
+            EndpointName.FILE_COVERAGE_REPORT,
+            (f"{REPO_PATH}/file_report/{{path}}",),
+            {},
+        ),
+        (EndpointName.COMMIT_COVERAGE_REPORT, (f"{REPO_PATH}/report/",), {}),
+        (EndpointName.COMMIT_COVERAGE_TOTALS, (f"{REPO_PATH}/totals/",), {}),
+    ]
+}
+
+
 def get_endpoint_details(
     endpoint_name: EndpointName,
     service=None,
     params_dict: Dict = None,
     optional_params=None,
 ) -> Endpoint:
-    owner_username = params_dict.get("username")
-    repository = params_dict.get("repository")
-    branch = params_dict.get("branch")
-    commit_id = params_dict.get("commitid")
-    pull_id = params_dict.get("pullid")
-    flag = params_dict.get("flag")
-    file_path = params_dict.get("path")
-
-    endpoints_map: Dict[EndpointName, Endpoint] = {
-        EndpointName.SERVICE_OWNERS: Endpoint(
-            url=f"{CODECOV_PUBLIC_API}/{service}",
-        ),
-        EndpointName.OWNER: Endpoint(
-            url=f"{CODECOV_PUBLIC_API}/{service}/{owner_username}",
-        ),
-        EndpointName.USERS_LIST: Endpoint(
-            url=f"{CODECOV_PUBLIC_API}/{service}/{owner_username}/users",
-        ),
-        EndpointName.REPO_CONFIG: Endpoint(
-            url=f"{CODECOV_PUBLIC_API}/{service}/{owner_username}/repos/{repository}/config",
-        ),
-        EndpointName.REPOS: Endpoint(
-            url=f"{CODECOV_PUBLIC_API}/{service}/{owner_username}/repos",
-        ),
-        EndpointName.REPO: Endpoint(
-            url=f"{CODECOV_PUBLIC_API}/{service}/{owner_username}/repos/{repository}",
-        ),
-        EndpointName.BRANCHES: Endpoint(
-            url=f"{CODECOV_PUBLIC_API}/{service}/{owner_username}/repos/{repository}/branches",
-        ),
-        EndpointName.BRANCH: Endpoint(
-            url=f"{CODECOV_PUBLIC_API}/{service}/{owner_username}/repos/{repository}/branches/{branch}",
-        ),
-        EndpointName.COMMITS: Endpoint(
-            url=f"{CODECOV_PUBLIC_API}/{service}/{owner_username}/repos/{repository}/commits",
-        ),
-        EndpointName.COMMIT: Endpoint(
-            url=f"{CODECOV_PUBLIC_API}/{service}/{owner_username}/repos/{repository}/commits/{commit_id}",
-        ),
-        EndpointName.PULLS: Endpoint(
-            url=f"{CODECOV_PUBLIC_API}/{service}/{owner_username}/repos/{repository}/pulls",
-        ),
-        EndpointName.PULL: Endpoint(
-            url=f"{CODECOV_PUBLIC_API}/{service}/{owner_username}/repos/{repository}/pulls/{pull_id}",
-        ),
-        EndpointName.COMPONENTS: Endpoint(
-            url=f"{CODECOV_PUBLIC_API}/{service}/{owner_username}/repos/{repository}/components",
-        ),
-        EndpointName.FLAGS: Endpoint(
-            url=f"{CODECOV_PUBLIC_API}/{service}/{owner_username}/repos/{repository}/flags",
-        ),
-        EndpointName.COVERAGE_TRENDS: Endpoint(
-            url=f"{CODECOV_PUBLIC_API}/{service}/{owner_username}/repos/{repository}/flags/{flag}/coverage",
-        ),
-        EndpointName.COMPARISON: Endpoint(
-            url=f"{CODECOV_PUBLIC_API}/{service}/{owner_username}/repos/{repository}/compare",
-        ),
-        EndpointName.COMPONENT_COMPARISON: Endpoint(
-            url=f"{CODECOV_PUBLIC_API}/{service}/{owner_username}/repos/{repository}/compare/components",
-        ),
-        EndpointName.FILE_COMPARISON: Endpoint(
-            url=f"{CODECOV_PUBLIC_API}/{service}/{owner_username}/repos/{repository}/compare/file/{file_path}",
-        ),
-        EndpointName.FLAG_COMPARISON: Endpoint(
-            url=f"{CODECOV_PUBLIC_API}/{service}/{owner_username}/repos/{repository}/compare/flags",
-        ),
-        EndpointName.COVERAGE_TREND: Endpoint(
-            url=f"{CODECOV_PUBLIC_API}/{service}/{owner_username}/repos/{repository}/coverage",
-        ),
-        EndpointName.FILE_COVERAGE_REPORT: Endpoint(
-            url=f"{CODECOV_PUBLIC_API}/{service}/{owner_username}/repos/{repository}/file_report/{file_path}",
-        ),
-        EndpointName.COMMIT_COVERAGE_REPORT: Endpoint(
-            url=f"{CODECOV_PUBLIC_API}/{service}/{owner_username}/repos/{repository}/report",
-        ),
-        EndpointName.COMMIT_COVERAGE_TOTALS: Endpoint(
-            url=f"{CODECOV_PUBLIC_API}/{service}/{owner_username}/repos/{repository}/totals",
-        ),
-    }
+    route = ENDPOINT_ROUTES.get(endpoint_name)
+    if not route:
+        raise Exception("Endpoint not found")
 
-    endpoint = endpoints_map[endpoint_name]
+    url = route.build_url(service=service, params_dict=params_dict)
 
     if optional_params:
         params_str = urllib.parse.urlencode(optional_params)
-        endpoint.url = f"{endpoint.url}?{params_str}"
+        url = f"{url}?{params_str}"
 
-    return endpoint
+    return Endpoint(url=url)
 
 
 def notify_user(user, channel_id=None, message=""):
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.14 on 2026-10-19 03:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("service_auth", "0004_alter_slackuser_codecov_access_token"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="slackuser",
+            name="codecov_access_token_verified_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
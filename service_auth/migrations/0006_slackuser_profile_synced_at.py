@@ -0,0 +1,18 @@
+# Generated by Django 5.0.14 on 2026-10-19 03:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("service_auth", "0005_slackuser_codecov_access_token_verified_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="slackuser",
+            name="profile_synced_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
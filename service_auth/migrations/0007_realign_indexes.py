@@ -0,0 +1,21 @@
+# Generated by Django 5.0.14 on 2026-10-19 04:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("service_auth", "0006_slackuser_profile_synced_at"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="slackuser",
+            name="service_aut_user_id_2e94eb_idx",
+        ),
+        migrations.AddIndex(
+            model_name="slackuser",
+            index=models.Index(fields=["team_id"], name="slackuser_team"),
+        ),
+    ]
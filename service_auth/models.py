@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import F, FilteredRelation, Q
 
 
 # Create your models here.
@@ -8,6 +9,21 @@ class ServiceOptions(models.TextChoices):
     BITBUCKET = "bitbucket"
 
 
+class SlackUserQuerySet(models.QuerySet):
+    def with_active_service(self):
+        """Loads the user's active service in the same query"""
+        return (
+            self.annotate(
+                active_service_relation=FilteredRelation(
+                    "services", condition=Q(services__active=True)
+                )
+            ).select_related("active_service_relation")
+            # select_related leaves the attribute unset when the join is
+            # empty, this tells "no active service" apart from "not loaded"
+            .annotate(active_service_id=F("active_service_relation__id"))
+        )
+
+
 class SlackUser(models.Model):
     user_id = models.CharField(primary_key=True, max_length=50)
     username = models.CharField(max_length=100, null=True)
@@ -20,21 +36,36 @@ class SlackUser(models.Model):
     is_owner = models.BooleanField(default=False)
     is_admin = models.BooleanField(default=False)
     codecov_access_token = models.UUIDField(null=True, blank=True)
+    codecov_access_token_verified_at = models.DateTimeField(
+        null=True, blank=True
+    )
+    profile_synced_at = models.DateTimeField(null=True, blank=True)
+
+    objects = SlackUserQuerySet.as_manager()
 
     def __str__(self):
         return self.display_name or self.username or self.user_id
 
     class Meta:
         indexes = [
-            models.Index(fields=["user_id"]),
+            # user_id is the primary key, workspaces are cleaned up by team
+            models.Index(fields=["team_id"], name="slackuser_team"),
         ]
 
     @property
     def active_service(self):
-        try:
-            return self.services.get(active=True)
-        except Service.DoesNotExist:
-            return None
+        if "active_service_relation" not in self.__dict__:
+            if "active_service_id" in self.__dict__:
+                # loaded by SlackUser.objects.with_active_service()
+                service = None
+            else:
+                try:
+                    service = self.services.get(active=True)
+                except Service.DoesNotExist:
+                    service = None
+            # logged out users are cached too, not looked up on every access
+            self.__dict__["active_service_relation"] = service
+        return self.__dict__["active_service_relation"]
 
 
 class Service(models.Model):
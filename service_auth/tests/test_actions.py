@@ -1,15 +1,25 @@
 import os
-from unittest.mock import Mock, patch
+from datetime import timedelta
+from unittest.mock import AsyncMock, Mock, patch
 
+import httpx
 import pytest
 from django.test import TestCase
+from django.utils import timezone
+from slack_sdk.errors import SlackApiError
 
 from core.enums import EndpointName
-from service_auth.actions import (authenticate_command,
+from service_auth.actions import (SLACK_PROFILE_TTL, authenticate_command,
                                   create_new_codecov_access_token,
+                                  get_cached_slack_user,
                                   get_or_create_slack_user,
+                                  handle_codecov_public_api_paginated_request,
                                   handle_codecov_public_api_request,
+                                  handle_codecov_public_api_requests,
+                                  sync_slack_user_profile,
                                   verify_codecov_access_token)
+from service_auth.codecov_client import (CODECOV_REQUEST_TIMEOUT,
+                                         CodecovUnauthorizedError)
 from service_auth.models import Service, SlackUser
 
 
@@ -44,6 +54,69 @@ def test_get_or_create_slack_user():
     assert existing_user == user
 
 
+class TestGetCachedSlackUser(TestCase):
+    def setUp(self):
+        self.client = Mock()
+        self.client.users_info.return_value = {
+            "user": {
+                "id": "U12345",
+                "name": "new_name",
+                "profile": {
+                    "email": "user@example.com",
+                    "display_name": "New Name",
+                },
+                "team_id": "T12345",
+                "is_bot": False,
+                "is_owner": False,
+                "is_admin": True,
+            }
+        }
+
+    def test_unknown_user_is_created(self):
+        user = get_cached_slack_user(self.client, "U12345")
+
+        self.client.users_info.assert_called_once_with(user="U12345")
+        assert user.username == "new_name"
+        assert user.profile_synced_at is not None
+
+    def test_fresh_profile_skips_users_info(self):
+        SlackUser.objects.create(
+            user_id="U12345",
+            username="old_name",
+            profile_synced_at=timezone.now(),
+        )
+
+        user = get_cached_slack_user(self.client, "U12345")
+
+        self.client.users_info.assert_not_called()
+        assert user.username == "old_name"
+
+    def test_stale_profile_is_refreshed(self):
+        stale = timezone.now() - timedelta(seconds=SLACK_PROFILE_TTL + 1)
+        SlackUser.objects.create(
+            user_id="U12345", username="old_name", profile_synced_at=stale
+        )
+
+        user = get_cached_slack_user(self.client, "U12345")
+
+        self.client.users_info.assert_called_once_with(user="U12345")
+        assert user.username == "new_name"
+        assert user.is_admin is True
+        assert user.profile_synced_at > stale
+
+    def test_sync_slack_user_profile(self):
+        SlackUser.objects.create(user_id="U12345", username="old_name")
+
+        updated = sync_slack_user_profile(self.client.users_info())
+        assert updated == 1
+        assert SlackUser.objects.get(user_id="U12345").username == "new_name"
+
+        # unknown users are not created from user_change events
+        SlackUser.objects.all().delete()
+        assert sync_slack_user_profile(self.client.users_info()) == 0
+        assert not SlackUser.objects.exists()
+
+
 @pytest.mark.django_db
 @patch("requests.get")
 def test_verify_codecov_access_token(mock_get):
@@ -137,6 +210,43 @@ class TestAuthenticateCommand(TestCase):
         mock_create_new_access_token.assert_not_called()
         mock_view_modal.assert_not_called()
 
+    def test_recently_verified_token_is_not_probed(
+        self,
+        mock_view_modal,
+        mock_create_new_access_token,
+        mock_verify_access_token,
+        mock_get_or_create_slack_user,
+    ):
+        self.slack_user.codecov_access_token_verified_at = timezone.now()
+        mock_get_or_create_slack_user.return_value = self.slack_user
+
+        authenticate_command(client=self.client, command=self.command)
+
+        mock_verify_access_token.assert_not_called()
+        mock_create_new_access_token.assert_not_called()
+        mock_view_modal.assert_not_called()
+
+    def test_stale_verification_is_probed(
+        self,
+        mock_view_modal,
+        mock_create_new_access_token,
+        mock_verify_access_token,
+        mock_get_or_create_slack_user,
+    ):
+        self.slack_user.codecov_access_token_verified_at = (
+            timezone.now() - timedelta(days=1)
+        )
+        mock_get_or_create_slack_user.return_value = self.slack_user
+        mock_verify_access_token.return_value = True
+
+        authenticate_command(client=self.client, command=self.command)
+
+        mock_verify_access_token.assert_called_once_with(self.slack_user)
+        self.slack_user.refresh_from_db()
+        assert (
+            timezone.now() - self.slack_user.codecov_access_token_verified_at
+        ).total_seconds() < 60
+
     def test_token_not_verified(
         self,
         mock_view_modal,
@@ -172,6 +282,22 @@ class TestAuthenticateCommand(TestCase):
         mock_create_new_access_token.assert_not_called()
         mock_view_modal.assert_called_once_with(self.client, self.command)
 
+    def test_expired_trigger_asks_to_login(
+        self,
+        mock_view_modal,
+        mock_create_new_access_token,
+        mock_verify_access_token,
+        mock_get_or_create_slack_user,
+    ):
+        self.slack_user.codecov_access_token = None
+        mock_get_or_create_slack_user.return_value = self.slack_user
+        mock_view_modal.side_effect = SlackApiError(
+            "expired_trigger_id", {"ok": False, "error": "expired_trigger_id"}
+        )
+
+        with pytest.raises(Exception, match="/codecov login"):
+            authenticate_command(client=self.client, command=self.command)
+
 
 @patch("requests.get")
 class TestHandleCodecovPublicAPI(TestCase):
@@ -200,6 +326,7 @@ class TestHandleCodecovPublicAPI(TestCase):
         mock_get.assert_called_once_with(
             "https://codecov.io/api/github/rula99/repos/",
             headers={"accept": "application/json"},
+            timeout=CODECOV_REQUEST_TIMEOUT,
         )
 
     def test_404_response(self, mock_get):
@@ -239,7 +366,7 @@ class TestHandleCodecovPublicAPI(TestCase):
                 params_dict=params_dict,
             )
 
-        assert str(e.value) == "'random'"  # it's an enum
+        assert str(e.value) == "Endpoint not found"
 
     def test_codecov_access_token_exists(self, mock_get):
         self.slack_user.codecov_access_token = (
@@ -267,6 +394,7 @@ class TestHandleCodecovPublicAPI(TestCase):
                 "accept": "application/json",
                 "Authorization": f"Bearer {self.slack_user.codecov_access_token}",
             },
+            timeout=CODECOV_REQUEST_TIMEOUT,
         )
 
     def test_returns_expected_error(self, mock_get):
@@ -287,3 +415,243 @@ class TestHandleCodecovPublicAPI(TestCase):
             )
 
         assert str(e.value) == "Error: 403, Forbidden"
+
+    @patch("service_auth.actions.create_new_codecov_access_token")
+    def test_unauthorized_response_mints_new_token_once(
+        self, mock_create_new_access_token, mock_get
+    ):
+        self.slack_user.codecov_access_token = (
+            "12345678-1234-5678-1234-567822245672"
+        )
+        self.slack_user.codecov_access_token_verified_at = timezone.now()
+        self.slack_user.save()
+        Service.objects.create(
+            name="github",
+            service_username="rula99",
+            user=self.slack_user,
+            active=True,
+        )
+
+        def mint(slack_user):
+            slack_user.codecov_access_token = (
+                "87654321-4321-8765-4321-876522245672"
+            )
+
+        mock_create_new_access_token.side_effect = mint
+        mock_get.side_effect = [
+            Mock(status_code=401),
+            Mock(status_code=200, json=lambda: {"count": 0}),
+        ]
+
+        data = handle_codecov_public_api_request(
+            user_id=self.slack_user.user_id,
+            endpoint_name=EndpointName.REPOS,
+            service="github",
+            params_dict={"username": "rula99", "service": "github"},
+        )
+
+        assert data == {"count": 0}
+        assert mock_get.call_count == 2
+        mock_create_new_access_token.assert_called_once()
+        assert mock_get.call_args[1]["headers"]["Authorization"] == (
+            "Bearer 87654321-4321-8765-4321-876522245672"
+        )
+        self.slack_user.refresh_from_db()
+        assert self.slack_user.codecov_access_token_verified_at is None
+
+
+OLD_TOKEN = "12345678-1234-5678-1234-567822245672"
+NEW_TOKEN = "87654321-4321-8765-4321-876522245672"
+
+
+def mint_new_token(slack_user):
+    slack_user.codecov_access_token = NEW_TOKEN
+
+
+def log_in(slack_user):
+    slack_user.codecov_access_token = OLD_TOKEN
+    slack_user.codecov_access_token_verified_at = timezone.now()
+    slack_user.save()
+    Service.objects.create(
+        name="github", service_username="rula99", user=slack_user, active=True
+    )
+
+
+@patch("requests.get")
+class TestHandleCodecovPublicAPIPaginated(TestCase):
+    def setUp(self):
+        self.slack_user = SlackUser.objects.create(
+            username="Rula",
+            user_id="rula99",
+            email="",
+        )
+        self.params_dict = {
+            "username": "rula99",
+            "service": "github",
+        }
+
+    def test_fetches_remaining_pages(self, mock_get):
+        def get_page(url, headers, timeout):
+            page = int(url.split("page=")[1]) if "page=" in url else 1
+            return Mock(
+                status_code=200,
+                json=lambda: {
+                    "count": 5,
+                    "results": [{"name": f"repo{page}"}]
+                    * (1 if page == 3 else 2),
+                },
+            )
+
+        mock_get.side_effect = get_page
+
+        data = handle_codecov_public_api_paginated_request(
+            user_id=self.slack_user.user_id,
+            endpoint_name=EndpointName.REPOS,
+            service="github",
+            optional_params={"page": "2", "page_size": "2"},
+            params_dict=self.params_dict,
+        )
+
+        assert data["count"] == 5
+        assert [result["name"] for result in data["results"]] == [
+            "repo1",
+            "repo1",
+            "repo2",
+            "repo2",
+            "repo3",
+        ]
+        assert mock_get.call_count == 3
+
+    def test_single_page(self, mock_get):
+        mock_get.return_value = Mock(
+            status_code=200,
+            json=lambda: {"count": 1, "results": [{"name": "repo1"}]},
+        )
+
+        data = handle_codecov_public_api_paginated_request(
+            user_id=self.slack_user.user_id,
+            endpoint_name=EndpointName.REPOS,
+            service="github",
+            params_dict=self.params_dict,
+        )
+
+        assert data == {"count": 1, "results": [{"name": "repo1"}]}
+        assert mock_get.call_count == 1
+
+    @patch("service_auth.actions.CODECOV_PAGINATION_MAX_PAGES", 2)
+    def test_stops_at_max_pages(self, mock_get):
+        mock_get.return_value = Mock(
+            status_code=200,
+            json=lambda: {"count": 10, "results": [{"name": "repo"}] * 2},
+        )
+
+        data = handle_codecov_public_api_paginated_request(
+            user_id=self.slack_user.user_id,
+            endpoint_name=EndpointName.REPOS,
+            service="github",
+            params_dict=self.params_dict,
+        )
+
+        assert len(list(data["results"])) == 4
+        assert data["truncated"] and data["shown"] == 4
+        assert mock_get.call_count == 2
+
+    @patch("service_auth.actions.create_new_codecov_access_token")
+    def test_unauthorized_pages_mint_new_token_once(
+        self, mock_create_new_access_token, mock_get
+    ):
+        log_in(self.slack_user)
+        mock_create_new_access_token.side_effect = mint_new_token
+
+        def get_page(url, headers, timeout):
+            page = int(url.split("page=")[1]) if "page=" in url else 1
+            if page > 1 and headers["Authorization"] == f"Bearer {OLD_TOKEN}":
+                return Mock(status_code=401)
+            return Mock(
+                status_code=200,
+                json=lambda: {
+                    "count": 6,
+                    "results": [{"name": f"repo{page}"}] * 2,
+                },
+            )
+
+        mock_get.side_effect = get_page
+
+        data = handle_codecov_public_api_paginated_request(
+            user_id=self.slack_user.user_id,
+            endpoint_name=EndpointName.REPOS,
+            service="github",
+            params_dict=self.params_dict,
+        )
+
+        assert len(list(data["results"])) == 6
+        # pages 2 and 3 are retried with the new token
+        assert mock_get.call_count == 5
+        mock_create_new_access_token.assert_called_once()
+        self.slack_user.refresh_from_db()
+        assert self.slack_user.codecov_access_token_verified_at is None
+
+
+class TestHandleCodecovPublicAPIRequests(TestCase):
+    def setUp(self):
+        self.slack_user = SlackUser.objects.create(
+            username="Rula",
+            user_id="rula99",
+            email="",
+        )
+        log_in(self.slack_user)
+
+    @patch("service_auth.actions.create_new_codecov_access_token")
+    def test_unauthorized_requests_mint_new_token_once(
+        self, mock_create_new_access_token
+    ):
+        mock_create_new_access_token.side_effect = mint_new_token
+
+        async def get(url, headers):
+            if headers["Authorization"] == f"Bearer {OLD_TOKEN}":
+                return Mock(status_code=401)
+            return Mock(status_code=200, json=lambda: {"url": url})
+
+        with patch.object(
+            httpx.AsyncClient, "get", new=AsyncMock(side_effect=get)
+        ) as mock_get:
+            data = handle_codecov_public_api_requests(
+                self.slack_user.user_id,
+                {
+                    "repo": (EndpointName.REPO, {}),
+                    "flags": (EndpointName.FLAGS, {}),
+                },
+                params_dict={
+                    "owner_username": "rula99",
+                    "repository": "repo",
+                },
+            )
+
+        assert not any(isinstance(r, Exception) for r in data.values())
+        assert mock_get.await_count == 4
+        mock_create_new_access_token.assert_called_once()
+
+    @patch("service_auth.actions.create_new_codecov_access_token")
+    def test_failed_refresh_keeps_the_unauthorized_error(
+        self, mock_create_new_access_token
+    ):
+        mock_create_new_access_token.side_effect = Exception("boom")
+
+        with patch.object(
+            httpx.AsyncClient,
+            "get",
+            new=AsyncMock(return_value=Mock(status_code=401)),
+        ) as mock_get:
+            data = handle_codecov_public_api_requests(
+                self.slack_user.user_id,
+                {"repo": (EndpointName.REPO, {})},
+                params_dict={
+                    "owner_username": "rula99",
+                    "repository": "repo",
+                },
+            )
+
+        assert isinstance(data["repo"], CodecovUnauthorizedError)
+        assert mock_get.await_count == 1
+        self.slack_user.refresh_from_db()
+        assert self.slack_user.codecov_access_token_verified_at is None
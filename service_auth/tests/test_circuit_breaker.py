@@ -0,0 +1,56 @@
+from unittest.mock import patch
+
+from service_auth.circuit_breaker import CircuitBreaker, LatencyTracker
+
+
+def test_circuit_breaker_opens_after_threshold():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+
+    breaker.record_failure()
+    assert breaker.allow_request()
+
+    breaker.record_failure()
+    assert breaker.is_open
+    assert not breaker.allow_request()
+
+
+def test_circuit_breaker_success_resets_failures():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+
+    assert not breaker.is_open
+
+
+@patch("service_auth.circuit_breaker.time.monotonic")
+def test_circuit_breaker_half_open(mock_monotonic):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    mock_monotonic.return_value = 100
+    breaker.record_failure()
+
+    mock_monotonic.return_value = 131
+    assert breaker.allow_request()  # trial request
+    assert not breaker.allow_request()  # only one trial at a time
+
+    breaker.record_failure()  # trial failed, open again
+    assert not breaker.allow_request()
+
+    mock_monotonic.return_value = 162
+    assert breaker.allow_request()
+    breaker.record_success()
+    assert not breaker.is_open
+    assert breaker.allow_request()
+
+
+def test_latency_tracker_percentile():
+    tracker = LatencyTracker(window=100, min_samples=20)
+    for latency in range(10):
+        tracker.record(latency)
+    assert tracker.percentile(95) is None
+
+    for latency in range(10, 100):
+        tracker.record(latency)
+    assert tracker.percentile(95) == 95
+    assert tracker.percentile(50) == 50
@@ -0,0 +1,130 @@
+import threading
+from unittest.mock import AsyncMock, Mock, patch
+
+import httpx
+import pytest
+import requests
+
+from core.enums import EndpointName
+from service_auth import codecov_client
+from service_auth.circuit_breaker import CircuitOpenError
+from service_auth.codecov_client import (CIRCUIT_OPEN_MESSAGE,
+                                         AsyncCodecovClient, codecov_get,
+                                         codecov_request_headers,
+                                         parse_codecov_response)
+
+
+@pytest.fixture(autouse=True)
+def reset_circuit_breakers():
+    codecov_client._circuit_breakers.clear()
+    codecov_client._latencies.clear()
+    yield
+    codecov_client._circuit_breakers.clear()
+    codecov_client._latencies.clear()
+
+
+def test_codecov_request_headers():
+    assert codecov_request_headers() == {"accept": "application/json"}
+    assert codecov_request_headers("random-token") == {
+        "accept": "application/json",
+        "Authorization": "Bearer random-token",
+    }
+
+
+def test_parse_codecov_response():
+    assert parse_codecov_response(
+        Mock(status_code=200, json=lambda: {"count": 0}), None
+    ) == {"count": 0}
+
+    with pytest.raises(Exception) as e:
+        parse_codecov_response(Mock(status_code=404), "random-token")
+    assert str(e.value) == "Error: Not found."
+
+    with pytest.raises(Exception) as e:
+        parse_codecov_response(Mock(status_code=500), None)
+    assert str(e.value) == "Error: Could not get data from Codecov"
+
+
+def test_fetch_many():
+    responses = {
+        "https://codecov.io/api/repo": Mock(
+            status_code=200, json=lambda: {"name": "repo1"}
+        ),
+        "https://codecov.io/api/flags": Mock(status_code=404),
+    }
+
+    async def get(url, headers):
+        return responses[url]
+
+    client = AsyncCodecovClient(codecov_access_token="random-token")
+    with patch.object(
+        httpx.AsyncClient, "get", new=AsyncMock(side_effect=get)
+    ) as mock_get:
+        data = client.fetch_many(
+            {
+                "repo": (EndpointName.REPO, "https://codecov.io/api/repo"),
+                "flags": (EndpointName.FLAGS, "https://codecov.io/api/flags"),
+            }
+        )
+
+    assert data["repo"] == {"name": "repo1"}
+    assert isinstance(data["flags"], Exception)
+    assert mock_get.await_count == 2
+    assert mock_get.await_args[1]["headers"] == {
+        "accept": "application/json",
+        "Authorization": "Bearer random-token",
+    }
+
+
+@patch("requests.get")
+def test_codecov_get_opens_circuit_on_server_errors(mock_get):
+    mock_get.return_value = Mock(status_code=503)
+    url = "https://codecov.io/api/github/codecov/repos/"
+
+    for _ in range(codecov_client.CODECOV_BREAKER_FAILURE_THRESHOLD):
+        codecov_get(EndpointName.REPOS, url, {})
+
+    with pytest.raises(CircuitOpenError) as e:
+        codecov_get(EndpointName.REPOS, url, {})
+    assert str(e.value) == CIRCUIT_OPEN_MESSAGE
+    assert (
+        mock_get.call_count == codecov_client.CODECOV_BREAKER_FAILURE_THRESHOLD
+    )
+
+    # other endpoints keep their own breaker
+    mock_get.return_value = Mock(status_code=200)
+    assert codecov_get(EndpointName.REPO, url, {}).status_code == 200
+
+
+@patch("requests.get")
+def test_codecov_get_connection_error(mock_get):
+    mock_get.side_effect = requests.ConnectionError("boom")
+
+    with pytest.raises(Exception) as e:
+        codecov_get(EndpointName.REPOS, "https://codecov.io/api/", {})
+
+    assert str(e.value) == "Error: Could not get data from Codecov"
+    assert codecov_client.get_circuit_breaker(EndpointName.REPOS).failures == 1
+
+
+@patch("service_auth.codecov_client.CODECOV_HEDGE_REQUESTS", True)
+@patch("requests.get")
+def test_codecov_get_hedges_slow_requests(mock_get):
+    tracker = codecov_client.get_latency_tracker(EndpointName.REPOS)
+    for _ in range(tracker.min_samples):
+        tracker.record(0.01)
+
+    slow = threading.Event()
+    responses = iter(
+        [
+            lambda: slow.wait(1) and Mock(status_code=500),
+            lambda: Mock(status_code=200),
+        ]
+    )
+    mock_get.side_effect = lambda *args, **kwargs: next(responses)()
+
+    response = codecov_get(EndpointName.REPOS, "https://codecov.io/api/", {})
+    slow.set()
+
+    assert response.status_code == 200
+    assert mock_get.call_count == 2
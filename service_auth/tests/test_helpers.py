@@ -5,7 +5,8 @@ import pytest
 from rest_framework.exceptions import ValidationError
 
 from core.enums import EndpointName
-from service_auth.helpers import (_user_info, get_endpoint_details,
+from service_auth.helpers import (CODECOV_PUBLIC_API, ENDPOINT_ROUTES,
+                                  _user_info, get_endpoint_details,
                                   validate_gh_call_params)
 
 
@@ -35,6 +36,24 @@ def test_user_info():
     assert _user_info(user_info) == expected_output
 
 
+def test_user_info_without_email():
+    user_info = {
+        "user": {
+            "name": "user",
+            "profile": {"display_name": "Test User"},
+            "team_id": "12345",
+            "is_bot": False,
+            "is_owner": False,
+            "is_admin": False,
+        }
+    }
+
+    info = _user_info(user_info)
+
+    assert info["email"] is None
+    assert info["display_name"] == "Test User"
+
+
 def test_validate_gh_call_params():
     with pytest.raises(ValidationError) as e:
         validate_gh_call_params(code=None, state="12345")
@@ -72,3 +91,54 @@ class TestGetEndpointDetails(TestCase):
             endpoint.url,
             "https://codecov.io/api/gh/codecov/repos/?page_size=99",
         )
+
+    def test_get_endpoint_details_encodes_path_params(self):
+        endpoint = get_endpoint_details(
+            endpoint_name=EndpointName.BRANCH,
+            service=self.service,
+            params_dict={
+                "username": "codecov",
+                "repository": "my repo",
+                "branch": "feature/a?b",
+            },
+        )
+        self.assertEqual(
+            endpoint.url,
+            f"{CODECOV_PUBLIC_API}/gh/codecov/repos/my%20repo/branches/"
+            "feature%2Fa%3Fb/",
+        )
+
+    def test_get_endpoint_details_keeps_file_path_separators(self):
+        endpoint = get_endpoint_details(
+            endpoint_name=EndpointName.FILE_COVERAGE_REPORT,
+            service=self.service,
+            params_dict={
+                "username": "codecov",
+                "repository": "app",
+                "path": "src/main file.py",
+            },
+        )
+        self.assertEqual(
+            endpoint.url,
+            f"{CODECOV_PUBLIC_API}/gh/codecov/repos/app/file_report/"
+            "src/main%20file.py",
+        )
+
+    def test_get_endpoint_details_unknown_endpoint(self):
+        with pytest.raises(Exception, match="Endpoint not found"):
+            get_endpoint_details(EndpointName.NOTIFICATION, service="gh")
+
+
+def test_endpoint_routes_metadata():
+    repos = ENDPOINT_ROUTES[EndpointName.REPOS]
+    assert repos.path_params == ("service", "username")
+    assert repos.paginated
+
+    commit = ENDPOINT_ROUTES[EndpointName.COMMIT]
+    assert commit.path_params == (
+        "service",
+        "username",
+        "repository",
+        "commitid",
+    )
+    assert not commit.paginated